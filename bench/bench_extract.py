@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: single-pass ThreadPageParser vs the old BeautifulSoup
+three-pass extraction in get_mp4s_from_thread().
+
+Usage:
+  python3 bench/bench_extract.py [fixture_dir] [--repeat N]
+
+Uses bench/fixtures/xamvn/thread-*.html if present (recorded pages),
+otherwise synthetic XenForo pages. Verifies both implementations return
+the same title, mp4 list and next-link flag before timing them.
+"""
+
+import glob, os, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+
+from bench.synthetic import thread_page
+from crawlcore.extract import CDN_RE, extract_thread_page
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# markup edge cases checked for equivalence on every run (not timed)
+EDGE_CASES = [
+    ("nested-pagination", '<div class="pagination"><div>1</div><a class="next" href="x">n</a></div>'),
+    ("nested-pagination-2", '<div class="pagination"><div><div>1</div></div><span><a class="next">n</a></span></div>'),
+    ("after-pagination", '<div class="pagination"><div>1</div></div><a class="next">n</a>'),
+    ("self-closing", '<div class="pagination"><div/><br><a class="next">n</a></div>'),
+    ("pagination-in-pagination", '<ul class="pagination"><li class="pagination"><a>1</a></li><li><a class="next">n</a></li></ul>'),
+]
+
+
+def legacy_extract(html):
+    """The pre-extractor code path, verbatim in behaviour."""
+    soup = BeautifulSoup(html, "html.parser")
+    title = ""
+    og = soup.select_one("meta[property='og:title']")
+    if og and og.get("content"):
+        raw = og["content"].strip()
+        if " | " in raw:
+            raw = raw[: raw.rfind(" | ")].strip()
+        if raw and raw.lower() not in ("xamvn", "xam vn"):
+            title = raw
+    if not title:
+        t_tag = soup.select_one("title")
+        if t_tag:
+            raw = t_tag.get_text(strip=True)
+            if " | " in raw:
+                raw = raw[: raw.rfind(" | ")].strip()
+            if raw and raw.lower() not in ("xamvn", "xam vn"):
+                title = raw
+    if not title:
+        t = soup.select_one("h1.p-title-value")
+        if t:
+            candidate = t.get_text(" ", strip=True)
+            if candidate.lower() not in ("xamvn", "xam vn"):
+                title = candidate
+    mp4s = list(CDN_RE.findall(html))
+    for tag in soup.select("video[src], source[src]"):
+        src = tag.get("src", "")
+        if ".mp4" in src.lower():
+            mp4s.append(src)
+    for tag in soup.find_all(True):
+        for attr in ("href", "data-url", "data-src", "data-original", "content"):
+            val = tag.get(attr, "")
+            if val and ".mp4" in val.lower():
+                mp4s.extend(CDN_RE.findall(val))
+    next_btn = soup.select_one(
+        "a.pageNav-jump--next, a[rel='next'], .pagination a.next"
+    )
+    return {"title": title, "mp4s": mp4s, "has_next": bool(next_btn)}
+
+
+def load_pages(fixture_dir):
+    paths = sorted(glob.glob(os.path.join(fixture_dir, "xamvn", "thread-*.html")))
+    if paths:
+        pages = []
+        for p in paths:
+            with open(p, encoding="utf-8") as f:
+                pages.append((os.path.basename(p), f.read()))
+        return pages, "recorded"
+    return [
+        (f"synthetic-{tid}", thread_page(tid, 1, posts, has_next=tid % 2 == 0))
+        for tid, posts in ((101, 10), (102, 20), (103, 40), (104, 80))
+    ], "synthetic"
+
+
+def bench(fn, pages, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _, html in pages:
+            fn(html)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    repeat = 5
+    if "--repeat" in sys.argv:
+        idx = sys.argv.index("--repeat")
+        repeat = int(sys.argv[idx + 1])
+        del sys.argv[idx : idx + 2]
+    fixture_dir = sys.argv[1] if len(sys.argv) > 1 else FIXTURES
+    pages, kind = load_pages(fixture_dir)
+    size = sum(len(h) for _, h in pages)
+    print(f"{len(pages)} {kind} page(s), {size / 1024:.0f} KB total, best of {repeat}")
+
+    for name, html in pages + EDGE_CASES:
+        old, new = legacy_extract(html), extract_thread_page(html)
+        if old != new:
+            sys.exit(f"[mismatch] {name}:\n  old={old}\n  new={new}")
+    print("outputs identical ✓")
+
+    t_old = bench(legacy_extract, pages, repeat)
+    t_new = bench(extract_thread_page, pages, repeat)
+    n = len(pages)
+    print(f"  bs4 3-pass   : {t_old * 1000 / n:8.2f} ms/page")
+    print(f"  single-pass  : {t_new * 1000 / n:8.2f} ms/page")
+    print(f"  speed-up     : {t_old / t_new:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Run one crawler script in-process against the fixture server (or, with
+--record, against the real site while saving every page into a corpus)
+and write its resource usage as JSON.
+
+  python3 bench/child.py --port N --out stats.json -- crawl_videos.py --new-topics
+  python3 bench/child.py --record DIR --out stats.json -- crawl_videos.py --new-topics
+
+Started by run_bench.py with cwd set to a scratch copy of the data files.
+requests.Session.request and httpx.AsyncClient.request are wrapped so
+every fetch is redirected to http://127.0.0.1:N/fx/<quoted URL> and
+counted; time.sleep becomes a no-op so politeness delays do not dominate
+the timings (not when recording).
+"""
+
+import json, os, resource, runpy, sys, threading, time, traceback
+from urllib.parse import quote
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import requests
+
+from bench.corpus import Corpus, url_kind
+
+try:
+    import httpx
+except ImportError:  # crawlers fall back to requests-only paths
+    httpx = None
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pages = 0
+        self.errors = 0
+        self.bytes = 0
+
+    def add(self, status, content):
+        with self.lock:
+            self.pages += 1
+            self.bytes += len(content)
+            if status >= 400:
+                self.errors += 1
+
+
+def install(stats, port=None, corpus=None):
+    """Patch requests/httpx to hit the fixture server or record into corpus."""
+
+    def target(url):
+        return url if corpus is not None else f"http://127.0.0.1:{port}/fx/" + quote(url, safe="")
+
+    def keep(url, r):
+        if corpus is None or r.status_code != 200 or url_kind(url)[0] == "other":
+            return
+        with stats.lock:
+            corpus.put(url, r.text)
+
+    orig = requests.Session.request
+
+    def request(self, method, url, *args, **kwargs):
+        r = orig(self, method, target(url), *args, **kwargs)
+        stats.add(r.status_code, r.content)
+        keep(url, r)
+        return r
+
+    requests.Session.request = request
+
+    if httpx is not None:
+        aorig = httpx.AsyncClient.request
+
+        async def arequest(self, method, url, *args, **kwargs):
+            r = await aorig(self, method, target(str(url)), *args, **kwargs)
+            stats.add(r.status_code, r.content)
+            keep(str(url), r)
+            return r
+
+        httpx.AsyncClient.request = arequest
+
+    if corpus is None:
+        time.sleep = lambda seconds: None
+
+
+def rusage():
+    ru = resource.getrusage(resource.RUSAGE_SELF)
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = ru.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    return ru.ru_utime + ru.ru_stime, rss
+
+
+def main():
+    args = sys.argv[1:]
+    split = args.index("--")
+    opts, script_argv = args[:split], args[split + 1 :]
+
+    def opt(flag, default=None):
+        return opts[opts.index(flag) + 1] if flag in opts else default
+
+    stats = Stats()
+    corpus = Corpus(opt("--record")) if "--record" in opts else None
+    install(stats, port=opt("--port"), corpus=corpus)
+
+    script = os.path.join(ROOT, script_argv[0])
+    sys.argv = [script] + script_argv[1:]
+    cpu0, _ = rusage()
+    t0 = time.perf_counter()
+    code = 0
+    try:
+        runpy.run_path(script, run_name="__main__")
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except Exception as e:
+        traceback.print_exc()
+        code = type(e).__name__  # still report what ran before the crash
+    wall = time.perf_counter() - t0
+    cpu1, rss = rusage()
+    if corpus is not None:
+        corpus.save()
+
+    with open(opt("--out"), "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "script": script_argv[0],
+                "exit": code,
+                "pages": stats.pages,
+                "errors": stats.errors,
+                "bytes": stats.bytes,
+                "wall_s": wall,
+                "cpu_s": cpu1 - cpu0,
+                "peak_rss_mb": rss,
+            },
+            f,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Fixture corpus: recorded (or synthetic) pages keyed by their original URL.
+
+A corpus directory holds routes.json ({url: relative file}) plus the page
+files, named <site>/<kind>-<sha1>.html so tools can glob by kind (e.g.
+bench_extract.py reads xamvn/thread-*.html). Record real pages with
+
+  python3 bench/run_bench.py --record bench/fixtures
+
+(needs network), or let run_bench.py build a synthetic corpus on the fly.
+"""
+
+import hashlib, json, os
+from urllib.parse import unquote, urlparse
+
+from bench import synthetic
+
+ROUTES = "routes.json"
+
+
+def url_key(url):
+    """Route key: unquoted URL, so requests/httpx encodings map the same."""
+    return unquote(url)
+
+
+def url_kind(url):
+    u = urlparse(url)
+    host, path = u.netloc, u.path
+    if "xamvn" in host:
+        site = "xamvn"
+        kind = "thread" if "/threads/" in path else "listing"
+    elif host.endswith("anh.moe") and not host.startswith("cdn"):
+        site = "anhmoe"
+        first = path.strip("/").split("/", 1)[0] or "home"
+        kind = first if first in ("view", "album", "category", "search") else "user"
+    else:
+        site, kind = "other", "page"
+    return site, kind
+
+
+class Corpus:
+    def __init__(self, root):
+        self.root = root
+        self.routes = {}
+        path = os.path.join(root, ROUTES)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.routes = json.load(f)
+
+    def __len__(self):
+        return len(self.routes)
+
+    def get(self, url):
+        """Return the stored body for url, or None."""
+        rel = self.routes.get(url_key(url))
+        if rel is None:
+            return None
+        with open(os.path.join(self.root, rel), encoding="utf-8") as f:
+            return f.read()
+
+    def put(self, url, body):
+        site, kind = url_kind(url)
+        digest = hashlib.sha1(url_key(url).encode("utf-8")).hexdigest()[:12]
+        rel = f"{site}/{kind}-{digest}.html"
+        os.makedirs(os.path.join(self.root, site), exist_ok=True)
+        with open(os.path.join(self.root, rel), "w", encoding="utf-8") as f:
+            f.write(body)
+        self.routes[url_key(url)] = rel
+
+    def save(self):
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, ROUTES), "w", encoding="utf-8") as f:
+            json.dump(self.routes, f, ensure_ascii=False, indent=1, sort_keys=True)
+
+
+# ── synthetic corpus matching the run_bench.py scenarios ─────
+FORUM_URL = "https://xamvn.bond/forums/3/"
+ANHMOE = "https://anh.moe"
+LISTING_PAGES = 5
+ALBUM_PAGES = 3
+SYNTHETIC_TARGETS = {
+    # scenario → (listing path, pages, video cards?)
+    "album": ("/album/Bench-Album.b3nch", ALBUM_PAGES, True),
+    "user": ("/benchuser", ALBUM_PAGES, True),
+    "category": ("/category/bench/", ALBUM_PAGES, False),
+    "images": ("/album/Bench-Images.b3nc1", ALBUM_PAGES, False),
+}
+
+
+def build_synthetic(root):
+    """Write a synthetic corpus for every benchmark scenario into root."""
+    from bs4 import BeautifulSoup  # only used to discover generated links
+
+    corpus = Corpus(root)
+    per_page = 20
+    first_id = 300000
+    for page in range(1, LISTING_PAGES + 1):
+        url = FORUM_URL if page == 1 else f"{FORUM_URL}page-{page}"
+        corpus.put(url, synthetic.forum_listing_page(page, LISTING_PAGES, per_page, first_id))
+        for n in range(per_page):
+            tid = first_id - (page - 1) * per_page - n
+            pages = 2 if tid % 3 == 0 else 1
+            for p in range(1, pages + 1):
+                turl = f"https://xamvn.bond/threads/{tid}/" + (f"page-{p}" if p > 1 else "")
+                corpus.put(turl, synthetic.thread_page(tid, p, 20, has_next=p < pages))
+
+    for path, pages, video in SYNTHETIC_TARGETS.values():
+        for page in range(1, pages + 1):
+            if page == 1:
+                url = ANHMOE + path
+            else:
+                sep = "&" if "?" in path else "?"
+                url = f"{ANHMOE}{path}{sep}page={page}&seek=2025-07-30+05:08:{page - 1:02d}.x{page - 1}"
+            html = synthetic.anhmoe_listing_page(path, page, pages, video=video)
+            corpus.put(url, html)
+            for a in BeautifulSoup(html, "html.parser").select("a[href^='/view/']"):
+                slug = a["href"].rsplit("/", 1)[-1]
+                corpus.put(ANHMOE + a["href"], synthetic.anhmoe_view_page(slug, video))
+    corpus.save()
+    return corpus
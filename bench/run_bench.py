@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+End-to-end crawler benchmark against a local fixture server.
+
+Usage:
+  python3 bench/run_bench.py [--fixtures DIR] [--only NAME[,NAME]] [--json OUT]
+  python3 bench/run_bench.py --record DIR [--only NAME]   # needs network
+
+Each scenario runs the real script (bench/child.py) in a scratch directory
+holding copies of videos.json / tags-data.js, with every HTTP request
+served from the corpus. Reported per scenario: pages fetched, wall time,
+pages/sec, CPU ms per page (user+sys), and peak RSS.
+
+Without --fixtures, bench/fixtures is used if it holds a recorded corpus,
+otherwise a synthetic corpus is generated into a temp dir. --record runs
+the scenarios' record arguments against the live sites, politely (delays
+kept), and saves pages, arguments and input files into DIR for replay.
+"""
+
+import json, os, shutil, subprocess, sys, tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.corpus import ANHMOE, SYNTHETIC_TARGETS, Corpus, build_synthetic
+from bench.server import serve
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, "bench", "fixtures")
+SCENARIOS_FILE = "scenarios.json"
+INPUT_DIR = "inputs"
+INPUT_FILES = ("videos.json", "tags-data.js")
+FAST = ["--rate", "1000"]  # token buckets must not throttle the replay
+
+# name → (argv for a synthetic corpus, argv for --record)
+SCENARIOS = {
+    "crawl_videos": (
+        ["crawl_videos.py", "--new-topics"] + FAST,
+        ["crawl_videos.py", "--new-topics"],
+    ),
+    "anhmoe_videos": (
+        ["crawl_anhmoe_videos.py", ANHMOE + SYNTHETIC_TARGETS["album"][0], "Bench Videos"] + FAST,
+        ["crawl_anhmoe_videos.py", "https://anh.moe/album/C%C3%81C-VIDEO-HAY.s6C6", "Phim Âu Mỹ"],
+    ),
+    "anhmoe_videos_fast": (
+        ["crawl_anhmoe_videos.py", ANHMOE + SYNTHETIC_TARGETS["album"][0], "Bench Videos", "--fast"] + FAST,
+        ["crawl_anhmoe_videos.py", "https://anh.moe/album/C%C3%81C-VIDEO-HAY.s6C6", "Phim Âu Mỹ", "--fast"],
+    ),
+    "anhmoe_user": (
+        ["crawl_anhmoe_user.py", ANHMOE + SYNTHETIC_TARGETS["user"][0], "bench-user", "3"] + FAST,
+        ["crawl_anhmoe_user.py", "https://anh.moe/maihuyhoang", "Clip-Tiktok", "3"],
+    ),
+    "anhmoe_category": (
+        ["crawl_anhmoe_category.py", ANHMOE + SYNTHETIC_TARGETS["category"][0], "bench-cat", "3"] + FAST,
+        ["crawl_anhmoe_category.py", "https://anh.moe/category/sfw/", "girl-xinh", "3"],
+    ),
+    "anhmoe_category_fast": (
+        ["crawl_anhmoe_category.py", ANHMOE + SYNTHETIC_TARGETS["category"][0], "bench-cat", "3", "--fast"] + FAST,
+        ["crawl_anhmoe_category.py", "https://anh.moe/category/sfw/", "girl-xinh", "3", "--fast"],
+    ),
+    "anhmoe_album": (
+        ["crawl_anhmoe_album.py", ANHMOE + SYNTHETIC_TARGETS["images"][0], "bench-album"] + FAST,
+        ["crawl_anhmoe_album.py", "https://anh.moe/album/G%C3%81I-XINH-4.Ww3iH", "girl-xinh"],
+    ),
+    "clean_videos": (["clean_videos.py"], ["clean_videos.py"]),
+}
+
+
+def scratch_dir(corpus_dir):
+    """Temp cwd with copies of the input files (corpus snapshot, else repo)."""
+    work = tempfile.mkdtemp(prefix="bench-")
+    for name in INPUT_FILES:
+        src = os.path.join(corpus_dir, INPUT_DIR, name)
+        if not os.path.exists(src):
+            src = os.path.join(ROOT, name)
+        if os.path.exists(src):
+            shutil.copy2(src, os.path.join(work, name))
+    return work
+
+
+def run_child(name, argv, corpus_dir, port=None, record=False):
+    work = scratch_dir(corpus_dir)
+    out = os.path.join(work, "bench-stats.json")
+    cmd = [sys.executable, os.path.join(ROOT, "bench", "child.py"), "--out", out]
+    cmd += ["--record", corpus_dir] if record else ["--port", str(port)]
+    with open(os.path.join(work, "bench.log"), "w") as log:
+        subprocess.run(cmd + ["--"] + argv, cwd=work, stdout=log, stderr=subprocess.STDOUT)
+    try:
+        with open(out, encoding="utf-8") as f:
+            stats = json.load(f)
+    except (OSError, ValueError):
+        stats = {"script": argv[0], "exit": "crash"}
+    stats["name"] = name
+    stats["log"] = os.path.join(work, "bench.log")
+    return stats
+
+
+def record(corpus_dir, names):
+    """Run the record argv of each scenario live and save the corpus."""
+    os.makedirs(os.path.join(corpus_dir, INPUT_DIR), exist_ok=True)
+    for name in INPUT_FILES:
+        if os.path.exists(os.path.join(ROOT, name)):
+            shutil.copy2(os.path.join(ROOT, name), os.path.join(corpus_dir, INPUT_DIR, name))
+    args = {}
+    for name in names:
+        argv = SCENARIOS[name][1]
+        print(f"[record] {name}: {' '.join(argv)}")
+        stats = run_child(name, argv, corpus_dir, record=True)
+        print(f"  → {stats.get('pages', 0)} pages (log: {stats['log']})")
+        args[name] = argv
+    with open(os.path.join(corpus_dir, SCENARIOS_FILE), "w", encoding="utf-8") as f:
+        json.dump(args, f, ensure_ascii=False, indent=2)
+    print(f"\nCorpus: {len(Corpus(corpus_dir))} pages → {corpus_dir}")
+
+
+def report(results):
+    head = f"{'scenario':<22}{'exit':>10}{'pages':>7}{'miss':>6}{'wall s':>9}{'pages/s':>9}{'CPU ms/pg':>11}{'RSS MB':>8}"
+    print(head)
+    print("-" * len(head))
+    for r in results:
+        pages = r.get("pages", 0)
+        wall = r.get("wall_s", 0)
+        rate = f"{pages / wall:.1f}" if pages and wall else "-"
+        cpu = f"{1000 * r['cpu_s'] / pages:.2f}" if pages else f"{1000 * r.get('cpu_s', 0):.0f} tot"
+        print(
+            f"{r['name']:<22}{str(r.get('exit')):>10}{pages:>7}{r.get('errors', 0):>6}"
+            f"{wall:>9.2f}{rate:>9}{cpu:>11}{r.get('peak_rss_mb', 0):>8.1f}"
+        )
+
+
+def main():
+    args = sys.argv[1:]
+
+    def opt(flag, default=None):
+        return args[args.index(flag) + 1] if flag in args else default
+
+    names = list(SCENARIOS)
+    if opt("--only"):
+        names = [n for n in opt("--only").split(",") if n in SCENARIOS]
+
+    if opt("--record"):
+        record(opt("--record"), names)
+        return
+
+    corpus_dir = opt("--fixtures")
+    if corpus_dir is None and os.path.exists(os.path.join(FIXTURES, "routes.json")):
+        corpus_dir = FIXTURES
+    argv_for = {n: SCENARIOS[n][0] for n in names}
+    if corpus_dir is None:
+        corpus_dir = tempfile.mkdtemp(prefix="bench-corpus-")
+        build_synthetic(corpus_dir)
+        print(f"Synthetic corpus → {corpus_dir}")
+    else:
+        with open(os.path.join(corpus_dir, SCENARIOS_FILE), encoding="utf-8") as f:
+            recorded = json.load(f)
+        names = [n for n in names if n in recorded]
+        argv_for = {n: recorded[n] for n in names}
+
+    corpus = Corpus(corpus_dir)
+    srv = serve(corpus)
+    print(f"Serving {len(corpus)} pages on 127.0.0.1:{srv.port}\n")
+    results = []
+    for name in names:
+        results.append(run_child(name, argv_for[name], corpus_dir, port=srv.port))
+        print(f"  {name}: done ({results[-1]['log']})")
+    print()
+    report(results)
+    if opt("--json"):
+        with open(opt("--json"), "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for xamvn.bond / anh.moe serving a fixture corpus.
+
+Requests arrive as  GET /fx/<percent-encoded original URL>  (bench/child.py
+rewrites every crawler request that way) and are answered from the
+corpus; unknown URLs get a 404 and are counted as misses.
+
+Standalone:
+  python3 bench/server.py [corpus_dir] [--port N]
+"""
+
+import os, sys, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.corpus import Corpus
+
+PREFIX = "/fx/"
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        srv = self.server
+        body = None
+        if self.path.startswith(PREFIX):
+            body = srv.corpus.get(unquote(self.path[len(PREFIX) :]))
+        with srv.lock:
+            if body is None:
+                srv.misses += 1
+            else:
+                srv.hits += 1
+        if body is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(corpus, port=0):
+    """Start the server in a daemon thread; returns the server (see .port)."""
+    srv = ThreadingHTTPServer(("127.0.0.1", port), FixtureHandler)
+    srv.daemon_threads = True
+    srv.corpus = corpus
+    srv.hits = srv.misses = 0
+    srv.lock = threading.Lock()
+    srv.port = srv.server_address[1]
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    port = 8765
+    if "--port" in args:
+        i = args.index("--port")
+        port = int(args[i + 1])
+        del args[i : i + 2]
+    corpus = Corpus(args[0] if args else os.path.join(os.path.dirname(__file__), "fixtures"))
+    srv = serve(corpus, port)
+    print(f"Serving {len(corpus)} fixture pages on http://127.0.0.1:{srv.port}{PREFIX}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,144 @@
+"""
+Deterministic synthetic pages shaped like the real sites.
+
+Used when no recorded fixtures are available (see bench/fixtures/). The
+markup mirrors what the crawlers key on — XenForo og:title/<title>/
+h1.p-title-value, bbWrapper posts with <video>/<source>, data-* attrs,
+pageNav links — padded with the usual chrome so parse cost is realistic.
+"""
+
+import json, random
+from urllib.parse import quote
+
+_WORDS = (
+    "clip viet gai xinh video hay moi nhat full hd link cdn xem ngay "
+    "thread reply quote like share bao cao chu de dien dan"
+).split()
+
+
+def _words(rng, n):
+    return " ".join(rng.choice(_WORDS) for _ in range(n))
+
+
+def thread_page(tid, page=1, posts=20, has_next=False, seed=0):
+    """One XenForo thread page with `posts` posts, some carrying mp4s."""
+    rng = random.Random(f"{tid}:{page}:{seed}")
+    title = f"Thread {tid} {_words(rng, 5)}"
+    out = [
+        "<!DOCTYPE html><html lang='vi'><head><meta charset='utf-8'>",
+        f"<title>{title} | XAMVN</title>",
+        f"<meta property='og:title' content='Clip - {title} | Xamvn - Dien dan'>",
+        f"<link rel='canonical' href='https://xamvn.bond/threads/{tid}/'>",
+        "<script>window.XF = {config: {url: {fullBase: 'https://xamvn.bond/'}}};</script>",
+        "</head><body><div class='p-body'><div class='p-title'>",
+        f"<h1 class='p-title-value'><span class='label'>Clip</span> {title}</h1></div>",
+    ]
+    for n in range(posts):
+        out.append(
+            f"<article class='message message--post' data-author='user{n}' "
+            f"id='js-post-{tid}{page}{n}'><div class='message-inner'>"
+            f"<div class='message-cell message-cell--user'><a href='/members/u.{n}/' "
+            f"class='username'>user{n}</a></div><div class='message-content'>"
+            f"<div class='bbWrapper'>{_words(rng, 60)}"
+        )
+        if rng.random() < 0.4:
+            vid = f"https://cdn.save.moe/s3/{tid}{page}{n}.mp4"
+            out.append(
+                f"<div class='bbMediaWrapper'><video controls data-src='{vid}'>"
+                f"<source src='{vid}' type='video/mp4'></video></div>"
+            )
+        if rng.random() < 0.2:
+            out.append(
+                f"<a href='https://cdn.anh.moe/s11/{tid}x{n}.mp4' class='link'>link</a>"
+            )
+        out.append(
+            "</div></div><footer class='message-footer'><ul class='reactions'>"
+            + "".join(f"<li><a href='/posts/{n}/react?r={r}'>{r}</a></li>" for r in range(6))
+            + "</ul></footer></div></article>"
+        )
+    out.append("<div class='pageNav'>")
+    if has_next:
+        out.append(
+            f"<a class='pageNav-jump pageNav-jump--next' "
+            f"href='/threads/{tid}/page-{page + 1}'>Next</a>"
+        )
+    out.append("</div></div></body></html>")
+    return "".join(out)
+
+
+def forum_listing_page(page, pages, per_page=20, first_id=300000):
+    """XenForo forum listing page `page` of `pages` (newest thread IDs first)."""
+    rng = random.Random(f"listing:{page}")
+    out = [
+        "<!DOCTYPE html><html><head><title>Clip | XAMVN</title></head><body>",
+        "<div class='structItemContainer'>",
+    ]
+    for n in range(per_page):
+        tid = first_id - (page - 1) * per_page - n
+        out.append(
+            f"<div class='structItem structItem--thread js-inlineModContainer'>"
+            f"<div class='structItem-title'><a href='/threads/{tid}/' "
+            f"data-tp-primary='on'>Thread {tid} {_words(rng, 6)}</a></div>"
+            f"<div class='structItem-minor'><a href='/threads/{tid}/latest'>latest</a>"
+            f" · <a href='/members/u.{n}/'>user{n}</a></div></div>"
+        )
+    out.append("</div><div class='pageNav'>")
+    if page < pages:
+        out.append(
+            f"<a class='pageNav-jump pageNav-jump--next' "
+            f"href='/forums/3/page-{page + 1}'>Next</a>"
+        )
+    out.append("</div></body></html>")
+    return "".join(out)
+
+
+def anhmoe_listing_page(path, page, pages, per_page=24, video=False, seed=0):
+    """Chevereto-style album/category/user listing with /view/ cards."""
+    rng = random.Random(f"{path}:{page}:{seed}")
+    sep = "&" if "?" in path else "?"
+    out = ["<!DOCTYPE html><html><head><title>anh.moe</title></head><body>"]
+    for n in range(per_page):
+        vid = f"{page:03d}{n:02d}{rng.randrange(10**6):06d}"
+        slug = f"Item-{page}-{n}-{_words(rng, 3).replace(' ', '-')}.v{vid}"
+        thumb = f"https://cdn.save.moe/b/{vid}.th.jpg"
+        # most cards embed their file URL (Chevereto data-object), some don't
+        obj = ""
+        if rng.random() < 0.8:
+            media = (
+                f"https://cdn.save.moe/s3/v{vid}.mp4"
+                if video
+                else f"https://cdn.anh.moe/f/v{vid}.jpeg"
+            )
+            obj = " data-object='" + quote(json.dumps({"url": media, "id_encoded": vid})) + "'"
+        for _ in range(2):  # each card links its view page twice
+            out.append(
+                f"<div class='list-item' data-type='{'video' if video else 'image'}'{obj}>"
+                f"<a href='/view/{slug}' class='image-container'>"
+                f"<img src='{thumb}' alt='{slug}'></a></div>"
+            )
+    if page < pages:
+        out.append(
+            f"<a data-pagination='next' href='{path}{sep}page={page + 1}"
+            f"&seek=2025-07-30+05:08:{page:02d}.x{page}'>Next</a>"
+        )
+    out.append("</body></html>")
+    return "".join(out)
+
+
+def anhmoe_view_page(slug, video=False):
+    """anh.moe /view/ page with the ?dl= download anchor."""
+    vid = slug.rsplit(".", 1)[-1]
+    if video:
+        media = f"https://cdn.save.moe/s3/{vid}.mp4"
+        body = f"<video src='{media}' controls></video>"
+    else:
+        media = f"https://cdn.anh.moe/f/{vid}.jpeg"
+        body = f"<img src='https://cdn.save.moe/b/{vid}.md.jpg'>"
+    return (
+        "<!DOCTYPE html><html><head>"
+        f"<title>{slug} - anh.moe</title>"
+        f"<meta property='og:image' content='https://cdn.save.moe/b/{vid}.jpg'>"
+        "</head><body><div class='image-viewer'>"
+        f"{body}</div><a href='{media}?dl=1' class='btn-download'>Download</a>"
+        "</body></html>"
+    )
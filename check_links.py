@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Probe every stored media URL and report / prune the dead ones.
+
+Sources: the videos of every thread in videos.json (+ pending journal) and
+TAGS_DATA.album_items / video_items in tags-data.js. Each distinct URL gets
+a HEAD (or, where HEAD is refused, a 1-byte Range GET whose body is never
+read), redirects followed; status, size, content-type and final host are
+appended to linkcheck.jsonl as they come in. Each probe carries the
+Referer of the site that embeds the URL (anh.moe for its CDNs, the forum
+otherwise), as the CDNs' hotlink protection expects. Requests are pooled
+and concurrent (crawlcore.aiofetch.run_pipeline), with a separate token
+bucket per CDN host, and hosts are interleaved so one slow CDN does not
+stall the rest.
+
+Rerunning resumes: URLs with a final answer in linkcheck.jsonl are not
+probed again (network errors, 5xx and 429 are retried, with backoff or
+as long as Retry-After asks; a CDN that keeps failing is paused as a
+whole); --recheck starts over.
+
+A URL is dead on a 4xx other than 429 (or 416, a range quirk); errors
+and 5xx are reported as unknown and never pruned. A 403 only counts once
+it was answered to a request with a Referer (older records without one
+are probed again). Output:
+
+  linkcheck-report.json   per-host / per-status counts + every dead URL
+  videos.pruned.json      videos.json without dead videos
+  tags-items.pruned.json  album_items / video_items without dead URLs
+
+--apply writes the pruned data back instead (videos through the store,
+tags-data.js under its lock).
+
+Usage:
+  python3 check_links.py [--videos-only | --tags-only] [--workers N] [--rate R]
+                         [--limit N] [--recheck] [--apply]
+"""
+
+import asyncio, json, os, sys, time
+from collections import Counter, defaultdict, deque
+from urllib.parse import urlparse
+
+import httpx
+
+from crawlcore.aiofetch import pop_flag, run_pipeline
+from crawlcore.atomicio import atomic_write
+from crawlcore.fetch import headers
+from crawlcore.store import VideoStore, vid_url
+from crawlcore.tagsdata import TAGS_FILE, read_tags_data, update_tags_file
+
+HEADERS = headers()
+RESULTS = "linkcheck.jsonl"
+REPORT = "linkcheck-report.json"
+PRUNED_VIDEOS = "videos.pruned.json"
+PRUNED_TAGS = "tags-items.pruned.json"
+WORKERS = 16  # probes in flight (--workers N)
+RATE = 4.0  # req/s per CDN host (--rate R)
+RETRIES = 3
+HEAD_REFUSED = {403, 405, 501}  # retry these with a Range GET
+ANHMOE_REFERER = "https://anh.moe/"
+FORUM_REFERER = "https://xamvn.bond/"
+ANHMOE_HOSTS = ("anh.moe", "save.moe", "anhmoe.sbs")  # CDN host suffixes
+
+
+# ── collecting URLs ───────────────────────────────────────
+def collect(videos=True, tags=True):
+    """Return {url: [where, ...]} over the chosen datasets."""
+    where = defaultdict(list)
+    if videos:
+        for t in VideoStore().threads:
+            for v in t.get("videos", []):
+                u = vid_url(v)
+                if u.startswith("http"):
+                    where[u].append("videos:" + t.get("title", ""))
+    if tags and os.path.exists(TAGS_FILE):
+        data = read_tags_data() or {}
+        for field in ("album_items", "video_items"):
+            for tag, items in data.get(field, {}).items():
+                for v in items:
+                    u = vid_url(v)
+                    if u.startswith("http"):
+                        where[u].append(f"{field}:{tag}")
+    return where
+
+
+def interleave(urls):
+    """Round-robin over hosts so every CDN's budget is used concurrently."""
+    by_host = defaultdict(deque)
+    for u in urls:
+        by_host[urlparse(u).netloc].append(u)
+    queues = deque(by_host.values())
+    while queues:
+        q = queues.popleft()
+        yield q.popleft()
+        if q:
+            queues.append(q)
+
+
+def referer(url):
+    """Referer of the site that embeds `url`."""
+    host = urlparse(url).netloc.lower()
+    return ANHMOE_REFERER if host.endswith(ANHMOE_HOSTS) else FORUM_REFERER
+
+
+# ── results ───────────────────────────────────────────────
+def _unconfirmed(rec):
+    """A 403 to a request without Referer may just be hotlink protection."""
+    return rec.get("status") == 403 and not rec.get("referer")
+
+
+def is_final(rec):
+    """Answers worth keeping across runs (errors/5xx/429 are retried)."""
+    s = rec.get("status")
+    return s is not None and s < 500 and s != 429 and not _unconfirmed(rec)
+
+
+def is_dead(rec):
+    s = rec.get("status")
+    return (
+        s is not None
+        and 400 <= s < 500
+        and s not in (416, 429)
+        and not _unconfirmed(rec)
+    )
+
+
+def load_results(path=RESULTS):
+    results = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue  # torn line from an interrupted run
+                results[rec["url"]] = rec
+    return results
+
+
+# ── probing ───────────────────────────────────────────────
+def _size(r):
+    rng = r.headers.get("Content-Range", "")
+    if "/" in rng and rng.rsplit("/", 1)[1].isdigit():
+        return int(rng.rsplit("/", 1)[1])
+    n = r.headers.get("Content-Length")
+    return int(n) if n and n.isdigit() and r.status_code != 206 else None
+
+
+async def probe(fetcher, url):
+    ref = referer(url)
+    rec = {"url": url, "status": None}
+    for i in range(RETRIES):
+        await fetcher.hold(url)
+        retry_after = None
+        try:
+            r = await fetcher.client.head(url, headers={"Referer": ref})
+            method = "HEAD"
+            if r.status_code in HEAD_REFUSED:
+                await fetcher.hold(url)
+                async with fetcher.client.stream(
+                    "GET", url, headers={"Referer": ref, "Range": "bytes=0-0"}
+                ) as r:
+                    pass  # headers are enough; the body is never read
+                method = "RANGE"
+            rec = {
+                "url": url,
+                "status": r.status_code,
+                "method": method,
+                "size": _size(r),
+                "type": r.headers.get("Content-Type", "").split(";")[0] or None,
+                "host": r.url.host,
+                "redirects": len(r.history),
+                "referer": ref,
+            }
+            retry_after = r.headers.get("Retry-After")
+        except httpx.HTTPError as e:
+            rec = {"url": url, "status": None, "error": f"{type(e).__name__}: {e}"[:200]}
+        fetcher.policy.record(url, rec["status"], is_final(rec), retry_after)
+        if is_final(rec):
+            break
+        wait = fetcher.policy.delay(i, rec["status"], retry_after)
+        if wait is None:
+            break
+        await asyncio.sleep(wait)
+    rec["checked"] = int(time.time())
+    return rec
+
+
+def _check(urls, workers, rate, on_result):
+    async def produce(fetcher, emit):
+        for u in urls:
+            await emit(u)
+
+    run_pipeline(
+        produce,
+        None,
+        HEADERS,
+        workers,
+        rate,
+        2 * workers,
+        on_result=lambda url, fetched, rec: on_result(rec),
+        fetch=probe,
+    )
+
+
+def check(urls, results, workers=WORKERS, rate=RATE, path=RESULTS):
+    """Probe urls, appending each answer to `path` and to `results`."""
+    done = 0
+    alive = dead = unknown = 0
+    t0 = time.time()
+    with open(path, "a", encoding="utf-8") as out:
+
+        def on_result(rec):
+            nonlocal done, alive, dead, unknown
+            results[rec["url"]] = rec
+            out.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            out.flush()
+            done += 1
+            if is_dead(rec):
+                dead += 1
+            elif is_final(rec):
+                alive += 1
+            else:
+                unknown += 1
+            if done % 100 == 0 or done == len(urls):
+                rps = done / max(time.time() - t0, 1e-9)
+                print(
+                    f"  [{done}/{len(urls)}] alive {alive}  dead {dead}  "
+                    f"unknown {unknown}  ({rps:.1f}/s)"
+                )
+
+        if urls:
+            _check(list(interleave(urls)), workers, rate, on_result)
+        out.flush()
+        os.fsync(out.fileno())
+
+
+# ── report + pruning ──────────────────────────────────────
+def write_report(where, results, path=REPORT):
+    by_status = Counter()
+    by_host = defaultdict(Counter)
+    dead = []
+    for u in where:
+        rec = results.get(u)
+        if rec is None:
+            by_status["unchecked"] += 1
+            continue
+        status = rec.get("status")
+        by_status[str(status) if status is not None else "error"] += 1
+        verdict = "dead" if is_dead(rec) else "alive" if is_final(rec) else "unknown"
+        by_host[urlparse(u).netloc][verdict] += 1
+        if verdict == "dead":
+            dead.append(
+                {
+                    "url": u,
+                    "status": status,
+                    "final_host": rec.get("host"),
+                    "where": where[u],
+                }
+            )
+    report = {
+        "checked": sum(1 for u in where if u in results),
+        "total": len(where),
+        "by_status": dict(by_status.most_common()),
+        "by_host": {h: dict(c) for h, c in sorted(by_host.items())},
+        "dead": dead,
+    }
+    with atomic_write(path) as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return report
+
+
+def prune_items(data, dead):
+    """Drop dead URLs from TAGS_DATA album_items / video_items in place."""
+    removed = 0
+    for field in ("album_items", "video_items"):
+        for tag, items in data.get(field, {}).items():
+            kept = [v for v in items if vid_url(v) not in dead]
+            removed += len(items) - len(kept)
+            data[field][tag] = kept
+    return removed
+
+
+def prune(dead, videos=True, tags=True, apply=False):
+    if videos:
+        store = VideoStore()
+        removed = 0
+        for t in store.threads:
+            kept = [v for v in t.get("videos", []) if vid_url(v) not in dead]
+            if len(kept) != len(t.get("videos", [])):
+                removed += len(t["videos"]) - len(kept)
+                if apply:
+                    store.put(dict(t, videos=kept))
+                else:
+                    t["videos"] = kept
+        if apply:
+            store.export()
+            print(f"[prune] removed {removed} dead video(s) from {store.json_path}")
+        else:
+            with atomic_write(PRUNED_VIDEOS) as f:
+                json.dump(
+                    {"threads": store.threads, "total": store.total},
+                    f,
+                    ensure_ascii=False,
+                    indent=2,
+                )
+            print(f"[prune] {removed} dead video(s) left out → {PRUNED_VIDEOS}")
+    if tags and os.path.exists(TAGS_FILE):
+        if apply:
+            removed = update_tags_file(lambda data: prune_items(data, dead))
+            print(f"[prune] removed {removed} dead item(s) from {TAGS_FILE}")
+        else:
+            data = read_tags_data() or {}
+            removed = prune_items(data, dead)
+            items = {k: data.get(k, {}) for k in ("album_items", "video_items")}
+            with atomic_write(PRUNED_TAGS) as f:
+                json.dump(items, f, ensure_ascii=False, indent=2)
+            print(f"[prune] {removed} dead item(s) left out → {PRUNED_TAGS}")
+
+
+# ── main ──────────────────────────────────────────────────
+def main():
+    workers = pop_flag(sys.argv, "--workers", WORKERS, int)
+    rate = pop_flag(sys.argv, "--rate", RATE, float)
+    limit = pop_flag(sys.argv, "--limit", 0, int)
+    videos = "--tags-only" not in sys.argv
+    tags = "--videos-only" not in sys.argv
+    apply = "--apply" in sys.argv
+
+    if "--recheck" in sys.argv and os.path.exists(RESULTS):
+        os.remove(RESULTS)
+    where = collect(videos, tags)
+    results = load_results()
+    todo = [u for u in where if not is_final(results.get(u, {}))]
+    if limit:
+        todo = todo[:limit]
+
+    print("=" * 60)
+    print(f"URLs in dataset : {len(where)}")
+    print(f"Already checked : {len(where) - len(todo)}  ({RESULTS})")
+    print(f"To probe        : {len(todo)}  ({workers} in flight, {rate:g} req/s per host)")
+    print("=" * 60)
+    check(todo, results, workers, rate)
+
+    report = write_report(where, results)
+    print(f"\n[report] {REPORT}")
+    for host, c in report["by_host"].items():
+        print(
+            f"  {host:<28} alive {c.get('alive', 0):>6}  dead {c.get('dead', 0):>6}"
+            f"  unknown {c.get('unknown', 0):>6}"
+        )
+    dead = {d["url"] for d in report["dead"]}
+    print(f"  dead total: {len(dead)}")
+    prune(dead, videos, tags, apply)
+
+
+if __name__ == "__main__":
+    main()
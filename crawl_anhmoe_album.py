@@ -4,26 +4,25 @@ Crawl all image/video links from an anh.moe album.
 Output: prints full-res CDN URLs + collects unique IDs.
 
 Usage:
-  python3 crawl_anhmoe_album.py <album_url>
+  python3 crawl_anhmoe_album.py <album_url> [tag] [--rate R] [--max-rate M] [--fixed-rate] [--metrics FILE] [--profile MODE]
+
+Album pages start at --rate req/s (default 1) and adapt it to the site's
+latency and errors, up to --max-rate (default 2 × --rate); [rate] lines
+report each change. --fixed-rate keeps --rate throughout.
 
 Example:
   python3 crawl_anhmoe_album.py "https://anh.moe/album/G%C3%81I-XINH-4.Ww3iH"
 """
 
-import re, sys, time, json, os
-import requests
+import re, sys, json
 from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse, parse_qs
-
-HEADERS = {
-    "User-Agent": (
-        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-        "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
-    ),
-    "Referer": "https://anh.moe/",
-}
-BASE = "https://anh.moe"
-DELAY = 1.0
+
+from crawlcore.aiofetch import pop_rate_flags
+from crawlcore.anhmoe import PAGE_RATE, current_page_num, get, next_page_url, set_rate
+from crawlcore.atomicio import atomic_write
+from crawlcore.cards import full_res
+from crawlcore.metrics import metrics, pop_metrics_flags, profiled
+from crawlcore.tagsdata import add_tag_items
 
 # CDN image patterns — only /b/ bucket is a reliable image CDN.
 # /s11/ redirects to amvideos.cfd (video CDN, 404 for images)
@@ -33,48 +32,26 @@ CDN_IMG_RE = re.compile(
     re.I,
 )
 
-session = requests.Session()
-session.headers.update(HEADERS)
-
-
-def get(url, retries=3):
-    for i in range(retries):
-        try:
-            r = session.get(url, timeout=15)
-            r.raise_for_status()
-            return r
-        except Exception as e:
-            print(f"  [warn] {e} (attempt {i+1}/{retries})", file=sys.stderr)
-            time.sleep(2)
-    return None
-
-
-def full_res(url: str) -> str:
-    # strip .md. / .th. / .fr. size suffixes
-    return re.sub(r"\.(md|th|fr)\.", ".", url)
-
-
-def current_page_num(url: str) -> int:
-    """Extract ?page=N from URL, default 1."""
-    qs = parse_qs(urlparse(url).query)
-    try:
-        return int(qs.get("page", ["1"])[0])
-    except ValueError:
-        return 1
-
 
+@profiled
 def scrape_album_page(url):
     """Scrape one album page, return (full_res_images, next_page_url_or_None)."""
     r = get(url)
     if not r:
         return [], None
-    soup = BeautifulSoup(r.text, "html.parser")
+    with metrics.parsing(url):
+        return parse_album_page(url, r.text)
+
+
+def parse_album_page(url, html):
+    """Parse a fetched album page → (full_res_images, next_page_url_or_None)."""
+    soup = BeautifulSoup(html, "html.parser")
 
     # Collect CDN image links from raw HTML
     SKIP = {"favicon", "logo_", "default_", "system/", "svg/"}
     seen_raw, seen_fr = set(), set()
     results = []
-    for u in CDN_IMG_RE.findall(r.text):
+    for u in CDN_IMG_RE.findall(html):
         if u in seen_raw:
             continue
         seen_raw.add(u)
@@ -85,17 +62,8 @@ def scrape_album_page(url):
             seen_fr.add(fr)
             results.append(fr)
 
-    # Find next page: look for page=N+1 with seek= token
-    # MUST use N+1 from current URL — cannot just pick first page= link
-    n = current_page_num(url)
-    next_url = None
-    for a in soup.select("a[href]"):
-        href = a.get("href", "")
-        if f"page={n + 1}" in href and "seek=" in href:
-            next_url = urljoin(BASE, href)
-            break
-
-    return results, next_url
+    # Find next page: page=N+1 with its seek= token
+    return results, next_page_url(soup, current_page_num(url))
 
 
 def crawl_album(start_url):
@@ -115,8 +83,6 @@ def crawl_album(start_url):
         all_urls.extend(imgs)
         url = nxt
         page_num += 1
-        if nxt:
-            time.sleep(DELAY)
 
     # Final dedup maintaining order
     seen = set()
@@ -129,54 +95,10 @@ def crawl_album(start_url):
     return deduped
 
 
-# ── TAGS-DATA UPDATER ──────────────────────────────────────
-def update_tags_data(tag: str, new_ids: list, tags_file="tags-data.js"):
-    """
-    anh.moe images don't have integer IDs like xamvn — they use CDN URLs.
-    We store the URLs directly in a separate key in TAGS_DATA.
-    Format: TAGS_DATA.album_items[tag] = ["https://...", ...]
-    """
-    if not os.path.exists(tags_file):
-        print(f"[warn] {tags_file} not found, skipping update.")
-        return
-
-    with open(tags_file, encoding="utf-8") as f:
-        content = f.read()
-
-    # Parse existing JSON blob
-    m = re.search(r"window\.TAGS_DATA\s*=\s*(\{.*\})\s*;", content, re.DOTALL)
-    if not m:
-        print("[error] Could not parse TAGS_DATA from tags-data.js")
-        return
-
-    data = json.loads(m.group(1))
-
-    # Append to existing album_items (deduplicate, preserve order)
-    if "album_items" not in data:
-        data["album_items"] = {}
-    existing = data["album_items"].get(tag, [])
-    existing_set = set(existing)
-    appended = [u for u in new_ids if u not in existing_set]
-    data["album_items"][tag] = existing + appended
-    print(
-        f"  (existing: {len(existing)}, new: {len(appended)}, total: {len(data['album_items'][tag])})"
-    )
-
-    # Rewrite file
-    new_json = json.dumps(data, ensure_ascii=False, indent=2)
-    new_content = (
-        f"// Auto-generated by indexlocal.html\nwindow.TAGS_DATA = {new_json};\n"
-    )
-    with open(tags_file, "w", encoding="utf-8") as f:
-        f.write(new_content)
-
-    print(
-        f"\n[tags-data.js] Updated album_items['{tag}'] (+{len(new_ids)} new → {len(data['album_items'][tag])} total) → {tags_file}"
-    )
-
-
 # ── MAIN ──────────────────────────────────────────────────
 if __name__ == "__main__":
+    pop_metrics_flags(sys.argv)
+    set_rate(*pop_rate_flags(sys.argv, PAGE_RATE))
     album_url = (
         sys.argv[1]
         if len(sys.argv) > 1
@@ -212,7 +134,7 @@ if __name__ == "__main__":
 
     # Save result to JSON for inspection
     out_file = "anhmoe_album_urls.json"
-    with open(out_file, "w", encoding="utf-8") as f:
+    with atomic_write(out_file) as f:
         json.dump(
             {"tag": tag, "album": album_url, "urls": urls},
             f,
@@ -221,5 +143,5 @@ if __name__ == "__main__":
         )
     print(f"\nSaved all URLs → {out_file}")
 
-    # Update tags-data.js
-    update_tags_data(tag, urls)
+    # Update tags-data.js (album tags are not added to the tag list)
+    add_tag_items(tag, urls, register=False)
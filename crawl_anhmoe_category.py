@@ -7,7 +7,20 @@ Each listing page → collect /view/ links → visit each view page
 Appends to album_items[tag] in tags-data.js (deduplicates).
 
 Usage:
-  python3 crawl_anhmoe_category.py <start_url> [tag] [max_pages]
+  python3 crawl_anhmoe_category.py <start_url> [tag] [max_pages] [--workers N] [--rate R] [--max-rate M] [--fixed-rate] [--metrics FILE] [--profile MODE] [--depth N] [--restart] [--no-index] [--fast]
+
+Progress is journaled under .frontier/ (see crawlcore/frontier.py): rerunning
+the same start_url + tag resumes at the last listing page's seek= cursor
+and skips view pages already scraped. --restart discards that state.
+View pages resolved by any earlier crawl are answered from
+anhmoe_view_index.jsonl without a request; --no-index re-fetches them.
+--fast takes the image URL straight from listing card data where possible
+and only visits the view pages it cannot resolve (hit rate is reported).
+Listing and view requests start at --rate req/s and adapt it to the site's
+latency and errors, up to --max-rate (default 2 × --rate); [rate] lines
+report each change. --fixed-rate keeps --rate throughout.
+--metrics FILE appends per-request JSONL events (crawlcore/metrics.py);
+--profile cprofile|pyinstrument profiles parse_view_page.
 
 Example (SFW, start from page 3 which is first page with images):
   python3 crawl_anhmoe_category.py \
@@ -15,174 +28,148 @@ Example (SFW, start from page 3 which is first page with images):
     "girl-xinh" 300
 """
 
-import re, sys, time, json, os
-import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse, parse_qs
-
-HEADERS = {
-    "User-Agent": (
-        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-        "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
-    ),
-    "Referer": "https://anh.moe/",
-}
-BASE = "https://anh.moe"
-DELAY_PAGE = 1.0  # between listing pages
+import re, sys, json
+
+from crawlcore.aiofetch import pop_flag, pop_rate_flags, run_pipeline
+from crawlcore.anhmoe import BASE, HEADERS, IMG_CDN_RE, current_page_num
+from crawlcore.anhmoe import parse_listing, view_media
+from crawlcore.atomicio import atomic_write
+from crawlcore.cards import HitRate, resolve_cards
+from crawlcore.frontier import Frontier
+from crawlcore.metrics import pop_metrics_flags, profiled
+from crawlcore.tagsdata import add_tag_items
+from crawlcore.viewindex import ViewIndex, entry_media
+
 DELAY_VIEW = 0.5  # between view page visits
+VIEW_WORKERS = 4  # view pages in flight (--workers N)
+VIEW_RATE = 1 / DELAY_VIEW  # starting req/s, listing + view pages (--rate R)
+QUEUE_DEPTH = 48  # view URLs the listing walker may queue ahead (--depth N)
 
-# Image CDN: cdn.anh.moe/f/  (e.g. https://cdn.anh.moe/f/mcF5pEO.jpeg)
-IMG_CDN_RE = re.compile(r"^https://cdn\.anh\.moe/f/", re.I)
 # Video CDNs to skip
 VID_CDN_RE = re.compile(
     r"cdn\.save\.moe|anh-cdn\.cyou|amvideos\.cfd|cdn\.anh\.moe/s", re.I
 )
 
-session = requests.Session()
-session.headers.update(HEADERS)
-
-
-def get(url, retries=3):
-    for i in range(retries):
-        try:
-            r = session.get(url, timeout=15)
-            r.raise_for_status()
-            return r
-        except Exception as e:
-            print(f"  [warn] {e} (attempt {i+1}/{retries})", file=sys.stderr)
-            time.sleep(2)
-    return None
 
-
-def current_page_num(url: str) -> int:
-    qs = parse_qs(urlparse(url).query)
-    try:
-        return int(qs.get("page", ["1"])[0])
-    except ValueError:
-        return 1
-
-
-def scrape_view_page(view_url: str):
-    """Visit a /view/ page, return image URL or None."""
-    r = get(view_url)
-    if not r:
+@profiled
+def parse_view_page(view_url: str, html):
+    """Parse an already-fetched view page, return image URL or None."""
+    if not html:
         return None
-    soup = BeautifulSoup(r.text, "html.parser")
-    for a in soup.select("a[href*='?dl=']"):
-        href = a.get("href", "")
-        if IMG_CDN_RE.match(href):
-            return href.split("?")[0]  # strip ?dl=1
-    return None
-
-
-def scrape_listing_page(url):
-    """Scrape one category listing page.
-    Returns (image_urls, next_page_url_or_None).
+    media = view_media(html, prefer="image")  # ?dl=1 stripped
+    return media if media and IMG_CDN_RE.match(media) else None
+
+
+def from_index(view_url, entry):
+    """What parse_view_page() returns for a page already in the view index."""
+    media = entry_media(entry, prefer="image")
+    return media if media and IMG_CDN_RE.match(media) else None
+
+
+def crawl_category(
+    frontier,
+    max_pages=300,
+    workers=VIEW_WORKERS,
+    rate=VIEW_RATE,
+    depth=QUEUE_DEPTH,
+    index=None,
+    fast=False,
+    max_rate=None,
+):
+    """Walk listing pages from the frontier cursor while workers scrape views.
+
+    The listing walker runs ahead, feeding view URLs into a queue of at most
+    `depth` entries that `workers` view fetchers drain, so wall time tends to
+    max(listing, views / workers) instead of their sum. Listing and view
+    requests share the per-host `rate` budget (adaptive up to `max_rate`
+    when given). Every listing page and view
+    result is journaled, so an interrupted run picks up at the same cursor
+    without re-fetching finished view pages. With a ViewIndex, pages it
+    already knows are settled from it and never queued. With fast=True,
+    cards whose cdn.anh.moe/f/ URL can be read off the listing page itself
+    (crawlcore.cards) are settled too; only the rest cost a view fetch.
     """
-    r = get(url)
-    if not r:
-        return [], None
-    soup = BeautifulSoup(r.text, "html.parser")
-
-    # Unique /view/ links (each card appears twice in HTML)
-    view_links = list(
-        dict.fromkeys(a.get("href") for a in soup.select("a[href^='/view/']"))
-    )
-
-    images = []
-    for i, vpath in enumerate(view_links):
-        vurl = urljoin(BASE, vpath)
-        img_url = scrape_view_page(vurl)
+    scraped = known = 0
+    hits = HitRate()
+    parse = index.indexing(parse_view_page) if index is not None else parse_view_page
+
+    def settle(urls):
+        nonlocal known
+        if index is None:
+            return urls
+        todo = frontier.settle(urls, index, from_index)
+        known += len(urls) - len(todo)
+        return todo
+
+    def record(vurl, fetched, img_url):
+        nonlocal scraped
+        if fetched:
+            frontier.done(vurl, img_url)
+        else:
+            frontier.failed(vurl)
+        scraped += 1
         status = f"✓  {img_url[-40:]}" if img_url else "✗  (video/skip)"
-        print(f"  [{i+1:2d}/{len(view_links)}] {status}")
-        if img_url:
-            images.append(img_url)
-        time.sleep(DELAY_VIEW)
-
-    # Next page: page=N+1 with seek= token
-    n = current_page_num(url)
-    next_url = None
-    for a in soup.select("a[href]"):
-        href = a.get("href", "")
-        if f"page={n + 1}" in href and "seek=" in href:
-            next_url = urljoin(BASE, href)
-            break
-
-    return images, next_url
-
-
-def crawl_category(start_url, max_pages=300):
-    all_urls = []
-    seen_pages = set()
-    url = start_url
-    page_num = current_page_num(start_url)
-    pages_crawled = 0
-
-    while url and pages_crawled < max_pages:
-        if url in seen_pages:
-            print("  [loop detected] stopping.")
-            break
-        seen_pages.add(url)
-        print(f"\n[page {page_num}] {url}")
-        imgs, nxt = scrape_listing_page(url)
-        print(f"  → {len(imgs)} image(s) on this page")
-        all_urls.extend(imgs)
-        pages_crawled += 1
-        url = nxt
-        page_num += 1
-        if nxt:
-            time.sleep(DELAY_PAGE)
-
-    print(f"\n[done] {pages_crawled} page(s) crawled, {len(all_urls)} raw image URLs")
+        print(f"  [{scraped:4d}/{len(frontier.state)}] {status}")
+
+    async def walk(fetcher, emit):
+        leftover = settle(frontier.pending())
+        if leftover:
+            print(f"\n[resume] {len(leftover)} view page(s) left from last run")
+        for vurl in leftover:
+            await emit(vurl)
+
+        while frontier.cursor and len(frontier.pages) < max_pages:
+            url = frontier.cursor
+            if frontier.seen_page(url):
+                print("  [loop detected] stopping.")
+                frontier.end()
+                break
+            print(f"\n[page {current_page_num(url)}] {url}")
+            r = await fetcher.get(url)
+            if r is None:
+                print("  → listing fetch failed, stopping (rerun to resume here).")
+                break
+            view_urls, nxt = parse_listing(url, r.text)
+            new = [u for u in view_urls if u not in frontier.state]
+            frontier.add_page(url, view_urls, nxt)
+            todo = settle(new)
+            if fast:
+                cards = resolve_cards(r.text, BASE, IMG_CDN_RE.match)
+                rest = frontier.settle(todo, cards, lambda u, media: media)
+                hits.add(len(todo) - len(rest), len(rest))
+                todo = rest
+            print(f"  → {len(todo)} view link(s) queued, {len(new) - len(todo)} resolved")
+            for vurl in todo:
+                await emit(vurl)
+
+    run_pipeline(walk, parse, HEADERS, workers, rate, depth, record, max_rate)
+    if index is not None:
+        print(f"\n[index] {known} view page(s) settled from the index, {scraped} fetched")
+    if fast:
+        print(f"[fast] {hits.summary()}")
+
+    all_urls = [u for u in frontier.ordered_results() if u]
+    print(f"\n[done] {len(frontier.pages)} page(s) crawled, {len(all_urls)} raw image URLs")
 
     # Dedup maintaining order
-    seen = set()
-    deduped = []
-    for u in all_urls:
-        if u not in seen:
-            seen.add(u)
-            deduped.append(u)
-    return deduped
-
-
-# ── TAGS-DATA UPDATER ────────────────────────────────────────
-def update_tags_data(tag: str, new_ids: list, tags_file="tags-data.js"):
-    if not os.path.exists(tags_file):
-        print(f"[warn] {tags_file} not found, skipping update.")
-        return
-    with open(tags_file, encoding="utf-8") as f:
-        content = f.read()
-    m = re.search(r"window\.TAGS_DATA\s*=\s*(\{.*\})\s*;", content, re.DOTALL)
-    if not m:
-        print("[error] Could not parse TAGS_DATA from tags-data.js")
-        return
-    data = json.loads(m.group(1))
-    # Auto-add tag to tags list and items if not present
-    if tag not in data.get("tags", []):
-        data.setdefault("tags", []).append(tag)
-        print(f"  Added '{tag}' to tags list")
-    if tag not in data.get("items", {}):
-        data.setdefault("items", {})[tag] = []
-        print(f"  Added '{tag}' to items")
-    if "album_items" not in data:
-        data["album_items"] = {}
-    existing = data["album_items"].get(tag, [])
-    existing_set = set(existing)
-    appended = [u for u in new_ids if u not in existing_set]
-    data["album_items"][tag] = existing + appended
-    total = len(data["album_items"][tag])
-    print(f"  existing: {len(existing)}, new: {len(appended)}, total: {total}")
-    new_json = json.dumps(data, ensure_ascii=False, indent=2)
-    new_content = (
-        f"// Auto-generated by indexlocal.html\nwindow.TAGS_DATA = {new_json};\n"
-    )
-    with open(tags_file, "w", encoding="utf-8") as f:
-        f.write(new_content)
-    print(f"[tags-data.js] album_items['{tag}'] updated → {total} total URLs")
+    return list(dict.fromkeys(all_urls))
 
 
 # ── MAIN ────────────────────────────────────────────────────
 if __name__ == "__main__":
+    pop_metrics_flags(sys.argv)
+    workers = pop_flag(sys.argv, "--workers", VIEW_WORKERS, int)
+    rate, max_rate = pop_rate_flags(sys.argv, VIEW_RATE)
+    depth = pop_flag(sys.argv, "--depth", QUEUE_DEPTH, int)
+    restart = "--restart" in sys.argv
+    if restart:
+        sys.argv.remove("--restart")
+    use_index = "--no-index" not in sys.argv
+    if not use_index:
+        sys.argv.remove("--no-index")
+    fast = "--fast" in sys.argv
+    if fast:
+        sys.argv.remove("--fast")
     start_url = (
         sys.argv[1]
         if len(sys.argv) > 1
@@ -197,7 +184,17 @@ if __name__ == "__main__":
     print(f"Max   : {max_pages} pages")
     print("=" * 60)
 
-    urls = crawl_category(start_url, max_pages=max_pages)
+    frontier = Frontier.for_job("category", start_url, tag, fresh=restart)
+    if frontier.replayed:
+        print(f"[resume] {frontier.summary()}")
+
+    index = ViewIndex() if use_index else None
+    if index is not None:
+        print(f"[index] {len(index)} known view page(s) in {index.path}")
+
+    urls = crawl_category(
+        frontier, max_pages, workers, rate, depth, index, fast, max_rate
+    )
 
     print(f"\n{'='*60}")
     print(f"TOTAL unique images: {len(urls)}")
@@ -207,7 +204,7 @@ if __name__ == "__main__":
         print(" ", u)
 
     out = "anhmoe_category_urls.json"
-    with open(out, "w", encoding="utf-8") as f:
+    with atomic_write(out) as f:
         json.dump(
             {"tag": tag, "start": start_url, "urls": urls},
             f,
@@ -216,4 +213,8 @@ if __name__ == "__main__":
         )
     print(f"\nSaved all URLs → {out}")
 
-    update_tags_data(tag, urls)
+    add_tag_items(tag, urls)
+    if frontier.complete(max_pages):
+        frontier.remove()  # a rerun starts fresh
+    else:
+        print(f"[frontier] kept for resume: {frontier.summary()}")
@@ -5,203 +5,170 @@ Each card links to a /view/ page which has a download anchor (?dl=1).
 Strip ?dl=1 to get the raw streamable CDN URL.
 
 Usage:
-  python3 crawl_anhmoe_videos.py <album_url> <thread_title>
+  python3 crawl_anhmoe_videos.py <album_url> <thread_title> [--workers N] [--rate R] [--max-rate M] [--fixed-rate] [--metrics FILE] [--profile MODE] [--no-export] [--clean] [--dedup | --dedup-refs] [--restart] [--no-index] [--fast]
+
+Album pages and view results are journaled under .frontier/, so an
+interrupted run resumes at the last seek= cursor; --restart starts over.
+View pages resolved by any earlier crawl are answered from
+anhmoe_view_index.jsonl without a request; --no-index re-fetches them.
+--fast takes the video URL straight from listing card data where possible
+and only visits the view pages it cannot resolve (hit rate is reported).
+Listing and view requests start at --rate req/s and adapt it to the
+site's latency and errors, up to --max-rate (default 2 × --rate);
+[rate] lines report each change. --fixed-rate keeps --rate throughout.
+--metrics FILE appends per-request JSONL events (crawlcore/metrics.py);
+--profile cprofile|pyinstrument profiles parse_view_page.
+--dedup leaves out videos another thread of videos.json already holds;
+--dedup-refs stores them as references to that thread instead.
 
 Example:
   python3 crawl_anhmoe_videos.py "https://anh.moe/album/C%C3%81C-VIDEO-HAY.s6C6" "Phim Âu Mỹ"
 """
 
-import re, sys, time, json, os
-import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse, parse_qs
-
-HEADERS = {
-    "User-Agent": (
-        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-        "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
-    ),
-    "Referer": "https://anh.moe/",
-}
-BASE = "https://anh.moe"
-DELAY_PAGE = 1.0  # between album listing pages
+import sys
+
+from crawlcore.aiofetch import pop_flag, pop_rate_flags
+from crawlcore.anhmoe import (
+    BASE,
+    HEADERS,
+    current_page_num,
+    get,
+    parse_listing,
+    set_rate,
+    view_media,
+)
+from crawlcore.anhmoe import title_from_view_url
+from crawlcore.cards import HitRate, is_video, resolve_cards
+from crawlcore.frontier import Frontier
+from crawlcore.metrics import pop_metrics_flags, profiled
+from crawlcore.viewindex import ViewIndex
+from crawlcore.store import VideoStore
+from crawlcore.urlclean import format_stats
+
 DELAY_VIEW = 0.6  # between individual view-page requests
+VIEW_WORKERS = 4  # view pages in flight (--workers N)
+VIEW_RATE = 1 / DELAY_VIEW  # view-page starting req/s (--rate R)
 OUTPUT_JSON = "videos.json"
 OUTPUT_JS = "videos-data.js"
 
-session = requests.Session()
-session.headers.update(HEADERS)
-
-
-# ── helpers ───────────────────────────────────────────────
-
-
-def get(url, retries=3):
-    for i in range(retries):
-        try:
-            r = session.get(url, timeout=15)
-            r.raise_for_status()
-            return r
-        except Exception as e:
-            print(f"  [warn] {e} (attempt {i+1}/{retries})", file=sys.stderr)
-            time.sleep(2)
-    return None
-
-
-def current_page_num(url):
-    qs = parse_qs(urlparse(url).query)
-    try:
-        return int(qs.get("page", ["1"])[0])
-    except ValueError:
-        return 1
-
-
-def title_from_view_url(view_url):
-    """Extract human-readable title from the view URL slug."""
-    path = urlparse(view_url).path  # /view/Some.Title.XXXX
-    slug = path.rstrip("/").rsplit("/", 1)[-1]
-    # Remove trailing short ID (last segment after last dot if looks like ID)
-    parts = slug.split(".")
-    # Drop last part if it looks like a random ID (mixed case, short)
-    if (
-        parts
-        and re.match(r"^[A-Za-z0-9]{5,12}$", parts[-1])
-        and not parts[-1].isdigit()
-    ):
-        parts = parts[:-1]
-    return " ".join(parts).strip()
-
-
 # ── album listing ─────────────────────────────────────────
 
 
-def get_view_links_from_page(url):
-    """Return (view_urls_list, next_page_url_or_None) for one album page."""
-    r = get(url)
-    if not r:
-        return [], None
-    soup = BeautifulSoup(r.text, "html.parser")
-
-    seen, links = set(), []
-    for a in soup.select("a[href^='/view/']"):
-        href = a.get("href", "")
-        full = urljoin(BASE, href)
-        if full not in seen:
-            seen.add(full)
-            links.append(full)
-
-    n = current_page_num(url)
-    next_url = None
-    for a in soup.select("a[href]"):
-        href = a.get("href", "")
-        if f"page={n + 1}" in href and "seek=" in href:
-            next_url = urljoin(BASE, href)
-            break
-
-    return links, next_url
+def crawl_album_view_links(frontier, cards=None):
+    """Walk album pages from the frontier cursor, journaling each page.
 
-
-def crawl_album_view_links(start_url):
-    """Walk all album pages and collect unique /view/ URLs."""
-    all_links, seen, page_url = [], set(), start_url
-    while page_url:
+    Returns the view URLs still to scrape (new ones plus any left pending
+    or failed by an interrupted run). If `cards` is a dict, it is filled
+    with {view_url: video_url} for cards whose video URL is readable from
+    the album page itself (fast resolve).
+    """
+    while frontier.cursor:
+        page_url = frontier.cursor
+        if frontier.seen_page(page_url):
+            print("  [loop detected] stopping.")
+            frontier.end()
+            break
         n = current_page_num(page_url)
         print(f"[album page {n}] {page_url}")
-        links, next_url = get_view_links_from_page(page_url)
-        new = [u for u in links if u not in seen]
-        seen.update(new)
-        all_links.extend(new)
+        r = get(page_url)
+        if not r:
+            print("  → listing fetch failed, stopping (rerun to resume here).")
+            break
+        links, next_url = parse_listing(page_url, r.text)
+        if cards is not None:
+            cards.update(resolve_cards(r.text, BASE, is_video))
+        new = [u for u in links if u not in frontier.state]
+        frontier.add_page(page_url, links, next_url)
         print(f"  → {len(links)} view links ({len(new)} new)")
-        page_url = next_url
-        if next_url:
-            time.sleep(DELAY_PAGE)
-    return all_links
+    return frontier.pending()
 
 
 # ── view page ─────────────────────────────────────────────
 
-CDN_VIDEO_RE = re.compile(
-    r'https://cdn\.(?:save|anh)\.moe/[^\s"\'<>]+\.(?:mp4|webm|mov)',
-    re.I,
-)
-
 
-def scrape_view_page(view_url):
-    """Return (video_url, title) or (None, title) if not found."""
-    r = get(view_url)
-    if not r:
-        return None, title_from_view_url(view_url)
+def from_index(view_url, entry):
+    """What parse_view_page() returns for a page already in the view index."""
+    return entry["media"], title_from_view_url(view_url)
 
-    soup = BeautifulSoup(r.text, "html.parser")
 
-    # 1. Prefer explicit download anchor (?dl=1)
-    dl_a = soup.select_one('a[href*="?dl="]')
-    if dl_a:
-        raw = dl_a.get("href", "").split("?")[0].strip()
-        if raw:
-            return raw, title_from_view_url(view_url)
+def from_card(view_url, media):
+    """Result for a card resolved from listing data (see crawlcore.cards)."""
+    return media, title_from_view_url(view_url)
 
-    # 2. Fallback: CDN video URL anywhere in raw HTML
-    matches = CDN_VIDEO_RE.findall(r.text)
-    if matches:
-        return matches[0], title_from_view_url(view_url)
 
-    return None, title_from_view_url(view_url)
+@profiled
+def parse_view_page(view_url, html):
+    """Parse an already-fetched view page (html=None means fetch failed)."""
+    if not html:
+        return None, title_from_view_url(view_url)
+    # download anchor (?dl=1 stripped), else a CDN video URL in the raw HTML
+    return view_media(html), title_from_view_url(view_url)
 
 
 # ── output ────────────────────────────────────────────────
 
 
-def update_videos_json(thread_title, videos):
-    """Append (or replace) a thread with the given title in videos.json."""
-    if not os.path.exists(OUTPUT_JSON):
-        data = {"threads": [], "total": 0}
-    else:
-        with open(OUTPUT_JSON, encoding="utf-8") as f:
-            data = json.load(f)
-
-    # Helper: get URL from a video entry (supports both str and {url,title} dict)
-    def vid_url(v):
-        return v if isinstance(v, str) else v.get("url", "")
-
-    # Merge into existing thread (append+deduplicate by URL), otherwise insert at top
-    existing_idx = next(
-        (i for i, t in enumerate(data["threads"]) if t.get("title") == thread_title),
-        None,
-    )
-    if existing_idx is not None:
-        existing_videos = data["threads"][existing_idx].get("videos", [])
-        existing_urls = {vid_url(v) for v in existing_videos}
-        new_unique = [v for v in videos if vid_url(v) not in existing_urls]
-        merged = existing_videos + new_unique
-        data["threads"][existing_idx]["videos"] = merged
+def update_videos_json(thread_title, videos, export=True, clean=False, dedup=None):
+    """Append (or merge) a thread with the given title via the video store.
+
+    The change is journaled immediately; videos.json + videos-data.js are
+    only rewritten when export=True (pass --no-export to batch several runs
+    and export later with `crawl_videos.py --export`). clean=True applies
+    the clean_videos.py URL rules to the whole dataset while exporting.
+    dedup="drop" / "refs" leaves out videos another thread already holds,
+    or stores them as references to it.
+    """
+    store = VideoStore(OUTPUT_JSON, OUTPUT_JS)
+    if dedup:
+        videos, dups = store.dedup("title:" + thread_title, videos, dedup == "refs")
+        print(f"  [dedup] {dups} video(s) already stored in other threads")
+    existing = store.find(thread_title)
+    before = len(existing["videos"]) if existing else 0
+    added = store.merge(thread_title, videos)
+    if existing:
         print(
             f"  Merged into existing thread '{thread_title}': "
-            f"{len(existing_videos)} + {len(new_unique)} new = {len(merged)} videos"
+            f"{before} + {added} new = {before + added} videos"
         )
     else:
-        data["threads"].insert(0, {"title": thread_title, "url": "", "videos": videos})
         print(
             f"  Inserted new thread '{thread_title}' at top with {len(videos)} videos"
         )
 
-    data["total"] = sum(len(t.get("videos", [])) for t in data["threads"])
-
-    with open(OUTPUT_JSON, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-
-    with open(OUTPUT_JS, "w", encoding="utf-8") as f:
-        f.write("// Auto-generated by crawl_videos.py — do not edit manually\n")
-        f.write("window.VIDEOS_DATA = ")
-        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
-        f.write(";\n")
-
-    print(f"  Total videos across all threads: {data['total']}")
+    if export:
+        stats = store.export(clean=clean)
+        if stats is not None:
+            print(f"  [clean] {format_stats(stats)}")
+    print(f"  Total videos across all threads: {store.total}")
 
 
 # ── main ──────────────────────────────────────────────────
 
 if __name__ == "__main__":
+    pop_metrics_flags(sys.argv)
+    workers = pop_flag(sys.argv, "--workers", VIEW_WORKERS, int)
+    rate, max_rate = pop_rate_flags(sys.argv, VIEW_RATE)
+    set_rate(rate, max_rate)
+    export = "--no-export" not in sys.argv
+    if not export:
+        sys.argv.remove("--no-export")
+    clean = "--clean" in sys.argv
+    if clean:
+        sys.argv.remove("--clean")
+    dedup = None
+    for flag, mode in (("--dedup", "drop"), ("--dedup-refs", "refs")):
+        if flag in sys.argv:
+            sys.argv.remove(flag)
+            dedup = mode
+    restart = "--restart" in sys.argv
+    if restart:
+        sys.argv.remove("--restart")
+    use_index = "--no-index" not in sys.argv
+    if not use_index:
+        sys.argv.remove("--no-index")
+    fast = "--fast" in sys.argv
+    if fast:
+        sys.argv.remove("--fast")
     album_url = (
         sys.argv[1]
         if len(sys.argv) > 1
@@ -214,21 +181,38 @@ if __name__ == "__main__":
     print(f"Thread: {thread_title}")
     print("=" * 60)
 
-    # Step 1: collect all /view/ URLs
-    view_links = crawl_album_view_links(album_url)
-    print(f"\nTotal view pages to scrape: {len(view_links)}\n")
-
-    # Step 2: visit each view page to get video URL
-    videos, failed = [], 0
-    for i, vurl in enumerate(view_links, 1):
-        video_url, title = scrape_view_page(vurl)
-        status = "✓" if video_url else "✗"
-        print(f"  [{i:3d}/{len(view_links)}] {status}  {title[:55]}")
+    # Step 1: collect all /view/ URLs (resuming a saved frontier if any)
+    frontier = Frontier.for_job("videos", album_url, thread_title, fresh=restart)
+    if frontier.replayed:
+        print(f"[resume] {frontier.summary()}")
+    cards = {} if fast else None
+    view_links = crawl_album_view_links(frontier, cards)
+    parse = parse_view_page
+    if use_index:
+        index = ViewIndex()
+        todo = frontier.settle(view_links, index, from_index)
+        print(f"\n[index] {len(view_links) - len(todo)} known view page(s) skipped")
+        view_links, parse = todo, index.indexing(parse_view_page)
+    if fast:
+        todo = frontier.settle(view_links, cards, from_card)
+        hits = HitRate()
+        hits.add(len(view_links) - len(todo), len(todo))
+        print(f"[fast] {hits.summary()}")
+        view_links = todo
+    print(f"\nView pages to scrape: {len(view_links)}\n")
+
+    # Step 2: visit each view page to get video URL (pipelined)
+    def progress(i, vurl, res):
+        status = "✓" if res[0] else "✗"
+        print(f"  [{i:3d}/{len(view_links)}] {status}  {res[1][:55]}")
+
+    frontier.fetch_pending(parse, HEADERS, workers, rate, progress, max_rate)
+    videos, failed = [], len(frontier.pending())
+    for video_url, title in frontier.ordered_results():
         if video_url:
             videos.append({"url": video_url, "title": title})
         else:
             failed += 1
-        time.sleep(DELAY_VIEW)
 
     print(f"\n{'='*60}")
     print(f"Videos found : {len(videos)}")
@@ -240,7 +224,14 @@ if __name__ == "__main__":
 
     # Step 3: write to videos.json + videos-data.js
     if videos:
-        update_videos_json(thread_title, videos)
-        print(f"\nSaved → {OUTPUT_JSON}  +  {OUTPUT_JS}")
+        update_videos_json(thread_title, videos, export, clean, dedup)
+        if export:
+            print(f"\nSaved → {OUTPUT_JSON}  +  {OUTPUT_JS}")
+        else:
+            print("\nJournaled — run `crawl_videos.py --export` to publish.")
     else:
         print("\nNo videos found — nothing written.")
+    if frontier.complete():
+        frontier.remove()
+    else:
+        print(f"[frontier] kept for resume: {frontier.summary()}")
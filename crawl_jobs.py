@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Run every crawl target in a manifest as one batch.
+
+crawl_jobs.json lists the targets:
+
+  {"jobs": [{"kind": "category", "url": "...", "tag": "QMH", "max_pages": 300},
+            {"kind": "videos", "url": "...", "title": "Clip Viet"}, ...]}
+
+  kind       script                     uses
+  forum      crawl_videos.py            args (e.g. ["--new-topics"])
+  category   crawl_anhmoe_category.py   url, tag, max_pages
+  user       crawl_anhmoe_user.py       url, tag, max_pages
+  album      crawl_anhmoe_album.py      url, tag
+  videos     crawl_anhmoe_videos.py     url, title
+
+Optional per job: "name" (defaults to kind:tag/title), "args" (extra
+flags), "log" (defaults to crawl_<name>.log), "retries". Each job also
+writes its per-request metrics events next to the log, as
+<log name>.metrics.jsonl.
+
+Each job runs as its own process (stdout/stderr → its log). At most --jobs
+run at once and at most --per-host against the same site; every job on a
+host gets --rate / --per-host req/s, also as its --max-rate, so the
+site's total budget holds no matter how many jobs target it (a job's
+adaptive rate can only slow below its share, never exceed it). A job that exits non-zero, or whose
+frontier was kept for resume, is retried (the crawlers resume from their
+frontier, so a retry only fetches what is missing). anh.moe video jobs
+run with --no-export and videos.json is exported once at the end.
+
+State lives in crawl_jobs.state.json (status, attempts, pid, exit code,
+times per job), rewritten atomically on every change. Rerunning the
+batch skips jobs already done; --fresh runs everything again.
+
+Usage:
+  python3 crawl_jobs.py [manifest] [--jobs N] [--per-host K] [--rate R]
+                        [--only NAME] [--fresh] [--detach]
+  python3 crawl_jobs.py --status     # job table + last log line of each
+"""
+
+import json, os, subprocess, sys, time
+from urllib.parse import urlparse
+
+from crawlcore.aiofetch import pop_flag
+from crawlcore.atomicio import atomic_write, load_json
+
+MANIFEST = "crawl_jobs.json"
+STATE = "crawl_jobs.state.json"
+JOBS = 3  # processes at once (--jobs N)
+PER_HOST = 2  # processes per site (--per-host K)
+RATE = 4.0  # req/s per site, shared by its jobs (--rate R)
+RETRIES = 2
+POLL = 1.0  # s between scheduler ticks
+PROGRESS_EVERY = 30  # s between progress reports
+KEPT_MARKER = "[frontier] kept for resume"
+FORUM_HOST = "xamvn.bond"
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+SCRIPTS = {
+    "forum": "crawl_videos.py",
+    "category": "crawl_anhmoe_category.py",
+    "user": "crawl_anhmoe_user.py",
+    "album": "crawl_anhmoe_album.py",
+    "videos": "crawl_anhmoe_videos.py",
+}
+RATE_FLAG = {"forum", "category", "user", "videos"}  # album has no --rate
+
+
+# ── manifest ──────────────────────────────────────────────
+def job_name(job):
+    return job.get("name") or f"{job['kind']}:{job.get('tag') or job.get('title')}"
+
+
+def job_host(job):
+    return urlparse(job["url"]).netloc if job.get("url") else FORUM_HOST
+
+
+def job_log(job):
+    if job.get("log"):
+        return job["log"]
+    slug = "".join(c if c.isalnum() else "_" for c in job_name(job).lower())
+    return f"crawl_{slug}.log"
+
+
+def job_metrics(job):
+    return os.path.splitext(job_log(job))[0] + ".metrics.jsonl"
+
+
+def job_argv(job, rate):
+    kind = job["kind"]
+    extra = list(job.get("args", []))
+    argv = [sys.executable, "-u", os.path.join(HERE, SCRIPTS[kind])]
+    if kind in ("category", "user"):
+        argv += [job["url"], job["tag"], str(job.get("max_pages", 100))]
+    elif kind == "album":
+        argv += [job["url"], job["tag"]]
+    elif kind == "videos":
+        argv += [job["url"], job["title"], "--no-export"]
+    if kind in RATE_FLAG and "--rate" not in extra:
+        argv += ["--rate", f"{rate:g}", "--max-rate", f"{rate:g}"]
+        if kind == "forum" and "--workers" not in extra:
+            argv += ["--workers", "2"]  # two thread fetches within the budget
+    if "--metrics" not in extra:
+        argv += ["--metrics", job_metrics(job)]
+    return argv + extra
+
+
+def load_manifest(path):
+    jobs = load_json(path)["jobs"]
+    for job in jobs:
+        if job.get("kind") not in SCRIPTS:
+            sys.exit(f"{path}: unknown job kind {job.get('kind')!r}")
+    names = [job_name(j) for j in jobs]
+    dup = {n for n in names if names.count(n) > 1}
+    if dup:
+        sys.exit(f"{path}: duplicate job name(s) {sorted(dup)}; set \"name\"")
+    return jobs
+
+
+# ── state ─────────────────────────────────────────────────
+def load_state(path=STATE):
+    return load_json(path) if os.path.exists(path) else {}
+
+
+def save_state(state, path=STATE):
+    with atomic_write(path) as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+
+
+def last_line(path):
+    """Last non-empty line of a log (read from the end)."""
+    try:
+        with open(path, "rb") as f:
+            f.seek(max(0, os.path.getsize(path) - 4096))
+            lines = f.read().decode("utf-8", "replace").splitlines()
+    except OSError:
+        return ""
+    return next((l.strip() for l in reversed(lines) if l.strip()), "")
+
+
+def finished_ok(code, log, offset=0):
+    """Exit 0 and no frontier left behind for resume (the log is only
+    searched from `offset`, where this attempt's output starts)."""
+    if code != 0:
+        return False
+    try:
+        with open(log, "rb") as f:
+            f.seek(max(offset, os.path.getsize(log) - 65536))
+            return KEPT_MARKER not in f.read().decode("utf-8", "replace")
+    except OSError:
+        return True
+
+
+def print_status(state):
+    if not state:
+        print(f"No jobs recorded in {STATE}")
+        return
+    for name, s in state.items():
+        line = f"  {s['status']:<8} {name:<32} attempts {s.get('attempts', 0)}"
+        if s.get("exit") is not None:
+            line += f"  exit {s['exit']}"
+        print(line)
+        if s["status"] == "running":
+            print(f"           {last_line(s['log'])[:100]}")
+
+
+# ── scheduler ─────────────────────────────────────────────
+def run(jobs, state, max_jobs=JOBS, per_host=PER_HOST, rate=RATE):
+    share = rate / per_host
+    by_name = {job_name(j): j for j in jobs}
+    for name, job in by_name.items():
+        s = state.get(name)
+        if s is None or s["status"] != "done":
+            state[name] = {
+                "status": "pending",
+                "attempts": 0,
+                "log": job_log(job),
+                "host": job_host(job),
+            }
+    save_state(state)
+    running = {}  # name → Popen
+    finished = set()  # jobs done in this run
+    last_report = time.time()
+    try:
+        while True:
+            for name, proc in list(running.items()):
+                code = proc.poll()
+                if code is None:
+                    continue
+                del running[name]
+                s = state[name]
+                s.update(exit=code, finished=int(time.time()), pid=None)
+                retries = by_name[name].get("retries", RETRIES)
+                if finished_ok(code, s["log"], s.get("offset", 0)):
+                    s["status"] = "done"
+                    finished.add(name)
+                elif s["attempts"] <= retries:
+                    s["status"] = "pending"
+                else:
+                    s["status"] = "failed"
+                print(f"[{s['status']}] {name} (exit {code}, attempt {s['attempts']})")
+                save_state(state)
+
+            busy = {}
+            for name in running:
+                busy[state[name]["host"]] = busy.get(state[name]["host"], 0) + 1
+            for name, job in by_name.items():
+                s = state[name]
+                if len(running) >= max_jobs:
+                    break
+                if s["status"] != "pending" or busy.get(s["host"], 0) >= per_host:
+                    continue
+                with open(s["log"], "a") as log:
+                    s["offset"] = log.tell()
+                    running[name] = subprocess.Popen(
+                        job_argv(job, share), stdout=log, stderr=subprocess.STDOUT
+                    )
+                busy[s["host"]] = busy.get(s["host"], 0) + 1
+                s.update(
+                    status="running",
+                    attempts=s["attempts"] + 1,
+                    pid=running[name].pid,
+                    started=int(time.time()),
+                    exit=None,
+                )
+                print(f"[start] {name} PID {s['pid']} → {s['log']}")
+                save_state(state)
+
+            if not running:
+                break
+            if time.time() - last_report >= PROGRESS_EVERY:
+                last_report = time.time()
+                counts = {}
+                for s in state.values():
+                    counts[s["status"]] = counts.get(s["status"], 0) + 1
+                summary = "  ".join(f"{k} {v}" for k, v in sorted(counts.items()))
+                print(f"[progress] {summary}")
+                for name in running:
+                    print(f"  {name:<32} {last_line(state[name]['log'])[:80]}")
+            time.sleep(POLL)
+    except KeyboardInterrupt:
+        for name, proc in running.items():
+            proc.terminate()
+            state[name].update(status="pending", pid=None)
+        save_state(state)
+        raise
+
+    # anh.moe video jobs only journaled their threads; publish them once
+    if any(by_name[n]["kind"] == "videos" for n in finished):
+        print("[export] crawl_videos.py --export")
+        script = os.path.join(HERE, SCRIPTS["forum"])
+        subprocess.call([sys.executable, "-u", script, "--export"])
+
+
+def main():
+    max_jobs = pop_flag(sys.argv, "--jobs", JOBS, int)
+    per_host = pop_flag(sys.argv, "--per-host", PER_HOST, int)
+    rate = pop_flag(sys.argv, "--rate", RATE, float)
+    only = pop_flag(sys.argv, "--only", None)
+    if "--status" in sys.argv:
+        print_status(load_state())
+        return
+    if "--detach" in sys.argv:
+        sys.argv.remove("--detach")
+        log = "crawl_jobs.log"
+        argv = [sys.executable, "-u", os.path.abspath(__file__)] + sys.argv[1:]
+        argv += ["--jobs", str(max_jobs), "--per-host", str(per_host)]
+        argv += ["--rate", str(rate)] + (["--only", only] if only else [])
+        with open(log, "a") as f:
+            proc = subprocess.Popen(
+                argv, stdout=f, stderr=subprocess.STDOUT, start_new_session=True
+            )
+        print(f"Started scheduler PID {proc.pid} → {log}  (--status for progress)")
+        return
+    fresh = "--fresh" in sys.argv
+    if fresh:
+        sys.argv.remove("--fresh")
+    manifest = sys.argv[1] if len(sys.argv) > 1 else MANIFEST
+
+    jobs = load_manifest(manifest)
+    if only:
+        jobs = [j for j in jobs if job_name(j) == only]
+        if not jobs:
+            sys.exit(f"No job named {only!r} in {manifest}")
+    state = {} if fresh else load_state()
+    todo = [j for j in jobs if state.get(job_name(j), {}).get("status") != "done"]
+
+    print("=" * 60)
+    print(f"Manifest : {manifest}  ({len(jobs)} job(s), {len(jobs) - len(todo)} done)")
+    print(f"Limits   : {max_jobs} job(s) at once, {per_host} per site")
+    print(f"Budget   : {rate:g} req/s per site ({rate / per_host:g} per job)")
+    print("=" * 60)
+    run(jobs, state, max_jobs, per_host, rate)
+    print()
+    print_status(state)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,59 +3,74 @@
 Crawl mp4 links from xamvn.bond/forums/3/
 Test mode: first 10 threads only
 Output: videos.json
+
+Options:
+  --workers N   fetch N threads concurrently (default 1 = serial)
+  --rate R      per-host starting rate in req/s (default 1/DELAY)
+  --max-rate M  ceiling the adaptive rate may climb to (default 2 × R)
+  --fixed-rate  no adaptation: R req/s with --workers, else DELAY sleeps
+  --export      write videos.json + videos-data.js from the journal and exit
+  --clean       apply the clean_videos.py URL rules while exporting
+  --dedup       leave out videos another thread already holds (global URL index)
+  --dedup-refs  store those as {"ref": thread} references instead of copies
+  --no-cache    skip the conditional-GET page cache (.http-cache/)
+  --full-scan   --new-topics: walk all MAX_PAGES listing pages (no early stop)
+  --stop-after K  --new-topics: stop after K listing pages with no thread ID
+                above the saved high-water mark (default STOP_AFTER)
+  --metrics FILE  append per-request JSONL events (crawlcore/metrics.py)
+  --profile MODE  profile get_mp4s_from_thread (cprofile | pyinstrument)
+
+A [metrics] line (pages/s, p50/p95 latency, errors, ETA) is printed every
+30 s and a per-page-type table at exit.
+
+Threads are journaled to videos.journal.jsonl as they are crawled; the two
+published files are only rewritten once, at the end of the run.
 """
 
-import re, json, time, sys
+import re, json, os, time, sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urljoin, urlparse
-import requests
 from bs4 import BeautifulSoup
 
+from crawlcore.atomicio import atomic_write
+from crawlcore.extract import extract_thread_page
+from crawlcore.fetch import Fetcher, headers
+from crawlcore.httpcache import HTTPCache
+from crawlcore.metrics import metrics, pop_metrics_flags, profiled
+from crawlcore.ratelimit import INFLIGHT_FACTOR, MAX_RATE_FACTOR, HostRateLimiter
+from crawlcore.store import VideoStore, thread_key
+from crawlcore.urlclean import format_stats
+
 # ── CONFIG ────────────────────────────────────────────────
 BASE = "https://xamvn.bond"
 FORUM_URL = "https://xamvn.bond/forums/3/"
 MAX_THREADS = 500  # used by default / resume mode
 MAX_PAGES = 120  # used by --new-topics mode
+STOP_AFTER = 3  # --new-topics: stale listing pages before stopping early
+STATE_FILE = "crawl_state.json"  # high-water mark of seen thread IDs
 DELAY = 0.8  # seconds between requests
+WORKERS = 1  # concurrent thread fetches (--workers N)
+RATE = 1 / DELAY  # per-host starting req/s (--rate R)
 OUTPUT = "videos.json"
 OUTPUT_JS = "videos-data.js"  # inline JS for file:// access
-# CDN pattern – expand regex if other CDN domains appear
-CDN_RE = re.compile(r'https?://[^\s"\'<>]+\.mp4', re.IGNORECASE)
-
-HEADERS = {
-    "User-Agent": (
-        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-        "AppleWebKit/537.36 (KHTML, like Gecko) "
-        "Chrome/122.0.0.0 Safari/537.36"
-    ),
-    "Referer": BASE,
-}
-
-session = requests.Session()
-session.headers.update(HEADERS)
-
-
-def get(url, retries=3):
-    for i in range(retries):
-        try:
-            r = session.get(url, timeout=15)
-            r.raise_for_status()
-            return r
-        except Exception as e:
-            print(f"  [warn] {e} (attempt {i+1}/{retries})", file=sys.stderr)
-            time.sleep(2)
-    return None
-
-
-def save_output(threads, total_videos):
-    """Write videos.json + videos-data.js (inline JS for file:// access)."""
-    payload = {"threads": threads, "total": total_videos}
-    with open(OUTPUT, "w", encoding="utf-8") as f:
-        json.dump(payload, f, ensure_ascii=False, indent=2)
-    with open(OUTPUT_JS, "w", encoding="utf-8") as f:
-        f.write("// Auto-generated by crawl_videos.py — do not edit manually\n")
-        f.write("window.VIDEOS_DATA = ")
-        json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
-        f.write(";\n")
+
+HEADERS = headers(referer=BASE)
+
+# main() sets fetcher.limiter (an adaptive per-host budget replacing the
+# fixed DELAY sleeps; with --fixed-rate only in --workers mode) and
+# fetcher.cache unless --no-cache (pages revalidated with 304).
+fetcher = Fetcher(HEADERS)
+
+
+def pause():
+    """Politeness delay between requests; a no-op when the limiter is active."""
+    if fetcher.limiter is None:
+        time.sleep(DELAY)
+
+
+def get(url):
+    return fetcher.get(url)
 
 
 def get_page(url):
@@ -63,7 +78,8 @@ def get_page(url):
     r = get(url)
     if not r:
         return None, ""
-    return BeautifulSoup(r.text, "html.parser"), r.text
+    with metrics.parsing(url):
+        return BeautifulSoup(r.text, "html.parser"), r.text
 
 
 def get_soup(url):
@@ -72,12 +88,37 @@ def get_soup(url):
 
 
 # ── STEP 1b: collect thread URLs + title hints from listing pages ──
-def get_thread_list_with_titles(max_pages=MAX_PAGES):
+def thread_id(url):
+    """Numeric ID from a /threads/<id>/ URL, or 0."""
+    m = re.search(r"/threads/(?:[^/]*\.)?(\d+)/", url)
+    return int(m.group(1)) if m else 0
+
+
+def load_high_water(existing_urls):
+    """Highest thread ID seen so far (state file, else max of existing URLs)."""
+    hwm = max((thread_id(u) for u in existing_urls), default=0)
+    if os.path.exists(STATE_FILE):
+        with open(STATE_FILE, encoding="utf-8") as f:
+            hwm = max(hwm, json.load(f).get("max_thread_id", 0))
+    return hwm
+
+
+def save_high_water(hwm):
+    with atomic_write(STATE_FILE) as f:
+        json.dump({"forum": FORUM_URL, "max_thread_id": hwm}, f, indent=2)
+
+
+def get_thread_list_with_titles(max_pages=MAX_PAGES, high_water=None, stop_after=None):
     """Scrape up to max_pages category pages and return [(url, title_hint)].
     title_hint is the link text shown on the listing page (fast, no thread fetch).
+
+    With high_water + stop_after, stop once stop_after consecutive pages have
+    shown no thread ID above high_water (listing is sorted by last post, so
+    old threads keep bubbling up, but genuinely new IDs cluster on top).
     """
     results = []  # [(url, title)]
     seen_urls = set()
+    stale = 0
     page = 1
     while page <= max_pages:
         url = FORUM_URL if page == 1 else f"{FORUM_URL}page-{page}"
@@ -114,6 +155,13 @@ def get_thread_list_with_titles(max_pages=MAX_PAGES):
             break
         print(f"  → {new} threads (total {len(results)})")
 
+        if high_water is not None and stop_after:
+            fresh = sum(1 for u, _ in results[-new:] if thread_id(u) > high_water)
+            stale = 0 if fresh else stale + 1
+            if stale >= stop_after:
+                print(f"  → {stale} page(s) with no ID > {high_water}, stopping early.")
+                break
+
         next_btn = soup.select_one(
             "a.pageNav-jump--next, a[rel='next'], .pagination a.next"
         )
@@ -121,7 +169,7 @@ def get_thread_list_with_titles(max_pages=MAX_PAGES):
             print("  → last page reached.")
             break
         page += 1
-        time.sleep(DELAY)
+        pause()
 
     return results
 
@@ -178,12 +226,13 @@ def get_thread_urls(max_threads=None):
         if not next_btn:
             break
         page += 1
-        time.sleep(DELAY)
+        pause()
 
     return threads
 
 
 # ── STEP 2: extract mp4 links from a single thread (all pages) ──
+@profiled
 def get_mp4s_from_thread(thread_url):
     mp4s = []
     seen_mp4 = set()
@@ -192,121 +241,138 @@ def get_mp4s_from_thread(thread_url):
 
     while True:
         url = thread_url if page == 1 else f"{thread_url}page-{page}"
-        soup, raw_html = get_page(url)
-        if not soup:
+        r = get(url)
+        if not r:
             break
+        # one event-driven pass: title, mp4s (raw html + tags + attrs), next link
+        with metrics.parsing(url):
+            info = extract_thread_page(r.text)
 
-        # grab thread title once
+        # grab thread title once (og:title → <title> → h1 → thread URL)
         if page == 1:
-            title = ""
-            # 1) og:title is most reliable – format: "Forum - Thread Title | Site Name"
-            og = soup.select_one("meta[property='og:title']")
-            if og and og.get("content"):
-                raw = og["content"].strip()
-                # strip site suffix: " | Xamvn - ..." or " | XAMVN"
-                if " | " in raw:
-                    raw = raw[: raw.rfind(" | ")].strip()
-                if raw and raw.lower() not in ("xamvn", "xam vn"):
-                    title = raw
-            # 2) <title> tag fallback: "Thread Title | Site Name"
-            if not title:
-                t_tag = soup.select_one("title")
-                if t_tag:
-                    raw = t_tag.get_text(strip=True)
-                    if " | " in raw:
-                        raw = raw[: raw.rfind(" | ")].strip()
-                    if raw and raw.lower() not in ("xamvn", "xam vn"):
-                        title = raw
-            # 3) h1.p-title-value last resort (may have prefix text merged in)
-            if not title:
-                t = soup.select_one("h1.p-title-value")
-                if t:
-                    candidate = t.get_text(" ", strip=True)
-                    if candidate.lower() not in ("xamvn", "xam vn"):
-                        title = candidate
-            # 4) absolute fallback: thread URL
-            if not title:
-                title = thread_url
-
-        # 1) raw html scan – catches JS blobs, meta tags, everywhere
-        for u in CDN_RE.findall(raw_html):
+            title = info["title"] or thread_url
+
+        for u in info["mp4s"]:
             if u not in seen_mp4:
                 seen_mp4.add(u)
                 mp4s.append(u)
 
-        # 2) <video src>, <source src> (explicit tags)
-        for tag in soup.select("video[src], source[src]"):
-            src = tag.get("src", "")
-            if ".mp4" in src.lower() and src not in seen_mp4:
-                seen_mp4.add(src)
-                mp4s.append(src)
-
-        # 3) any attribute containing .mp4
-        for tag in soup.find_all(True):
-            for attr in ("href", "data-url", "data-src", "data-original", "content"):
-                val = tag.get(attr, "")
-                if val and ".mp4" in val.lower():
-                    for u in CDN_RE.findall(val):
-                        if u not in seen_mp4:
-                            seen_mp4.add(u)
-                            mp4s.append(u)
-
         # next thread page?
-        next_btn = soup.select_one(
-            "a.pageNav-jump--next, a[rel='next'], .pagination a.next"
-        )
+        next_btn = info["has_next"]
         print(
             f"    page {page}: {'✓ VIDEO ' + str(len(mp4s)) if mp4s else 'no mp4'}  next={'yes' if next_btn else 'END'}"
         )
         if not next_btn:
             break
         page += 1
-        time.sleep(DELAY)
+        pause()
 
     return {"title": title, "url": thread_url, "videos": mp4s}
 
 
 def fetch_title_only(thread_url):
     """Fetch page 1 only and return the thread title string."""
-    soup, _ = get_page(thread_url)
-    if not soup:
+    r = get(thread_url)
+    if not r:
         return thread_url
-    title = ""
-    og = soup.select_one("meta[property='og:title']")
-    if og and og.get("content"):
-        raw = og["content"].strip()
-        if " | " in raw:
-            raw = raw[: raw.rfind(" | ")].strip()
-        if raw and raw.lower() not in ("xamvn", "xam vn"):
-            title = raw
-    if not title:
-        t_tag = soup.select_one("title")
-        if t_tag:
-            raw = t_tag.get_text(strip=True)
-            if " | " in raw:
-                raw = raw[: raw.rfind(" | ")].strip()
-            if raw and raw.lower() not in ("xamvn", "xam vn"):
-                title = raw
-    if not title:
-        t = soup.select_one("h1.p-title-value")
-        if t:
-            candidate = t.get_text(" ", strip=True)
-            if candidate.lower() not in ("xamvn", "xam vn"):
-                title = candidate
-    return title or thread_url
+    return extract_thread_page(r.text)["title"] or thread_url
+
+
+def crawl_threads(thread_urls, workers=1, pool_size=None):
+    """Yield (url, data) for each thread URL, always in input order.
+
+    With workers > 1 up to 2×workers threads are fetched ahead in a pool of
+    `pool_size` threads (default workers; the adaptive limiter's
+    max_inflight, so it can raise concurrency above the start); results
+    are still handed back in order so checkpoints stay deterministic.
+    """
+    if workers <= 1:
+        for url in thread_urls:
+            yield url, get_mp4s_from_thread(url)
+            pause()
+        return
+
+    pool_size = max(workers, pool_size or workers)
+    urls = iter(thread_urls)
+    with ThreadPoolExecutor(max_workers=pool_size) as pool:
+        pending = deque()
+        for url in urls:
+            pending.append((url, pool.submit(get_mp4s_from_thread, url)))
+            if len(pending) >= pool_size * 2:
+                break
+        while pending:
+            url, fut = pending.popleft()
+            nxt = next(urls, None)
+            if nxt is not None:
+                pending.append((nxt, pool.submit(get_mp4s_from_thread, nxt)))
+            yield url, fut.result()
+
+
+def export(store, clean=False):
+    """store.export(), optionally applying the clean_videos.py rules first."""
+    stats = store.export(clean=clean)
+    if stats is not None:
+        print(f"[clean] {format_stats(stats)}")
+
+
+def put_thread(store, data, dedup=None):
+    """store.put(data), first filtering cross-thread duplicates when dedup
+    is "drop" or "refs"; returns how many videos were duplicates."""
+    dups = 0
+    if dedup:
+        refs = dedup == "refs"
+        data["videos"], dups = store.dedup(thread_key(data), data["videos"], refs)
+    store.put(data)
+    return dups
+
+
+def arg_value(flag, default, cast=str):
+    """Return the value following `flag` in sys.argv, or default."""
+    if flag in sys.argv:
+        idx = sys.argv.index(flag)
+        if idx + 1 < len(sys.argv):
+            return cast(sys.argv[idx + 1])
+    return default
 
 
 # ── MAIN ──────────────────────────────────────────────────
 def main():
     import os, sys
 
+    pop_metrics_flags(sys.argv)
     resume = "--resume" in sys.argv or "-r" in sys.argv
     fix_titles = "--fix-titles" in sys.argv
     new_topics = "--new-topics" in sys.argv
+    export_only = "--export" in sys.argv
+    clean = "--clean" in sys.argv
+    dedup = "drop" if "--dedup" in sys.argv else None
+    if "--dedup-refs" in sys.argv:
+        dedup = "refs"
+    workers = arg_value("--workers", WORKERS, int)
+    rate = arg_value("--rate", RATE, float)
+    max_rate = arg_value("--max-rate", MAX_RATE_FACTOR * rate, float)
+    adaptive = "--fixed-rate" not in sys.argv
+    pool_size = workers
+    if adaptive:
+        pool_size = INFLIGHT_FACTOR * workers
+        fetcher.limiter = HostRateLimiter(
+            rate, burst=workers, max_rate=max_rate, max_inflight=pool_size
+        )
+    elif workers > 1:
+        fetcher.limiter = HostRateLimiter(rate, burst=workers)
+    if "--no-cache" not in sys.argv:
+        fetcher.cache = HTTPCache()
 
     print("=" * 60)
     print(f"Crawling forum: {FORUM_URL}")
     print(f"Max threads: {MAX_THREADS}")
+    if adaptive:
+        print(
+            f"Workers: {workers} (adaptive {rate:.2f} → ≤{max_rate:.2f} req/s,"
+            f" ≤{pool_size} in flight per host)"
+        )
+    elif workers > 1:
+        print(f"Workers: {workers} (per-host budget {rate:.2f} req/s)")
     if resume:
         print("Mode: RESUME (load existing + continue)")
     elif fix_titles:
@@ -315,13 +381,20 @@ def main():
         print(f"Mode: NEW TOPICS (scan {MAX_PAGES} pages, skip duplicate titles)")
     print("=" * 60)
 
-    # ── load existing results if resume / fix-titles / new-topics ──
+    # ── load snapshot + journal ─────────────────────────────
+    store = VideoStore(OUTPUT, OUTPUT_JS)
+    if store.replayed:
+        print(f"Replayed {store.replayed} journal record(s) from {store.journal}")
+    if export_only:
+        export(store, clean)
+        print(f"Exported {len(store.threads)} threads → {OUTPUT} + {OUTPUT_JS}")
+        return
+
+    # ── existing results if resume / fix-titles / new-topics ──
     existing_results = []
     existing_urls = set()
-    if (resume or fix_titles or new_topics) and os.path.exists(OUTPUT):
-        with open(OUTPUT, encoding="utf-8") as f:
-            saved = json.load(f)
-        existing_results = saved.get("threads", [])
+    if resume or fix_titles or new_topics:
+        existing_results = store.threads
         existing_urls = {t["url"] for t in existing_results}
         print(f"Loaded {len(existing_results)} existing threads from {OUTPUT}")
 
@@ -341,14 +414,12 @@ def main():
             print(f"  [{i}/{len(to_fix)}] {t['url']}")
             new_title = fetch_title_only(t["url"])
             t["title"] = new_title
+            store.put(t)
             print(f"  → title: {new_title[:70]}")
             if i % 10 == 0:
-                total_videos = sum(len(t.get("videos", [])) for t in existing_results)
-                save_output(existing_results, total_videos)
-                print(f"  [saved] {i}/{len(to_fix)} titles fixed so far")
-            time.sleep(DELAY)
-        total_videos = sum(len(t.get("videos", [])) for t in existing_results)
-        save_output(existing_results, total_videos)
+                print(f"  [journal] {i}/{len(to_fix)} titles fixed so far")
+            pause()
+        export(store, clean)
         print(f"\nFixed {len(to_fix)} titles → saved to {OUTPUT}")
         return
 
@@ -359,8 +430,17 @@ def main():
         existing_titles.discard("")  # ignore blank titles
         print(f"Existing unique titles in DB: {len(existing_titles)}")
 
-        print(f"\nScanning {MAX_PAGES} listing pages for thread list…")
-        listing = get_thread_list_with_titles(MAX_PAGES)  # [(url, title_hint)]
+        high_water = load_high_water(existing_urls)
+        if "--full-scan" in sys.argv:
+            print(f"\nScanning {MAX_PAGES} listing pages for thread list…")
+            listing = get_thread_list_with_titles(MAX_PAGES)  # [(url, title_hint)]
+        else:
+            stop_after = arg_value("--stop-after", STOP_AFTER, int)
+            print(
+                f"\nScanning listing pages until {stop_after} in a row show no "
+                f"thread ID > {high_water} (max {MAX_PAGES})…"
+            )
+            listing = get_thread_list_with_titles(MAX_PAGES, high_water, stop_after)
         print(f"Total threads found in listing: {len(listing)}")
 
         # Filter: skip URL already crawled OR title already in DB
@@ -380,24 +460,29 @@ def main():
         print(f"Skipped (title duplicate): {skipped_title}")
         print(f"New threads to crawl: {len(to_crawl)}\n")
 
-        results = list(existing_results)
-        total_videos = sum(len(t.get("videos", [])) for t in results)
+        results = store.threads
+        total_videos = store.total
 
-        for i, url in enumerate(to_crawl, 1):
+        for i, (url, data) in enumerate(crawl_threads(to_crawl, workers, pool_size), 1):
             print(f"\n[{i}/{len(to_crawl)}] {url}")
-            data = get_mp4s_from_thread(url)
-            results.append(data)
+            metrics.progress(i, len(to_crawl))
+            dups = put_thread(store, data, dedup)
             total_videos += len(data["videos"])
             flag = " ✓ VIDEO" if data["videos"] else ""
+            flag += f" ({dups} dup)" if dups else ""
             print(f"  → {len(data['videos'])} mp4(s){flag}  |  {data['title'][:70]}")
             if i % 10 == 0:
-                save_output(results, total_videos)
-                print(f"  [saved] {len(results)} threads so far")
-            time.sleep(DELAY)
+                print(f"  [journal] {len(results)} threads so far")
+                if fetcher.rates():
+                    print(f"  [rate] {fetcher.rates()}")
 
-        save_output(results, total_videos)
+        export(store, clean)
+        # advance the high-water mark only once the new threads are stored
+        save_high_water(max([high_water] + [thread_id(u) for u, _ in listing]))
         print(f"\nDONE — {len(results)} total threads, {total_videos} total mp4 links")
         print(f"New threads added: {len(to_crawl)}")
+        if fetcher.cache:
+            print(f"[cache] {fetcher.cache.summary()}")
         return
     thread_urls = get_thread_urls(max_threads=MAX_THREADS)
     print(f"\nCollected {len(thread_urls)} threads to scan.\n")
@@ -408,27 +493,29 @@ def main():
         print(f"Skipping {len(thread_urls) - len(new_urls)} already-crawled threads.")
         print(f"New threads to crawl: {len(new_urls)}\n")
         thread_urls = new_urls
-        results = existing_results
     else:
-        results = []
+        # drop the forum threads only; anh.moe threads (keyed by title)
+        # belong to crawl_anhmoe_videos.py jobs that may be running
+        store.reset([k for k in store.index if not k.startswith("title:")])
+    results = store.threads
 
-    total_videos = sum(len(t.get("videos", [])) for t in results)
+    total_videos = store.total
 
-    for i, url in enumerate(thread_urls, 1):
+    for i, (url, data) in enumerate(crawl_threads(thread_urls, workers, pool_size), 1):
         print(f"\n[{i}/{len(thread_urls)}] {url}")
-        data = get_mp4s_from_thread(url)
-        results.append(data)
+        metrics.progress(i, len(thread_urls))
+        dups = put_thread(store, data, dedup)
         total_videos += len(data["videos"])
         vid_count = len(data["videos"])
         flag = " ✓ VIDEO" if vid_count else ""
+        flag += f" ({dups} dup)" if dups else ""
         print(f"  → {vid_count} mp4 link(s){flag}  |  {data['title'][:70]}")
 
-        # incremental save every 10 threads
+        # every thread is already journaled; just report progress
         if i % 10 == 0:
-            save_output(results, total_videos)
-            print(f"  [saved] {len(results)} threads so far → {OUTPUT}")
-
-        time.sleep(DELAY)
+            print(f"  [journal] {len(results)} threads so far → {store.journal}")
+            if fetcher.rates():
+                print(f"  [rate] {fetcher.rates()}")
 
     # ── summary ──────────────────────────────────────────
     print("\n" + "=" * 60)
@@ -444,8 +531,11 @@ def main():
         print(f"  (IndexedDB handles 50MB+ per origin easily)")
 
     # ── write output ──────────────────────────────────────
-    save_output(results, total_videos)
+    export(store, clean)
     print(f"\nSaved → {OUTPUT} + {OUTPUT_JS}")
+    print(f"[http] {fetcher.summary()}")
+    if fetcher.cache:
+        print(f"[cache] {fetcher.cache.summary()}")
 
 
 if __name__ == "__main__":
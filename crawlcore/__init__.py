@@ -0,0 +1,3 @@
+"""
+Shared helpers for the xamvn.bond / anh.moe crawler scripts.
+"""
@@ -0,0 +1,261 @@
+"""
+asyncio fetch engine shared by the anh.moe crawlers.
+
+One pooled httpx.AsyncClient (HTTP/2 when the `h2` package is installed),
+a semaphore bounding in-flight requests and a per-host token bucket.
+Retries follow the same RetryPolicy as the blocking Fetcher
+(crawlcore/retry.py): a warning on stderr for each failure, no retry for
+a 404-style answer, backoff with jitter or Retry-After otherwise, and
+None when it gives up.
+
+With max_rate set the per-host budget is adaptive (see
+crawlcore/ratelimit.py): `rate` is where each host starts, the AIMD
+controller moves it between MIN_RATE and max_rate from the latency and
+errors it observes, and the in-flight requests per host between 1 and
+2 × workers.
+
+Typical use from a script:
+
+    results = fetch_map(view_links, parse_view_page, HEADERS,
+                        workers=8, rate=4.0, on_result=print_progress)
+
+When the URL list is itself discovered page by page, run_pipeline() lets a
+producer walk the listing while consumers (`workers`, or 2 × workers when
+adaptive) drain a bounded queue, so listing and view fetches overlap
+instead of alternating.
+"""
+
+import asyncio, sys, time
+
+import httpx
+
+from crawlcore.metrics import metrics
+from crawlcore.ratelimit import INFLIGHT_FACTOR, MAX_RATE_FACTOR, AsyncHostRateLimiter
+from crawlcore.retry import RetryPolicy, retryable
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+
+class AsyncFetcher:
+    """Pooled async GET with an in-flight limit and per-host rate budget."""
+
+    def __init__(
+        self,
+        headers,
+        workers=4,
+        rate=2.0,
+        retries=3,
+        timeout=15,
+        policy=None,
+        max_rate=None,
+    ):
+        self.headers = headers
+        self.workers = max(1, int(workers))
+        # adaptive: room for the controller to raise per-host concurrency
+        factor = INFLIGHT_FACTOR if max_rate is not None else 1
+        self.concurrency = self.workers * factor
+        self.policy = policy if policy is not None else RetryPolicy(retries)
+        self.timeout = timeout
+        self.limiter = AsyncHostRateLimiter(
+            rate, burst=self.workers, max_rate=max_rate, max_inflight=self.concurrency
+        )
+        self.client = None
+        self.sem = None
+
+    async def __aenter__(self):
+        self.client = httpx.AsyncClient(
+            headers=self.headers,
+            http2=HTTP2,
+            timeout=self.timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=self.concurrency,
+                max_keepalive_connections=self.concurrency,
+            ),
+        )
+        self.sem = asyncio.Semaphore(self.concurrency)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.client.aclose()
+
+    async def hold(self, url):
+        """Wait out the host's breaker pause, then take a rate token."""
+        pause = self.policy.pause(url)
+        if pause:
+            await asyncio.sleep(pause)
+        await self.limiter.wait(url)
+
+    async def get(self, url):
+        async with self.sem:
+            for i in range(self.policy.retries):
+                status = retry_after = error = None
+                async with self.limiter.slot(url):
+                    await self.hold(url)
+                    t0 = time.monotonic()
+                    r = None
+                    try:
+                        r = await self.client.get(url)
+                        status = r.status_code
+                        r.raise_for_status()
+                    except Exception as e:
+                        error = e
+                        resp = getattr(e, "response", None)
+                        if resp is not None:
+                            retry_after = resp.headers.get("Retry-After")
+                    latency = time.monotonic() - t0
+                    ok = error is None or not retryable(status)
+                    self.limiter.observe(url, latency, ok)
+                nbytes = len(r.content) if r is not None else 0
+                metrics.request(url, status, latency, nbytes, i + 1)
+                if error is None:
+                    self.policy.record(url, ok=True)
+                    return r
+                self.policy.record(url, status, retry_after=retry_after)
+                wait = self.policy.delay(i, status, retry_after)
+                note = f"retry in {wait:.1f}s" if wait is not None else "giving up"
+                print(
+                    f"  [warn] {error} (attempt {i+1}/{self.policy.retries}, {note})",
+                    file=sys.stderr,
+                )
+                if wait is None:
+                    return None
+                await asyncio.sleep(wait)
+        return None
+
+
+async def _fetch_map(urls, parse, headers, workers, rate, on_result, max_rate):
+    async with AsyncFetcher(
+        headers, workers=workers, rate=rate, max_rate=max_rate
+    ) as fetcher:
+
+        async def one(url):
+            r = await fetcher.get(url)
+            with metrics.parsing(url):
+                return parse(url, r.text if r is not None else None)
+
+        tasks = [asyncio.ensure_future(one(u)) for u in urls]
+        results = []
+        for i, (url, task) in enumerate(zip(urls, tasks), 1):
+            res = await task
+            results.append(res)
+            metrics.progress(i, len(urls))
+            if on_result:
+                on_result(i, url, res)
+        return results
+
+
+def fetch_map(
+    urls, parse, headers, workers=4, rate=2.0, on_result=None, max_rate=None
+):
+    """Fetch every URL concurrently and return [parse(url, html_or_None)].
+
+    Results (and on_result(i, url, result) callbacks) come back in input
+    order regardless of completion order.
+    """
+    urls = list(urls)
+    if not urls:
+        return []
+    return asyncio.run(
+        _fetch_map(urls, parse, headers, workers, rate, on_result, max_rate)
+    )
+
+
+async def _pipeline(
+    produce, parse, headers, workers, rate, depth, on_result, max_rate, fetch
+):
+    async with AsyncFetcher(
+        headers, workers=workers, rate=rate, max_rate=max_rate
+    ) as fetcher:
+        queue = asyncio.Queue(maxsize=depth or 4 * fetcher.workers)
+
+        async def consume():
+            while True:
+                url = await queue.get()
+                if url is None:
+                    return
+                if fetch is not None:
+                    res = await fetch(fetcher, url)
+                    fetched = res is not None
+                else:
+                    r = await fetcher.get(url)
+                    with metrics.parsing(url):
+                        res = parse(url, r.text if r is not None else None)
+                    fetched = r is not None
+                if on_result:
+                    on_result(url, fetched, res)
+
+        async def producer():
+            await produce(fetcher, queue.put)
+            for _ in range(fetcher.concurrency):
+                await queue.put(None)  # one stop marker per consumer
+
+        # an exception on either side propagates and cancels the rest
+        consumers = (consume() for _ in range(fetcher.concurrency))
+        await asyncio.gather(producer(), *consumers)
+
+
+def run_pipeline(
+    produce,
+    parse,
+    headers,
+    workers=4,
+    rate=2.0,
+    depth=None,
+    on_result=None,
+    max_rate=None,
+    fetch=None,
+):
+    """Overlap URL discovery with fetching.
+
+    `produce(fetcher, emit)` is a coroutine that fetches listing pages with
+    `await fetcher.get(url)` and hands each discovered URL to `await
+    emit(url)`; emit blocks while `depth` URLs (default 4 × workers) are
+    queued, so discovery never runs far ahead. Each queued URL is fetched
+    by one of fetcher.concurrency consumers (`workers`; 2 × workers when
+    adaptive, with the AIMD in-flight limit deciding how many of them run
+    at once), parsed with parse(url, html_or_None) and reported as
+    on_result(url, fetched, result) in completion order.
+    Listing and view requests share one client and per-host rate budget.
+
+    A coroutine `fetch(fetcher, url)` replaces the GET + parse step for
+    work that is not a plain page fetch (a HEAD probe, a download to hash);
+    its result is reported, fetched being `result is not None`, and parse
+    may be None.
+    """
+    asyncio.run(
+        _pipeline(
+            produce, parse, headers, workers, rate, depth, on_result, max_rate, fetch
+        )
+    )
+
+
+def pop_flag(argv, flag, default, cast=str):
+    """Remove `flag VALUE` from argv in place and return the cast value."""
+    if flag in argv:
+        idx = argv.index(flag)
+        if idx + 1 < len(argv):
+            value = argv[idx + 1]
+            del argv[idx : idx + 2]
+            return cast(value)
+        del argv[idx]
+    return default
+
+
+def pop_rate_flags(argv, default):
+    """Remove --rate R, --max-rate M and --fixed-rate from argv in place.
+
+    Returns (rate, max_rate): the per-host starting rate and the adaptive
+    ceiling (MAX_RATE_FACTOR × rate by default; None with --fixed-rate).
+    """
+    rate = pop_flag(argv, "--rate", default, float)
+    max_rate = pop_flag(argv, "--max-rate", MAX_RATE_FACTOR * rate, float)
+    if "--fixed-rate" in argv:
+        argv.remove("--fixed-rate")
+        max_rate = None
+    return rate, max_rate
@@ -0,0 +1,127 @@
+"""
+anh.moe (Chevereto) page helpers shared by the crawl_anhmoe_*.py scripts.
+
+  HEADERS / fetcher       request headers and the shared blocking Fetcher
+  set_rate(rate, max)     the fetcher's per-host budget (--rate / --max-rate)
+  current_page_num(url)   ?page=N of a listing URL (1 if absent)
+  next_page_url(soup, n)  the page=N+1 link carrying a seek= token
+  parse_listing(url, html)  → (unique /view/ URLs, next page URL or None)
+  view_media(html, prefer)  media URL of a fetched /view/ page (or None)
+  title_from_view_url()   readable title from a /view/ slug
+
+Listing pages paginate with opaque seek= cursors, so the next page must be
+the link for page N+1 *with* a seek= token; the first page= link on a page
+is often a different page.
+
+The shared fetcher paces listing and album pages with an adaptive
+HostRateLimiter (crawlcore/ratelimit.py) starting at PAGE_RATE req/s, so
+the crawlers do not sleep between pages.
+"""
+
+import re
+from html import unescape
+from urllib.parse import parse_qs, urljoin, urlparse
+
+from bs4 import BeautifulSoup
+
+from crawlcore.fetch import Fetcher, headers
+from crawlcore.metrics import metrics
+from crawlcore.ratelimit import MAX_RATE_FACTOR, HostRateLimiter
+
+BASE = "https://anh.moe"
+HEADERS = headers(referer=BASE + "/")
+ID_RE = re.compile(r"^[A-Za-z0-9]{5,12}$")
+DL_RE = re.compile(r"""<a\s[^>]*?\bhref=["']([^"']*\?dl=[^"']*)["']""", re.I)
+# Image CDN: cdn.anh.moe/f/  (e.g. https://cdn.anh.moe/f/mcF5pEO.jpeg)
+IMG_CDN_RE = re.compile(r"^https://cdn\.anh\.moe/f/", re.I)
+CDN_VIDEO_RE = re.compile(
+    r'https://cdn\.(?:save|anh)\.moe/[^\s"\'<>]+\.(?:mp4|webm|mov)',
+    re.I,
+)
+PAGE_RATE = 1.0  # starting req/s for listing / album pages
+
+fetcher = Fetcher(
+    HEADERS, limiter=HostRateLimiter(PAGE_RATE, max_rate=MAX_RATE_FACTOR * PAGE_RATE)
+)
+
+
+def set_rate(rate, max_rate=None):
+    """Start the shared fetcher at `rate` req/s per host, adaptive up to
+    max_rate (fixed at `rate` if None)."""
+    fetcher.limiter = HostRateLimiter(rate, max_rate=max_rate)
+
+
+def get(url):
+    return fetcher.get(url)
+
+
+def current_page_num(url):
+    """Extract ?page=N from URL, default 1."""
+    qs = parse_qs(urlparse(url).query)
+    try:
+        return int(qs.get("page", ["1"])[0])
+    except ValueError:
+        return 1
+
+
+def next_page_url(soup, n):
+    """Link to page n+1 (with its seek= token) on a parsed page, or None."""
+    for a in soup.select("a[href]"):
+        href = a.get("href", "")
+        if f"page={n + 1}" in href and "seek=" in href:
+            return urljoin(BASE, href)
+    return None
+
+
+def parse_listing(url, html):
+    """Parse a fetched listing page → (view_urls, next_page_url_or_None)."""
+    with metrics.parsing(url):
+        soup = BeautifulSoup(html, "html.parser")
+        # unique /view/ links, in page order (each card links twice)
+        hrefs = dict.fromkeys(
+            a.get("href", "") for a in soup.select("a[href^='/view/']")
+        )
+        links = list(dict.fromkeys(urljoin(BASE, h) for h in hrefs))
+        return links, next_page_url(soup, current_page_num(url))
+
+
+def view_media(html, prefer="video"):
+    """Media URL of a fetched /view/ page, or None.
+
+    The first ?dl= download anchor wins (its ?dl=1 stripped), else the
+    first CDN video URL anywhere in the page. prefer="image" (the category
+    crawler) takes the first ?dl= anchor on the image CDN over that.
+    """
+    first = image = None
+    for m in DL_RE.finditer(html):
+        url = unescape(m.group(1)).split("?")[0].strip()
+        if image is None and IMG_CDN_RE.match(url):
+            image = url
+        if url and first is None:
+            first = url
+        if image and prefer != "image":
+            break
+    if prefer == "image" and image:
+        return image
+    if first:
+        return first
+    m = CDN_VIDEO_RE.search(html)
+    return m.group(0) if m else None
+
+
+def title_from_view_url(view_url, spaces=False):
+    """Extract human-readable title from the view URL slug.
+
+    /view/Some.Title.AbC12 → "Some Title": the trailing short ID is
+    dropped when it looks like one (5-12 alphanumerics, not all digits).
+    spaces=True also turns -/_ runs into single spaces (the user crawler's
+    tag titles); the video crawler keeps them, as videos.json already does.
+    """
+    slug = urlparse(view_url).path.rstrip("/").rsplit("/", 1)[-1]
+    parts = slug.split(".")
+    if parts and ID_RE.match(parts[-1]) and not parts[-1].isdigit():
+        parts = parts[:-1]
+    title = " ".join(parts)
+    if spaces:
+        title = re.sub(r"[-_]+", " ", title)
+    return title.strip()
@@ -0,0 +1,124 @@
+"""
+Atomic, crash-safe file writes.
+
+    with atomic_write("videos.json", backup=True) as f:
+        json.dump(data, f)
+
+The data goes to a temp file in the same directory, is fsync'd, and only
+then renamed over the target, so readers (and the next --resume) see
+either the old file or the new one — never a truncated mix. With
+backup=True the previous generation is kept as <path>.bak.
+
+file_lock() serialises read-modify-write cycles between processes (e.g.
+several background crawl jobs updating tags-data.js at once).
+
+append_lines() adds fsync'd lines to a JSONL journal; if a killed writer
+left a torn last line (no trailing newline), the new lines start after a
+newline of their own instead of being glued onto the fragment.
+"""
+
+import json, os, shutil, sys, tempfile
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+def _fsync_dir(dirname):
+    try:
+        fd = os.open(dirname, os.O_RDONLY)
+    except OSError:
+        return  # e.g. Windows: directories cannot be opened
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _backup(path):
+    """Keep the current generation as path.bak (hard link when possible)."""
+    bak = path + ".bak"
+    tmp = bak + ".tmp"
+    try:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        os.link(path, tmp)
+    except OSError:
+        shutil.copy2(path, tmp)
+    os.replace(tmp, bak)
+
+
+@contextmanager
+def atomic_write(path, backup=False, encoding="utf-8"):
+    """Yield a file whose contents atomically replace `path` on success.
+
+    Text mode; encoding=None opens it in binary mode instead.
+    """
+    dirname = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(
+        prefix="." + os.path.basename(path) + ".", suffix=".tmp", dir=dirname
+    )
+    try:
+        if os.path.exists(path):
+            shutil.copymode(path, tmp)
+        else:
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(tmp, 0o666 & ~umask)
+        mode = "w" if encoding else "wb"
+        with os.fdopen(fd, mode, encoding=encoding) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        if backup and os.path.exists(path):
+            _backup(path)
+        os.replace(tmp, path)
+        _fsync_dir(dirname)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def append_lines(path, text):
+    """Append `text` (whole "\n"-terminated lines) to path and fsync it."""
+    with open(path, "a+b") as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell():
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                text = "\n" + text  # close a torn line from a killed writer
+        f.write(text.encode("utf-8"))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def load_json(path):
+    """json.load(path), falling back to path.bak if the file is unreadable."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except ValueError as e:
+        bak = path + ".bak"
+        if not os.path.exists(bak):
+            raise
+        print(f"[warn] {path} is corrupt ({e}); using {bak}", file=sys.stderr)
+        with open(bak, encoding="utf-8") as f:
+            return json.load(f)
+
+
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive advisory lock on path.lock for the duration."""
+    with open(path + ".lock", "a") as lf:
+        if fcntl is not None:
+            fcntl.flock(lf.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lf.fileno(), fcntl.LOCK_UN)
@@ -0,0 +1,134 @@
+"""
+Resolve anh.moe media URLs from listing-page card data ("fast resolve").
+
+The category / album / user crawlers open one /view/ page per card only to
+read its ?dl= anchor, which is the card's original file URL. Chevereto
+listing cards usually carry that URL already:
+
+  <div class="list-item" data-type="image" data-object="%7B...%7D">
+    <a href="/view/Some.Title.AbC12">  <img src=".../AbC12.th.jpeg">
+
+CardParser reads every card in one html.parser pass; resolve_cards() then
+tries, per card, the url-encoded data-object JSON ("url", then
+"image"/"video" → "url"), direct data-url / data-src / data-download
+attributes and, for image cards only, the thumbnail with its .th./.md./.fr.
+size suffix stripped. A candidate counts only if the caller's accept()
+agrees (e.g. the category crawler's cdn.anh.moe/f/ rule), so anything
+uncertain falls back to the normal view-page fetch.
+"""
+
+import json, re
+from html.parser import HTMLParser
+from urllib.parse import unquote, urljoin
+
+from crawlcore.viewindex import media_kind
+
+URL_ATTRS = ("data-url", "data-src", "data-download", "data-original")
+SIZE_RE = re.compile(r"\.(md|th|fr)\.")
+
+
+def full_res(url):
+    """Strip the .md. / .th. / .fr. size suffix from a Chevereto file URL."""
+    return SIZE_RE.sub(".", url)
+
+
+class CardParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.cards = []  # {"type", "object", "attrs", "view", "thumb"}
+        self._card = None
+
+    def handle_starttag(self, tag, attrs):
+        a = dict(attrs)
+        if tag == "div" and "list-item" in (a.get("class") or "").split():
+            self._card = {
+                "type": a.get("data-type"),
+                "object": a.get("data-object"),
+                "attrs": [a[k] for k in URL_ATTRS if a.get(k)],
+                "view": None,
+                "thumb": None,
+            }
+            self.cards.append(self._card)
+        elif self._card is None:
+            return
+        elif tag == "a":
+            href = a.get("href") or ""
+            if href.startswith("/view/") and self._card["view"] is None:
+                self._card["view"] = href
+        elif tag == "img" and self._card["thumb"] is None:
+            self._card["thumb"] = a.get("src") or a.get("data-src")
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+
+
+def _object_urls(raw):
+    try:
+        obj = json.loads(unquote(raw))
+    except ValueError:
+        return []
+    if not isinstance(obj, dict):
+        return []
+    urls = [obj.get("url")]
+    for key in ("image", "video"):
+        if isinstance(obj.get(key), dict):
+            urls.append(obj[key].get("url"))
+    return [u for u in urls if isinstance(u, str)]
+
+
+def candidates(card):
+    """Possible original-file URLs for one card, most reliable first."""
+    out = []
+    if card["object"]:
+        out += _object_urls(card["object"])
+    out += card["attrs"]
+    if card["thumb"] and card["type"] != "video":
+        out.append(full_res(card["thumb"]))
+    return [u.split("?")[0] for u in out if u.startswith("http")]
+
+
+def resolve_cards(html, base, accept=None):
+    """Return {view_url: media_url} for the cards on a listing page that
+    could be resolved without visiting their view page.
+
+    accept(media_url) filters candidates; by default any URL is accepted.
+    """
+    p = CardParser()
+    p.feed(html)
+    p.close()
+    resolved = {}
+    for card in p.cards:
+        if not card["view"]:
+            continue
+        view_url = urljoin(base, card["view"])
+        if view_url in resolved:
+            continue
+        for media in candidates(card):
+            if accept is None or accept(media):
+                resolved[view_url] = media
+                break
+    return resolved
+
+
+def is_video(media):
+    return media_kind(media) == "video"
+
+
+class HitRate:
+    """Counts cards resolved from listing data vs. needing a view fetch."""
+
+    def __init__(self):
+        self.resolved = 0
+        self.fetched = 0
+
+    def add(self, resolved, fetched):
+        self.resolved += resolved
+        self.fetched += fetched
+
+    def summary(self):
+        total = self.resolved + self.fetched
+        pct = 100 * self.resolved / total if total else 0
+        return (
+            f"{self.resolved}/{total} new card(s) resolved from listing data "
+            f"({pct:.0f}%), {self.fetched} view page fetch(es)"
+        )
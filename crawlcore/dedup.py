@@ -0,0 +1,162 @@
+"""
+Cross-thread video deduplication: normalized URL → first thread holding it.
+
+Crawlers only ever deduplicated inside one thread, so the same CDN mp4
+reposted in many XamVN threads / anh.moe albums was stored once per thread.
+UrlIndex maps every normalized video URL to the key (see thread_key()) of
+the first thread that stored it. VideoStore keeps one up to date as
+records are applied (snapshot load, journal replay and every put/merge),
+so a crawler can check each new video against the whole dataset in O(1).
+
+URLs are compared scheme-less, with the host lowercased and default ports,
+fragments and surrounding whitespace dropped.
+
+A duplicate is either left out or, with refs=True, stored as a reference
+instead of a copy:
+
+  {"ref": "<owner thread key>", "name": "<file name>"}
+
+videos.html skips entries without a url, so a reference is not shown a
+second time; expand_refs() turns references back into copies.
+"""
+
+from urllib.parse import urlsplit
+
+DEFAULT_PORTS = {"http": "80", "https": "443"}
+
+
+def normalize_url(url):
+    """Comparison key of a video URL (scheme-less, host lowercased)."""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.rsplit(":", 1)[-1] == DEFAULT_PORTS.get(parts.scheme.lower()):
+        host = host.rsplit(":", 1)[0]
+    key = host + parts.path
+    return key + "?" + parts.query if parts.query else key
+
+
+# same as store.vid_url / store.thread_key (store imports this module)
+def _url(v):
+    return v if isinstance(v, str) else v.get("url", "")
+
+
+def _key(thread):
+    return thread.get("url") or "title:" + thread.get("title", "")
+
+
+def is_ref(v):
+    return isinstance(v, dict) and "ref" in v
+
+
+def make_ref(owner, url):
+    return {"ref": owner, "name": url.rstrip("/").rsplit("/", 1)[-1]}
+
+
+class UrlIndex:
+    def __init__(self):
+        self.owners = {}  # normalized URL → thread key
+
+    def __len__(self):
+        return len(self.owners)
+
+    def owner(self, url):
+        return self.owners.get(normalize_url(url))
+
+    def claim(self, key, videos):
+        """Record key as owner of every video not owned yet."""
+        for v in videos:
+            u = _url(v)
+            if u.startswith("http"):
+                self.owners.setdefault(normalize_url(u), key)
+
+    def release(self, key, videos):
+        for v in videos:
+            u = _url(v)
+            if u and self.owners.get(normalize_url(u)) == key:
+                del self.owners[normalize_url(u)]
+
+    def build(self, threads):
+        self.owners = {}
+        for t in threads:
+            self.claim(_key(t), t.get("videos", []))
+
+    def split(self, key, videos, refs=False):
+        """Return (videos to store for thread `key`, number of duplicates).
+
+        Videos owned by another thread are dropped, or replaced by a
+        reference with refs=True; references already present are kept.
+        """
+        out, dups = [], 0
+        for v in videos:
+            u = _url(v)
+            owner = self.owner(u) if u else None
+            if owner is None or owner == key:
+                out.append(v)
+                continue
+            dups += 1
+            if refs:
+                out.append(make_ref(owner, u))
+        return out, dups
+
+
+# ── whole-dataset passes (dedup_videos.py) ────────────────
+def find_duplicates(threads):
+    """{normalized URL: [owner key, other thread key, ...]} for every URL
+    stored in more than one thread (owners are the first in file order)."""
+    holders = {}
+    for t in threads:
+        key = _key(t)
+        for v in t.get("videos", []):
+            u = _url(v)
+            if u.startswith("http"):
+                keys = holders.setdefault(normalize_url(u), [])
+                if key not in keys:
+                    keys.append(key)
+    return {u: keys for u, keys in holders.items() if len(keys) > 1}
+
+
+def dedup_threads(threads, refs=False):
+    """Return (new thread list, {thread key: duplicates removed}).
+
+    The first thread (in file order) holding a URL keeps it; threads are
+    copied only when something changes.
+    """
+    index = UrlIndex()
+    out, removed = [], {}
+    for t in threads:
+        key = _key(t)
+        videos = t.get("videos", [])
+        kept, dups = index.split(key, videos, refs)
+        index.claim(key, kept)
+        if dups:
+            removed[key] = dups
+            t = dict(t, videos=kept)
+        out.append(t)
+    return out, removed
+
+
+def expand_refs(threads):
+    """Replace references with copies of the owner's entry, in place.
+
+    Returns (expanded, unresolved): references whose owner thread or file
+    name no longer exists are left as they are.
+    """
+    by_key = {_key(t): t for t in threads}
+    expanded = unresolved = 0
+    for t in threads:
+        videos = t.get("videos", [])
+        for i, v in enumerate(videos):
+            if not is_ref(v):
+                continue
+            owner = by_key.get(v["ref"])
+            match = None
+            for w in owner.get("videos", []) if owner else []:
+                if not is_ref(w) and _url(w).rstrip("/").endswith("/" + v["name"]):
+                    match = w
+                    break
+            if match is None:
+                unresolved += 1
+            else:
+                videos[i] = match if isinstance(match, str) else dict(match)
+                expanded += 1
+    return expanded, unresolved
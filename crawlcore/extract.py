@@ -0,0 +1,146 @@
+"""
+Single-pass extractor for XenForo thread pages.
+
+get_mp4s_from_thread() used to build a BeautifulSoup tree per page and then
+walk it three times (select video/source, find_all over every element,
+select_one for title and next link). ThreadPageParser gets the same data
+from one html.parser event stream with no tree: og:title, <title>,
+h1.p-title-value text, <video>/<source> src, mp4s in the five URL-carrying
+attributes, and whether a next-page link exists.
+
+Result order matches the old three passes exactly (raw-HTML regex hits,
+then video/source src, then attribute hits), so callers that dedup in
+order see the same list. bench/bench_extract.py checks that and times
+both implementations.
+"""
+
+import re
+from html.parser import HTMLParser
+
+# CDN pattern – expand regex if other CDN domains appear
+CDN_RE = re.compile(r'https?://[^\s"\'<>]+\.mp4', re.IGNORECASE)
+MP4_ATTRS = ("href", "data-url", "data-src", "data-original", "content")
+SITE_NAMES = ("xamvn", "xam vn")
+VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr",
+}
+
+
+class ThreadPageParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.og_title = None
+        self.title = None
+        self.h1 = None
+        self.tag_srcs = []  # <video src>, <source src>
+        self.attr_mp4s = []  # mp4s found in MP4_ATTRS
+        self.has_next = False
+        self._text = None  # "title" / "h1" while collecting text
+        self._buf = []
+        self._h1_depth = 0
+        # [tag, depth] per open class="pagination" element; depth counts
+        # open same-name descendants so a nested </div> does not close it
+        self._pagination = []
+
+    def handle_starttag(self, tag, attrs):
+        a = dict(attrs)
+        classes = (a.get("class") or "").split()
+
+        if tag == "meta":
+            if self.og_title is None and a.get("property") == "og:title":
+                self.og_title = a.get("content") or ""
+        elif tag == "title":
+            if self.title is None and self._text is None:
+                self._text, self._buf = "title", []
+        elif tag == "h1":
+            if self._text == "h1":
+                self._h1_depth += 1
+            elif self.h1 is None and self._text is None and "p-title-value" in classes:
+                self._text, self._buf, self._h1_depth = "h1", [], 1
+        elif tag in ("video", "source"):
+            src = a.get("src")
+            if src is not None and ".mp4" in src.lower():
+                self.tag_srcs.append(src)
+        elif tag == "a" and not self.has_next:
+            if (
+                "pageNav-jump--next" in classes
+                or a.get("rel") == "next"
+                or (self._pagination and "next" in classes)
+            ):
+                self.has_next = True
+
+        if tag not in VOID_TAGS:
+            if "pagination" in classes:
+                self._pagination.append([tag, 1])
+            elif self._pagination and self._pagination[-1][0] == tag:
+                self._pagination[-1][1] += 1
+
+        for attr in MP4_ATTRS:
+            val = a.get(attr)
+            if val and ".mp4" in val.lower():
+                self.attr_mp4s.extend(CDN_RE.findall(val))
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self._close_pagination(tag)
+
+    def _close_pagination(self, tag):
+        if self._pagination and self._pagination[-1][0] == tag:
+            self._pagination[-1][1] -= 1
+            if self._pagination[-1][1] == 0:
+                self._pagination.pop()
+
+    def handle_endtag(self, tag):
+        if self._text == "title" and tag == "title":
+            self.title = "".join(s.strip() for s in self._buf)
+            self._text = None
+        elif self._text == "h1" and tag == "h1":
+            self._h1_depth -= 1
+            if self._h1_depth == 0:
+                self.h1 = " ".join(s.strip() for s in self._buf if s.strip())
+                self._text = None
+        self._close_pagination(tag)
+
+    def handle_data(self, data):
+        if self._text is not None:
+            self._buf.append(data)
+
+
+def _strip_site(raw):
+    # strip site suffix: " | Xamvn - ..." or " | XAMVN"
+    if " | " in raw:
+        raw = raw[: raw.rfind(" | ")].strip()
+    return raw if raw and raw.lower() not in SITE_NAMES else ""
+
+
+def pick_title(p):
+    """og:title → <title> → h1.p-title-value, each minus the site suffix."""
+    if p.og_title:
+        title = _strip_site(p.og_title.strip())
+        if title:
+            return title
+    if p.title is not None:
+        title = _strip_site(p.title)
+        if title:
+            return title
+    if p.h1 is not None and p.h1.lower() not in SITE_NAMES:
+        return p.h1
+    return ""
+
+
+def extract_thread_page(html):
+    """Return {"title", "mp4s", "has_next"} for one thread page.
+
+    mp4s is the in-order candidate list (may repeat); title is "" if none
+    of the fallbacks produced one.
+    """
+    p = ThreadPageParser()
+    p.feed(html)
+    p.close()
+    return {
+        "title": pick_title(p),
+        "mp4s": CDN_RE.findall(html) + p.tag_srcs + p.attr_mp4s,
+        "has_next": p.has_next,
+    }
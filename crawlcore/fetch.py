@@ -0,0 +1,160 @@
+"""
+Shared blocking HTTP client for the crawler scripts.
+
+Every crawler used to carry its own copy of HEADERS, a module-level
+requests.Session and a get() retry loop. Fetcher is that loop in one
+place:
+
+  fetcher = Fetcher(headers(referer="https://anh.moe/"))
+  r = fetcher.get(url)          # Response, or None once it gives up
+
+It keeps one pooled requests.Session per thread (Session is not
+thread-safe), waits on an optional per-host HostRateLimiter before each
+attempt, revalidates through an optional HTTPCache, and counts requests,
+failures and bytes for summary(). The limiter is told each request's
+latency and outcome; an adaptive one (max_rate set) tunes the host's rate
+and in-flight limit from them, and so is crawlcore.metrics. Retries follow a RetryPolicy
+(crawlcore/retry.py): a 404 fails at once, 429/5xx/network errors back
+off exponentially with jitter or as long as Retry-After says, and a host
+whose requests keep failing is paused by the policy's breaker. The async
+crawlers (crawlcore/aiofetch.py) are given the same headers() and policy.
+"""
+
+import sys, threading, time
+from contextlib import nullcontext
+
+import requests
+
+from crawlcore.metrics import metrics
+
+from crawlcore.retry import RetryPolicy, retryable
+
+USER_AGENT = (
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
+)
+TIMEOUT = 15
+RETRIES = 3
+
+
+def headers(referer=None):
+    h = {"User-Agent": USER_AGENT}
+    if referer:
+        h["Referer"] = referer
+    return h
+
+
+class Fetcher:
+    def __init__(
+        self,
+        headers,
+        retries=RETRIES,
+        timeout=TIMEOUT,
+        limiter=None,
+        cache=None,
+        policy=None,
+    ):
+        self.headers = headers
+        self.policy = policy if policy is not None else RetryPolicy(retries)
+        self.timeout = timeout
+        self.limiter = limiter  # HostRateLimiter, or None for unthrottled
+        self.cache = cache  # HTTPCache, or None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.requests = self.failed = self.bytes = 0
+
+    @property
+    def session(self):
+        """This thread's requests.Session."""
+        s = getattr(self._local, "session", None)
+        if s is None:
+            s = self._local.session = requests.Session()
+            s.headers.update(self.headers)
+        return s
+
+    def _count(self, r=None):
+        with self._lock:
+            self.requests += 1
+            if r is None:
+                self.failed += 1
+            else:
+                self.bytes += len(r.content)
+
+    def _attempt(self, url, attempt):
+        """One request → (response, None) or (None, exception)."""
+        hold = self.policy.pause(url)
+        if hold:
+            time.sleep(hold)
+        with self.limiter.slot(url) if self.limiter else nullcontext():
+            if self.limiter is not None:
+                self.limiter.wait(url)
+            t0 = time.monotonic()
+            r, error = self._send(url)
+            latency = time.monotonic() - t0
+            resp = r if r is not None else getattr(error, "response", None)
+            status = resp.status_code if resp is not None else None
+            if self.limiter is not None:
+                ok = error is None or not retryable(status)
+                self.limiter.observe(url, latency, ok)
+        metrics.request(
+            url,
+            status,
+            latency,
+            len(r.content) if r is not None else 0,
+            attempt,
+            getattr(r, "from_cache", False),
+        )
+        return r, error
+
+    def _send(self, url):
+        try:
+            if self.cache is not None:
+                r = self.cache.get(self.session, url, timeout=self.timeout)
+            else:
+                r = self.session.get(url, timeout=self.timeout)
+                r.raise_for_status()
+            return r, None
+        except Exception as e:
+            return None, e
+
+    def get(self, url):
+        for i in range(self.policy.retries):
+            r, error = self._attempt(url, i + 1)
+            if error is None:
+                self._count(r)
+                self.policy.record(url, ok=True)
+                return r
+            self._count()
+            status = retry_after = None
+            resp = getattr(error, "response", None)
+            if resp is not None:
+                status = resp.status_code
+                retry_after = resp.headers.get("Retry-After")
+            self.policy.record(url, status, retry_after=retry_after)
+            wait = self.policy.delay(i, status, retry_after)
+            note = f"retry in {wait:.1f}s" if wait is not None else "giving up"
+            print(
+                f"  [warn] {error} (attempt {i+1}/{self.policy.retries}, {note})",
+                file=sys.stderr,
+            )
+            if wait is None:
+                return None
+            time.sleep(wait)
+        return None
+
+    def summary(self):
+        line = (
+            f"{self.requests} request(s), {self.failed} failed, "
+            f"{self.bytes / 1e6:.1f} MB received"
+        )
+        trips = self.policy.breaker.trips
+        if trips:
+            line += f", host paused {trips} time(s)"
+        rates = self.rates()
+        return line + (f"; rate {rates}" if rates else "")
+
+    def rates(self):
+        """Current per-host rates of an adaptive limiter ('' otherwise)."""
+        if self.limiter is None or self.limiter.max_rate is None:
+            return ""
+        return ", ".join(f"{h} {r:.2f}/s" for h, r in self.limiter.rates().items())
@@ -0,0 +1,186 @@
+"""
+On-disk crawl frontier for the anh.moe listing → /view/ crawlers.
+
+One JSONL journal per job (script + start URL + tag) under FRONTIER_DIR,
+appended and fsync'd as the crawl goes:
+
+  {"op": "page", "url": "...", "links": [...], "next": "...?page=N&seek=..."}
+  {"op": "done", "url": "...", "result": ...}
+  {"op": "failed", "url": "..."}
+  {"op": "end"}                                   listing exhausted
+
+Replaying it gives back the listing cursor (the next page URL with its
+seek= token), every discovered view URL with its state (pending / done /
+failed) and the parsed result of each done page. A restarted job
+therefore continues with the next listing page and only fetches view
+pages that are still pending or failed. The scripts delete the journal
+once their output is written (Frontier.remove()); --restart discards it
+up front. As in crawlcore.store, a torn line is skipped with a warning
+and later appends start on a fresh line after it.
+"""
+
+import hashlib, json, os, sys
+
+from crawlcore.atomicio import append_lines
+
+FRONTIER_DIR = ".frontier"
+
+
+class Frontier:
+    def __init__(self, path, start_url):
+        self.path = path
+        self.start_url = start_url
+        self.cursor = start_url  # next listing page to fetch, None when done
+        self.pages = []  # listing pages already fetched
+        self.state = {}  # view url → "pending" | "done" | "failed" (discovery order)
+        self.results = {}  # view url → parse result
+        self.replayed = 0
+        if os.path.exists(path):
+            self._load()
+
+    @classmethod
+    def for_job(cls, script, start_url, *key, fresh=False, root=FRONTIER_DIR):
+        """Frontier for one job, e.g. Frontier.for_job("category", url, tag).
+
+        fresh=True discards any saved state for the job first.
+        """
+        os.makedirs(root, exist_ok=True)
+        ident = json.dumps([start_url] + list(key), ensure_ascii=False)
+        digest = hashlib.sha1(ident.encode("utf-8")).hexdigest()[:12]
+        path = os.path.join(root, f"{script}-{digest}.jsonl")
+        if fresh and os.path.exists(path):
+            os.remove(path)
+        return cls(path, start_url)
+
+    # ── loading ──────────────────────────────────────────
+    def _load(self):
+        with open(self.path, encoding="utf-8") as f:
+            for n, line in enumerate(f, 1):
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    # torn line from an interrupted append
+                    print(
+                        f"[warn] {self.path}:{n}: skipped a torn record",
+                        file=sys.stderr,
+                    )
+                    continue
+                self._apply(rec)
+                self.replayed += 1
+
+    def _apply(self, rec):
+        op = rec.get("op")
+        if op == "page":
+            self.pages.append(rec["url"])
+            for u in rec["links"]:
+                self.state.setdefault(u, "pending")
+            self.cursor = rec.get("next")
+        elif op == "done":
+            self.state[rec["url"]] = "done"
+            self.results[rec["url"]] = rec.get("result")
+        elif op == "failed":
+            self.state[rec["url"]] = "failed"
+        elif op == "end":
+            self.cursor = None
+
+    def _append(self, *recs):
+        for rec in recs:
+            self._apply(rec)
+        lines = "".join(
+            json.dumps(rec, ensure_ascii=False, separators=(",", ":")) + "\n"
+            for rec in recs
+        )
+        append_lines(self.path, lines)
+
+    # ── listing ──────────────────────────────────────────
+    def add_page(self, url, links, next_url):
+        """Record a fetched listing page, its view links and the next cursor."""
+        self._append({"op": "page", "url": url, "links": links, "next": next_url})
+
+    def end(self):
+        """Mark the listing as exhausted (no further pages to fetch)."""
+        self._append({"op": "end"})
+
+    def seen_page(self, url):
+        return url in self.pages
+
+    # ── view pages ───────────────────────────────────────
+    def pending(self):
+        """View URLs still to fetch (pending, plus failed ones to retry)."""
+        return [u for u, s in self.state.items() if s != "done"]
+
+    def done(self, url, result):
+        self._append({"op": "done", "url": url, "result": result})
+
+    def failed(self, url):
+        self._append({"op": "failed", "url": url})
+
+    def settle(self, urls, index, result_for):
+        """Mark urls already in `index` (a ViewIndex) done without fetching.
+
+        result_for(url, entry) turns the index entry into what the script's
+        parse function would have returned. Returns the urls still to fetch.
+        """
+        todo, known = [], []
+        for u in urls:
+            entry = index.get(u)
+            if entry is None:
+                todo.append(u)
+            else:
+                known.append({"op": "done", "url": u, "result": result_for(u, entry)})
+        if known:
+            self._append(*known)  # one fsync for the whole batch
+        return todo
+
+    def fetch_pending(
+        self, parse, headers, workers, rate, on_result=None, max_rate=None
+    ):
+        """fetch_map() over pending URLs, journaling each outcome as it lands.
+
+        A page whose fetch failed (html None) is marked failed and retried
+        on the next run; anything that was fetched is done, whatever parse()
+        made of it.
+        """
+        from crawlcore.aiofetch import fetch_map  # httpx only when fetching
+
+        def tracked(url, html):
+            return html is not None, parse(url, html)
+
+        def record(i, url, res):
+            fetched, result = res
+            if fetched:
+                self.done(url, result)
+            else:
+                self.failed(url)
+            if on_result:
+                on_result(i, url, result)
+
+        urls = self.pending()
+        fetch_map(urls, tracked, headers, workers, rate, record, max_rate)
+        return len(urls)
+
+    def ordered_results(self):
+        """Results of done view pages, in discovery order."""
+        return [self.results[u] for u, s in self.state.items() if s == "done"]
+
+    def summary(self):
+        counts = {"pending": 0, "done": 0, "failed": 0}
+        for s in self.state.values():
+            counts[s] += 1
+        where = "listing complete" if self.cursor is None else f"next {self.cursor}"
+        return (
+            f"{len(self.pages)} listing page(s), {counts['done']} done, "
+            f"{counts['pending']} pending, {counts['failed']} failed; {where}"
+        )
+
+    def complete(self, max_pages=None):
+        """Listing exhausted (or max_pages reached) and nothing left to fetch."""
+        walked = self.cursor is None or (
+            max_pages is not None and len(self.pages) >= max_pages
+        )
+        return walked and not self.pending()
+
+    def remove(self):
+        """Delete the journal once the job's output has been written."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,100 @@
+"""
+On-disk conditional-GET cache.
+
+Each URL is stored as <sha1>.json (validators + encoding) and <sha1>.body
+under CACHE_DIR. Later requests send If-None-Match / If-Modified-Since; a
+304 is answered from the local body, so unchanged listing and thread pages
+cost one round trip and no transfer. Only responses that carry an ETag or
+Last-Modified header are stored.
+"""
+
+import hashlib, json, os, threading
+
+from crawlcore.atomicio import atomic_write
+
+CACHE_DIR = ".http-cache"
+
+
+class CachedResponse:
+    """Minimal stand-in for requests.Response for a 304-revalidated body."""
+
+    status_code = 200
+    from_cache = True
+
+    def __init__(self, url, content, encoding):
+        self.url = url
+        self.content = content
+        self.encoding = encoding or "utf-8"
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding, errors="replace")
+
+    def raise_for_status(self):
+        pass
+
+
+class HTTPCache:
+    def __init__(self, root=CACHE_DIR):
+        self.root = root
+        self.hits = 0  # 304 → served from disk
+        self.misses = 0  # full 200 response
+        self.lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, url, ext):
+        return os.path.join(
+            self.root, hashlib.sha1(url.encode("utf-8")).hexdigest() + ext
+        )
+
+    def _meta(self, url):
+        meta_path, body_path = self._path(url, ".json"), self._path(url, ".body")
+        if not (os.path.exists(meta_path) and os.path.exists(body_path)):
+            return None
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                return json.load(f)
+        except ValueError:
+            return None
+
+    def _store(self, url, r):
+        with atomic_write(self._path(url, ".body"), encoding=None) as f:
+            f.write(r.content)
+        with atomic_write(self._path(url, ".json")) as f:
+            json.dump(
+                {
+                    "url": url,
+                    "etag": r.headers.get("ETag"),
+                    "last_modified": r.headers.get("Last-Modified"),
+                    "encoding": r.encoding,
+                },
+                f,
+            )
+
+    def get(self, session, url, timeout=15):
+        """Conditional GET through `session`; raises like raise_for_status()."""
+        meta = self._meta(url)
+        headers = {}
+        if meta:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+        r = session.get(url, timeout=timeout, headers=headers)
+        if r.status_code == 304 and meta:
+            with open(self._path(url, ".body"), "rb") as f:
+                body = f.read()
+            with self.lock:
+                self.hits += 1
+            return CachedResponse(url, body, meta.get("encoding"))
+        r.raise_for_status()
+        if r.headers.get("ETag") or r.headers.get("Last-Modified"):
+            self._store(url, r)
+        with self.lock:
+            self.misses += 1
+        return r
+
+    def summary(self):
+        total = self.hits + self.misses
+        pct = 100 * self.hits / total if total else 0
+        return f"{self.hits}/{total} pages revalidated from cache (304, {pct:.0f}%)"
@@ -0,0 +1,326 @@
+"""
+Per-request metrics, JSONL tracing and optional profiling for the crawlers.
+
+  from crawlcore.metrics import metrics, pop_metrics_flags, profiled
+  pop_metrics_flags(sys.argv)      # --metrics FILE, --profile cprofile|pyinstrument
+
+Fetcher and AsyncFetcher report every attempt with metrics.request();
+parse steps are timed with `with metrics.parsing(url):`. Each URL is put
+in a class (listing / thread / view / cdn) so time can be broken down by
+page type. With --metrics FILE every event is appended to FILE as one
+JSON object per line:
+
+  {"ev": "fetch", "t": 1718000000.12, "class": "view", "url": "...",
+   "status": 200, "ms": 231.4, "bytes": 18342, "attempt": 1, "cached": false}
+  {"ev": "parse", "t": ..., "class": "thread", "url": "...", "ms": 3.1}
+  {"ev": "summary", "t": ..., "pages_s": 4.2, "p50_ms": ..., ...}
+
+Every EVERY seconds a [metrics] line gives pages/s, p50/p95 latency and
+the error rate over the interval, plus an ETA once the script reports
+progress(done, total); at exit a per-class table follows. Nothing is
+recorded until start() (or pop_metrics_flags) is called.
+
+@profiled functions are profiled per call when --profile is given; calls
+are aggregated per function and written at exit to profile-<name>.prof
+(cProfile, top entries printed) or profile-<name>.html (pyinstrument, if
+installed). Calls from worker threads are profiled in their own thread.
+"""
+
+import atexit, cProfile, functools, io, json, pstats, sys, threading, time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+try:
+    from pyinstrument import Profiler as _PyiProfiler
+    from pyinstrument.renderers import HTMLRenderer
+    from pyinstrument.session import Session
+
+    HAVE_PYINSTRUMENT = True
+except ImportError:
+    HAVE_PYINSTRUMENT = False
+
+EVERY = 30  # s between [metrics] lines
+MEDIA_EXT = (".mp4", ".webm", ".mov", ".jpg", ".jpeg", ".png", ".webp", ".gif")
+PROFILE_TOP = 15  # cProfile entries printed per function
+
+
+def url_class(url):
+    """listing / thread / view / cdn for a crawled URL."""
+    u = urlparse(url)
+    path = u.path.lower()
+    if u.netloc.lower().startswith("cdn") or path.endswith(MEDIA_EXT):
+        return "cdn"
+    if "/threads/" in path:
+        return "thread"
+    if path.startswith("/view/"):
+        return "view"
+    return "listing"
+
+
+def _pct(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def _size(nbytes):
+    return f"{nbytes / 1e6:.1f} MB" if nbytes >= 1e6 else f"{nbytes / 1e3:.0f} KB"
+
+
+def _eta(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    return f"{seconds // 60}m{seconds % 60:02d}s"
+
+
+class Metrics:
+    def __init__(self):
+        self.on = False
+        self.out = None
+        self.profiler = None
+        self.lock = threading.Lock()
+
+    def start(self, path=None, profile=None, every=EVERY):
+        """Begin recording; events go to `path` (JSONL) if given."""
+        self.on = True
+        self.every = every
+        self.t0 = self.last = time.monotonic()
+        self.window = []  # (ms, error) since the last summary line
+        self.classes = {}  # class → {"n", "errors", "retries", "bytes", "ms": [], "parse": []}
+        self.done = self.total = None
+        self.progress_t0 = None
+        if path:
+            self.out = open(path, "a", encoding="utf-8")
+        if profile:
+            self.profiler = FunctionProfiler(profile)
+        atexit.register(self.finish)
+
+    def _class(self, cls):
+        c = self.classes.get(cls)
+        if c is None:
+            c = self.classes[cls] = {
+                "n": 0,
+                "errors": 0,
+                "retries": 0,
+                "bytes": 0,
+                "ms": [],
+                "parse": [],
+            }
+        return c
+
+    def _emit(self, event):
+        if self.out is not None:
+            event["t"] = round(time.time(), 3)
+            self.out.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+    def request(self, url, status, seconds, nbytes=0, attempt=1, cached=False):
+        """One HTTP attempt (status None for a network error)."""
+        if not self.on:
+            return
+        ms = round(1000 * seconds, 1)
+        cls = url_class(url)
+        error = status is None or status >= 400
+        with self.lock:
+            c = self._class(cls)
+            c["n"] += 1
+            c["errors"] += error
+            c["retries"] += attempt > 1
+            c["bytes"] += nbytes
+            c["ms"].append(ms)
+            self.window.append((ms, error))
+            self._emit(
+                {
+                    "ev": "fetch",
+                    "class": cls,
+                    "url": url,
+                    "status": status,
+                    "ms": ms,
+                    "bytes": nbytes,
+                    "attempt": attempt,
+                    "cached": cached,
+                }
+            )
+            if time.monotonic() - self.last >= self.every:
+                self._summary()
+
+    @contextmanager
+    def parsing(self, url):
+        """Time the parse of one fetched page."""
+        if not self.on:
+            yield
+            return
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            ms = round(1000 * (time.perf_counter() - t0), 2)
+            cls = url_class(url)
+            with self.lock:
+                self._class(cls)["parse"].append(ms)
+                self._emit({"ev": "parse", "class": cls, "url": url, "ms": ms})
+
+    def progress(self, done, total):
+        """Items finished out of total, for the ETA."""
+        if not self.on:
+            return
+        with self.lock:
+            if self.progress_t0 is None or (self.done is not None and done < self.done):
+                self.progress_t0 = (time.monotonic(), done)
+            self.done, self.total = done, total
+
+    def _summary(self):
+        now = time.monotonic()
+        span = max(now - self.last, 1e-9)
+        lat = [ms for ms, _ in self.window]
+        errors = sum(e for _, e in self.window)
+        ok = len(self.window) - errors
+        stats = {
+            "ev": "summary",
+            "pages_s": round(ok / span, 2),
+            "p50_ms": _pct(lat, 0.5),
+            "p95_ms": _pct(lat, 0.95),
+            "error_rate": round(errors / len(self.window), 3) if self.window else 0.0,
+            "requests": sum(c["n"] for c in self.classes.values()),
+        }
+        line = (
+            f"[metrics] {stats['pages_s']:.1f} pages/s  p50 {stats['p50_ms']:.0f}ms"
+            f"  p95 {stats['p95_ms']:.0f}ms  errors {100 * stats['error_rate']:.1f}%"
+        )
+        if self.total and self.progress_t0 is not None:
+            t_start, d_start = self.progress_t0
+            rate = (self.done - d_start) / max(now - t_start, 1e-9)
+            line += f"  [{self.done}/{self.total}]"
+            if rate > 0:
+                stats["eta_s"] = round((self.total - self.done) / rate)
+                line += f"  ETA {_eta(stats['eta_s'])}"
+        print(line)
+        self._emit(stats)
+        self.window = []
+        self.last = now
+
+    def finish(self):
+        """Final summary + per-class table (runs at exit once started)."""
+        if not self.on:
+            return
+        with self.lock:
+            self.on = False
+            total = sum(c["n"] for c in self.classes.values())
+            if total:
+                self._summary()
+                elapsed = time.monotonic() - self.t0
+                print(f"[metrics] {total} request(s) in {elapsed:.1f}s")
+                for cls, c in sorted(self.classes.items()):
+                    parse = (
+                        f"  parse p50 {_pct(c['parse'], 0.5):.1f}ms"
+                        f" p95 {_pct(c['parse'], 0.95):.1f}ms"
+                        if c["parse"]
+                        else ""
+                    )
+                    print(
+                        f"  {cls:<8} {c['n']:>6} req  p50 {_pct(c['ms'], 0.5):>6.0f}ms"
+                        f"  p95 {_pct(c['ms'], 0.95):>6.0f}ms  {c['errors']} err"
+                        f"  {c['retries']} retry  {_size(c['bytes'])}{parse}"
+                    )
+            if self.out is not None:
+                self.out.close()
+                self.out = None
+        if self.profiler is not None:
+            self.profiler.dump()
+
+
+class FunctionProfiler:
+    """Aggregate per-call profiles of @profiled functions by name."""
+
+    def __init__(self, mode="cprofile"):
+        if mode == "pyinstrument" and not HAVE_PYINSTRUMENT:
+            print("[profile] pyinstrument not installed; using cProfile", file=sys.stderr)
+            mode = "cprofile"
+        self.mode = mode
+        self.results = {}  # name → pstats.Stats | pyinstrument Session
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    def call(self, name, fn, args, kwargs):
+        if getattr(self.local, "active", False):  # nested @profiled call
+            return fn(*args, **kwargs)
+        self.local.active = True
+        try:
+            if self.mode == "pyinstrument":
+                prof = _PyiProfiler(async_mode="disabled")
+                prof.start()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self._add(name, prof.stop())
+            prof = cProfile.Profile()
+            prof.enable()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                prof.disable()
+                self._add(name, prof)
+        finally:
+            self.local.active = False
+
+    def _add(self, name, result):
+        with self.lock:
+            prev = self.results.get(name)
+            if self.mode == "pyinstrument":
+                self.results[name] = result if prev is None else Session.combine(prev, result)
+            elif prev is None:
+                self.results[name] = pstats.Stats(result)
+            else:
+                prev.add(result)
+
+    def dump(self):
+        for name, result in self.results.items():
+            if self.mode == "pyinstrument":
+                path = f"profile-{name}.html"
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(HTMLRenderer().render(result))
+                print(f"[profile] {name} → {path}")
+                continue
+            path = f"profile-{name}.prof"
+            result.dump_stats(path)
+            buf = io.StringIO()
+            result.stream = buf
+            result.sort_stats("cumulative").print_stats(PROFILE_TOP)
+            print(f"[profile] {name} → {path}")
+            print(buf.getvalue().rstrip())
+
+
+metrics = Metrics()
+
+
+def profiled(fn):
+    """Profile each call of fn while --profile is on."""
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if metrics.profiler is None:
+            return fn(*args, **kwargs)
+        return metrics.profiler.call(fn.__name__, fn, args, kwargs)
+
+    return wrapper
+
+
+def _pop(argv, flag):
+    """Remove `flag VALUE` from argv in place and return VALUE (or None)."""
+    if flag not in argv:
+        return None
+    idx = argv.index(flag)
+    value = argv[idx + 1] if idx + 1 < len(argv) else None
+    del argv[idx : idx + 2]
+    return value
+
+
+def pop_metrics_flags(argv):
+    """Remove --metrics FILE / --profile MODE from argv and start recording."""
+    path = _pop(argv, "--metrics")
+    profile = _pop(argv, "--profile")
+    if profile not in (None, "cprofile", "pyinstrument"):
+        sys.exit(f"--profile: expected cprofile or pyinstrument, got {profile!r}")
+    metrics.start(path, profile)
+    return metrics
@@ -0,0 +1,150 @@
+"""
+Perceptual hashes of images, an on-disk hash index and near-match lookup.
+
+TAGS_DATA.album_items is deduplicated on exact URL only, so a picture
+re-uploaded under another short ID is stored again. dhash() reduces an
+image to a 64-bit difference hash (grey 9×8 thumbnail, one bit per
+horizontal neighbour pair): re-encodes, resizes and small edits move it
+by a few bits, different pictures by ~32. Hamming distance ≤ DISTANCE
+counts as the same picture.
+
+Hashes are kept in an append-only JSONL index (HASH_FILE), one
+{"url", "hash"} line per image (hash as 16 hex digits, or null with an
+"error" when the file could not be decoded); later lines win and appends
+take the file lock, like the view index. Images already in the index are
+never downloaded again.
+
+BKTree answers "every stored hash within distance d of h" without
+comparing against all of them; near_groups() uses it to group one tag's
+URLs, first occurrence kept.
+
+Decoding needs Pillow (HAVE_PIL); the index and the lookups work without
+it.
+"""
+
+import io, json, os
+
+from crawlcore.atomicio import file_lock
+
+try:
+    from PIL import Image
+
+    HAVE_PIL = True
+except ImportError:  # only dhash() needs it
+    HAVE_PIL = False
+
+HASH_FILE = "phash_index.jsonl"
+DISTANCE = 6  # max differing bits (of 64) for a near-duplicate
+
+
+def dhash(data, size=8):
+    """64-bit difference hash of encoded image bytes."""
+    if not HAVE_PIL:
+        raise RuntimeError("perceptual hashing needs Pillow (pip install Pillow)")
+    with Image.open(io.BytesIO(data)) as im:
+        im.draft("L", (4 * size, 4 * size))  # JPEG: decode at reduced scale
+        px = im.convert("L").resize((size + 1, size), Image.BILINEAR).tobytes()
+    bits = 0
+    for row in range(size):
+        r = row * (size + 1)
+        for col in range(size):
+            bits = bits << 1 | (px[r + col] < px[r + col + 1])
+    return bits
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+class HashIndex:
+    def __init__(self, path=HASH_FILE):
+        self.path = path
+        self.entries = {}  # url → {"url", "hash"[, "error"]}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue  # torn line from an interrupted append
+                    self.entries[rec["url"]] = rec
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, url):
+        return url in self.entries
+
+    def get(self, url):
+        """Hash of url as an int, or None (unknown or undecodable)."""
+        rec = self.entries.get(url)
+        return int(rec["hash"], 16) if rec and rec.get("hash") else None
+
+    def add(self, url, h, error=None):
+        rec = {"url": url, "hash": None if h is None else f"{h:016x}"}
+        if error:
+            rec["error"] = error
+        self.entries[url] = rec
+        line = json.dumps(rec, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with file_lock(self.path):
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+
+class BKTree:
+    """Burkhard-Keller tree over Hamming distance."""
+
+    def __init__(self):
+        self.root = None  # [hash, item, {distance: child}]
+
+    def add(self, h, item):
+        if self.root is None:
+            self.root = [h, item, {}]
+            return
+        node = self.root
+        while True:
+            d = hamming(h, node[0])
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = [h, item, {}]
+                return
+            node = child
+
+    def search(self, h, maxdist):
+        """[(distance, item)] for every stored hash within maxdist of h."""
+        out = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            d = hamming(h, node[0])
+            if d <= maxdist:
+                out.append((d, node[1]))
+            for k, child in node[2].items():
+                if d - maxdist <= k <= d + maxdist:
+                    stack.append(child)
+        return sorted(out, key=lambda x: x[0])
+
+
+def near_groups(urls, index, maxdist=DISTANCE):
+    """Group near-duplicate urls: {kept url: [(url, distance), ...]}.
+
+    URLs are visited in order; each one is matched against the kept
+    (first-seen) pictures only, so a group never chains beyond maxdist of
+    its first URL. URLs without a hash (and repeats of a URL) are ignored.
+    """
+    tree = BKTree()
+    groups = {}
+    seen = set()
+    for u in urls:
+        h = index.get(u)
+        if h is None or u in seen:
+            continue
+        seen.add(u)
+        hits = tree.search(h, maxdist)
+        if hits:
+            d, kept = hits[0]
+            groups[kept].append((u, d))
+        else:
+            tree.add(h, u)
+            groups[u] = []
+    return {k: v for k, v in groups.items() if v}
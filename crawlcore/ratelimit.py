@@ -0,0 +1,259 @@
+"""
+Per-host token-bucket rate limiting.
+
+One HostRateLimiter is shared by every worker thread; each host gets its own
+bucket so the politeness budget is enforced per site, not per worker.
+
+Given a max_rate, a limiter is adaptive: each host also gets an AIMD
+controller fed with the latency and outcome of every request (observe()).
+Every WINDOW requests it looks at the p95 latency and the error rate
+(429/5xx/network errors); while both are under target the host's rate
+grows by a tenth of the starting rate and one more request may be in
+flight, up to max_rate / max_inflight (callers size their worker pools
+to max_inflight, INFLIGHT_FACTOR × workers, so the extra slots are
+used); otherwise both are halved. A raise wakes requests waiting for a
+slot. Each
+change is printed as a [rate] line. The starting rate is the `rate` given
+(the old fixed budget), so a struggling host is slowed below it and a
+healthy one is sped up towards max_rate.
+"""
+
+import threading, time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from urllib.parse import urlparse
+
+P95_TARGET = 2.0  # s; slower than this → back off
+ERROR_TARGET = 0.05  # share of failed requests tolerated
+WINDOW = 20  # requests per decision
+STEP = 0.1  # additive increase, as a share of the starting rate
+BACKOFF = 0.5  # multiplicative decrease
+MIN_RATE = 0.2  # req/s floor
+MAX_RATE_FACTOR = 2  # default ceiling, as a multiple of the starting rate
+INFLIGHT_FACTOR = 2  # in-flight ceiling, as a multiple of the starting workers
+
+
+class AIMD:
+    """Additive-increase / multiplicative-decrease rate and concurrency
+    for one host (not locked; the limiters serialise access)."""
+
+    def __init__(self, rate, max_rate, inflight=1, max_inflight=1):
+        self.start = float(rate)
+        self.rate = float(rate)
+        self.max_rate = max(float(max_rate), self.rate)
+        self.inflight = max(1, int(inflight))
+        self.max_inflight = max(self.inflight, int(max_inflight))
+        self.samples = deque()
+        self.p95 = self.errors = 0.0
+
+    def observe(self, latency, ok):
+        """Record one request; True when rate/inflight were just adjusted."""
+        self.samples.append((latency, ok))
+        if len(self.samples) < WINDOW:
+            return False
+        lat = sorted(l for l, _ in self.samples)
+        self.p95 = lat[min(len(lat) - 1, int(0.95 * len(lat)))]
+        self.errors = sum(1 for _, ok in self.samples if not ok) / len(self.samples)
+        self.samples.clear()
+        if self.p95 > P95_TARGET or self.errors > ERROR_TARGET:
+            rate = max(MIN_RATE, self.rate * BACKOFF)
+            inflight = max(1, int(self.inflight * BACKOFF))
+        else:
+            rate = min(self.max_rate, self.rate + STEP * self.start)
+            inflight = min(self.max_inflight, self.inflight + 1)
+        changed = (rate, inflight) != (self.rate, self.inflight)
+        self.rate, self.inflight = rate, inflight
+        return changed
+
+    def describe(self):
+        return (
+            f"{self.rate:.2f} req/s, {self.inflight} in flight "
+            f"(p95 {self.p95:.2f}s, {100 * self.errors:.0f}% errors)"
+        )
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens/sec, at most `burst` banked."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until one token is available, then consume it."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.burst, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def _adjusted(host, ctl, bucket):
+    bucket.rate = ctl.rate
+    print(f"  [rate] {host} {ctl.describe()}")
+
+
+class HostRateLimiter:
+    """Hand out one TokenBucket (and, if adaptive, one AIMD) per URL host."""
+
+    def __init__(self, rate, burst=1, max_rate=None, max_inflight=None):
+        self.rate = rate
+        self.burst = burst
+        self.max_rate = max_rate  # None → fixed rate
+        self.max_inflight = max_inflight or burst
+        self.buckets = {}
+        self.controllers = {}
+        self.busy = {}  # host → requests in flight
+        self.lock = threading.Lock()
+        self.freed = threading.Condition(self.lock)
+
+    def _get(self, host):
+        b = self.buckets.get(host)
+        if b is None:
+            b = self.buckets[host] = TokenBucket(self.rate, self.burst)
+            if self.max_rate is not None:
+                self.controllers[host] = AIMD(
+                    self.rate, self.max_rate, self.burst, self.max_inflight
+                )
+        return b
+
+    def bucket(self, url):
+        with self.lock:
+            return self._get(urlparse(url).netloc.lower())
+
+    def wait(self, url):
+        self.bucket(url).acquire()
+
+    @contextmanager
+    def slot(self, url):
+        """Hold one of the host's in-flight slots (unbounded if fixed-rate)."""
+        host = urlparse(url).netloc.lower()
+        with self.freed:
+            self._get(host)
+            ctl = self.controllers.get(host)
+            while ctl is not None and self.busy.get(host, 0) >= ctl.inflight:
+                self.freed.wait()
+            self.busy[host] = self.busy.get(host, 0) + 1
+        try:
+            yield
+        finally:
+            with self.freed:
+                self.busy[host] -= 1
+                self.freed.notify_all()
+
+    def observe(self, url, latency, ok):
+        """Feed one request's latency and outcome to the host's controller."""
+        host = urlparse(url).netloc.lower()
+        with self.lock:
+            ctl = self.controllers.get(host)
+            if ctl is not None and ctl.observe(latency, ok):
+                _adjusted(host, ctl, self.buckets[host])
+                self.freed.notify_all()
+
+    def rates(self):
+        """{host: current req/s} for progress output."""
+        with self.lock:
+            return {h: b.rate for h, b in self.buckets.items()}
+
+
+class AsyncTokenBucket:
+    """asyncio flavour of TokenBucket, for use inside one event loop."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        import asyncio
+
+        while True:
+            now = time.monotonic()
+            self.tokens = min(
+                self.burst, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AsyncHostRateLimiter:
+    """Hand out one AsyncTokenBucket (and, if adaptive, one AIMD) per URL host."""
+
+    def __init__(self, rate, burst=1, max_rate=None, max_inflight=None):
+        self.rate = rate
+        self.burst = burst
+        self.max_rate = max_rate  # None → fixed rate
+        self.max_inflight = max_inflight or burst
+        self.buckets = {}
+        self.controllers = {}
+        self.busy = {}  # host → requests in flight
+        self.freed = None  # asyncio.Condition, made inside the running loop
+
+    def _get(self, host):
+        b = self.buckets.get(host)
+        if b is None:
+            b = self.buckets[host] = AsyncTokenBucket(self.rate, self.burst)
+            if self.max_rate is not None:
+                self.controllers[host] = AIMD(
+                    self.rate, self.max_rate, self.burst, self.max_inflight
+                )
+        return b
+
+    def bucket(self, url):
+        return self._get(urlparse(url).netloc.lower())
+
+    async def wait(self, url):
+        await self.bucket(url).acquire()
+
+    @asynccontextmanager
+    async def slot(self, url):
+        """Hold one of the host's in-flight slots (unbounded if fixed-rate)."""
+        import asyncio
+
+        if self.freed is None:
+            self.freed = asyncio.Condition()
+        host = urlparse(url).netloc.lower()
+        self._get(host)
+        ctl = self.controllers.get(host)
+        async with self.freed:
+            while ctl is not None and self.busy.get(host, 0) >= ctl.inflight:
+                await self.freed.wait()
+            self.busy[host] = self.busy.get(host, 0) + 1
+        try:
+            yield
+        finally:
+            async with self.freed:
+                self.busy[host] -= 1
+                self.freed.notify_all()
+
+    def observe(self, url, latency, ok):
+        host = urlparse(url).netloc.lower()
+        ctl = self.controllers.get(host)
+        if ctl is not None and ctl.observe(latency, ok):
+            _adjusted(host, ctl, self.buckets[host])
+            if self.freed is not None:
+                import asyncio
+
+                # observe() is sync: wake slot() waiters from the loop
+                asyncio.ensure_future(self._wake())
+
+    async def _wake(self):
+        async with self.freed:
+            self.freed.notify_all()
+
+    def rates(self):
+        return {h: b.rate for h, b in self.buckets.items()}
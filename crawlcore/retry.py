@@ -0,0 +1,161 @@
+"""
+Retry policy shared by Fetcher (crawlcore/fetch.py), AsyncFetcher
+(crawlcore/aiofetch.py) and check_links.py.
+
+  policy = RetryPolicy()
+  wait = policy.delay(attempt, status, retry_after)   # None → give up now
+
+A 4xx other than 408/425/429 is the page's final answer (a dead /view/
+page stays dead), so it fails fast. Timeouts, connection errors, 429 and
+5xx are retried with exponential backoff and full jitter (a random wait
+in [0, base·2^attempt], capped), so workers that failed together do not
+retry together. A Retry-After header (seconds or HTTP date) replaces the
+backoff and also pauses the whole host, not just the request that got it.
+
+HostBreaker watches the outcome of the last `window` requests per host.
+When at least `threshold` of them failed with a retryable error it opens:
+every request to that host waits out `cooldown` seconds first. The next
+outcome after the pause decides: a success closes it, another failure
+reopens it with twice the cooldown (up to MAX_COOLDOWN).
+"""
+
+import email.utils, random, sys, threading, time
+from collections import deque
+from urllib.parse import urlparse
+
+BASE_DELAY = 1.0  # s, first backoff ceiling
+MAX_DELAY = 60.0  # s, cap for backoff and Retry-After
+RETRY_STATUS = {408, 425, 429, 500, 502, 503, 504}
+WINDOW = 20  # outcomes kept per host
+THRESHOLD = 0.5  # failed share that opens the breaker
+MIN_CALLS = 5  # outcomes needed before it can open
+COOLDOWN = 15.0  # s, first pause of an open host
+MAX_COOLDOWN = 300.0
+
+
+def retryable(status):
+    """True for network errors (status None), 429 and 5xx-style answers."""
+    return status is None or status in RETRY_STATUS or status >= 500
+
+
+def parse_retry_after(value):
+    """Retry-After header → seconds to wait (None if absent or unparsable)."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if when is None:
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def _host(url):
+    return urlparse(url).netloc.lower()
+
+
+class RetryPolicy:
+    def __init__(self, retries=3, base=BASE_DELAY, cap=MAX_DELAY, breaker=None):
+        self.retries = retries
+        self.base = base
+        self.cap = cap
+        self.breaker = breaker if breaker is not None else HostBreaker()
+
+    def delay(self, attempt, status=None, retry_after=None):
+        """Seconds to sleep before attempt+1, or None to stop retrying.
+
+        `attempt` counts from 0; `retry_after` is the raw header value.
+        """
+        if not retryable(status) or attempt + 1 >= self.retries:
+            return None
+        wait = parse_retry_after(retry_after)
+        if wait is not None:
+            return min(wait, self.cap)
+        return random.uniform(0, min(self.cap, self.base * 2**attempt))
+
+    def record(self, url, status=None, ok=False, retry_after=None):
+        """Feed one outcome to the breaker (ok=True for a 2xx/3xx)."""
+        failed = not ok and retryable(status)
+        self.breaker.record(url, failed)
+        wait = parse_retry_after(retry_after) if failed else None
+        if wait:
+            self.breaker.hold(url, min(wait, self.cap))
+
+    def pause(self, url):
+        """Seconds the host of url must wait before the next request."""
+        return self.breaker.pause(url)
+
+
+class HostBreaker:
+    """Thread-safe per-host circuit breaker (see the module docstring)."""
+
+    def __init__(
+        self, window=WINDOW, threshold=THRESHOLD, min_calls=MIN_CALLS, cooldown=COOLDOWN
+    ):
+        self.window = window
+        self.threshold = threshold
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self.hosts = {}  # host → {"calls": deque, "until": t, "cooldown": s, "open": bool}
+        self.trips = 0
+        self.lock = threading.Lock()
+
+    def _state(self, host):
+        s = self.hosts.get(host)
+        if s is None:
+            s = self.hosts[host] = {
+                "calls": deque(maxlen=self.window),
+                "until": 0.0,
+                "cooldown": self.cooldown,
+                "open": False,
+            }
+        return s
+
+    def _open(self, host, s, seconds):
+        s["until"] = max(s["until"], time.monotonic() + seconds)
+        s["open"] = True
+        s["calls"].clear()
+        self.trips += 1
+        print(f"  [breaker] {host} failing, paused {seconds:g}s", file=sys.stderr)
+
+    def record(self, url, failed):
+        host = _host(url)
+        with self.lock:
+            s = self._state(host)
+            if s["open"] and time.monotonic() >= s["until"]:
+                # first outcome after the pause decides
+                if failed:
+                    s["cooldown"] = min(MAX_COOLDOWN, s["cooldown"] * 2)
+                    self._open(host, s, s["cooldown"])
+                else:
+                    s["open"] = False
+                    s["cooldown"] = self.cooldown
+                return
+            s["calls"].append(failed)
+            calls = s["calls"]
+            if (
+                not s["open"]
+                and len(calls) >= self.min_calls
+                and sum(calls) >= self.threshold * len(calls)
+            ):
+                self._open(host, s, s["cooldown"])
+
+    def hold(self, url, seconds):
+        """Pause the host of url for `seconds` (Retry-After)."""
+        with self.lock:
+            s = self._state(_host(url))
+            s["until"] = max(s["until"], time.monotonic() + seconds)
+
+    def pause(self, url):
+        with self.lock:
+            s = self.hosts.get(_host(url))
+            return max(0.0, s["until"] - time.monotonic()) if s else 0.0
+
+    def open_hosts(self):
+        now = time.monotonic()
+        with self.lock:
+            return [h for h, s in self.hosts.items() if s["open"] and s["until"] > now]
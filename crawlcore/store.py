@@ -0,0 +1,265 @@
+"""
+Append-only store for the videos dataset.
+
+videos.json is the last exported snapshot; every change made since then is
+appended to a JSONL journal (one fsync'd line per thread) and replayed on
+load. Crawlers journal as they go and call export() once at the end (or
+`crawl_videos.py --export` on demand) to write videos.json + videos-data.js
+and truncate the journal.
+
+Journal records:
+  {"op": "reset", "keys": [...]}               drop these threads ("keys"
+                                               absent: every thread)
+  {"op": "put", "thread": {...}, "top": false} add or replace a thread
+  {"op": "extend", "key": "...", "videos": []} append videos (dedup by URL)
+
+All records are idempotent, so replaying a journal over a snapshot that
+already contains its changes (crash between export and truncate) is safe.
+A torn line from a killed process is skipped with a warning; records
+after it still replay, and appends start on a fresh line after it. A reset only drops the keys its caller owns, so a plain forum
+crawl does not wipe threads other jobs have journaled.
+
+Every export also writes videos-manifest.json (thread index: title, url,
+playable video count, shard number) plus videos-shards/<sha1>.json files
+holding THREADS_PER_SHARD threads each, so videos.html can paint from the
+small index and fetch video lists on demand. Shard names are content
+hashes: unchanged shards keep their name (and their browser cache entry). Appends and exports
+hold the videos.json lock, and export() re-reads the journal first, so
+several crawl jobs can feed the same store without losing each other's
+records.
+
+The store also keeps a global URL index (crawlcore/dedup.py) of which
+thread first stored each video; dedup() filters a crawler's new videos
+against it before they are put.
+"""
+
+import hashlib, json, os, sys
+
+from crawlcore.atomicio import append_lines, atomic_write, file_lock, load_json
+from crawlcore.dedup import UrlIndex
+from crawlcore.urlclean import clean_payload
+
+OUTPUT_JSON = "videos.json"
+OUTPUT_JS = "videos-data.js"
+JOURNAL = "videos.journal.jsonl"
+MANIFEST = "videos-manifest.json"
+SHARD_DIR = "videos-shards"
+THREADS_PER_SHARD = 50
+
+
+def vid_url(v):
+    """URL of a video entry (supports both str and {url,title} dict)."""
+    return v if isinstance(v, str) else v.get("url", "")
+
+
+def thread_key(thread):
+    """Forum threads are keyed by URL, anh.moe threads (url "") by title."""
+    return thread.get("url") or "title:" + thread.get("title", "")
+
+
+def playable(v):
+    """Same filter videos.html applies before showing a video."""
+    u = vid_url(v)
+    return u.startswith("http") and "%3A" not in u and "[" not in u
+
+
+def write_video_shards(payload, json_path=OUTPUT_JSON, per_shard=THREADS_PER_SHARD):
+    """Write videos-manifest.json + content-hashed shards next to json_path."""
+    root = os.path.dirname(os.path.abspath(json_path))
+    os.makedirs(os.path.join(root, SHARD_DIR), exist_ok=True)
+    threads = payload["threads"]
+    index, shards = [], []
+    for start in range(0, len(threads), per_shard):
+        chunk = threads[start : start + per_shard]
+        body = json.dumps(
+            {"threads": chunk}, ensure_ascii=False, separators=(",", ":")
+        )
+        digest = hashlib.sha1(body.encode("utf-8")).hexdigest()[:12]
+        src = f"{SHARD_DIR}/{digest}.json"
+        path = os.path.join(root, src)
+        if not os.path.exists(path):
+            with atomic_write(path) as f:
+                f.write(body)
+        for t in chunk:
+            index.append(
+                {
+                    "title": t.get("title", ""),
+                    "url": t.get("url", ""),
+                    "count": sum(1 for v in t.get("videos", []) if playable(v)),
+                    "shard": len(shards),
+                }
+            )
+        shards.append(src)
+    manifest = {"total": payload["total"], "shards": shards, "threads": index}
+    with atomic_write(os.path.join(root, MANIFEST)) as f:
+        json.dump(manifest, f, ensure_ascii=False, separators=(",", ":"))
+    # drop shards no longer referenced by the manifest
+    live = {os.path.basename(s) for s in shards}
+    for name in os.listdir(os.path.join(root, SHARD_DIR)):
+        if name.endswith(".json") and name not in live:
+            os.remove(os.path.join(root, SHARD_DIR, name))
+
+
+def write_videos_files(payload, json_path=OUTPUT_JSON, js_path=OUTPUT_JS):
+    """Atomically write all published artifacts from {"threads", "total"}."""
+    with atomic_write(json_path, backup=True) as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+    with atomic_write(js_path) as f:
+        f.write("// Auto-generated by crawl_videos.py — do not edit manually\n")
+        f.write("window.VIDEOS_DATA = ")
+        json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+        f.write(";\n")
+    write_video_shards(payload, json_path)
+
+
+class VideoStore:
+    def __init__(self, json_path=OUTPUT_JSON, js_path=OUTPUT_JS, journal=JOURNAL):
+        self.json_path = json_path
+        self.js_path = js_path
+        self.journal = journal
+        self.threads = []
+        self.index = {}  # thread_key → position in self.threads
+        self.urls = UrlIndex()  # normalized video URL → first thread_key
+        self.replayed = 0
+        self._load()
+
+    # ── loading ──────────────────────────────────────────
+    def _load(self):
+        self.threads = []
+        self.replayed = 0
+        if os.path.exists(self.json_path):
+            self.threads = load_json(self.json_path).get("threads", [])
+        self._reindex()
+        self.urls.build(self.threads)
+        if not os.path.exists(self.journal):
+            return
+        with open(self.journal, encoding="utf-8") as f:
+            for n, line in enumerate(f, 1):
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    # torn line from an interrupted append
+                    print(
+                        f"[warn] {self.journal}:{n}: skipped a torn record",
+                        file=sys.stderr,
+                    )
+                    continue
+                self._apply(rec)
+                self.replayed += 1
+
+    def _reindex(self):
+        self.index = {thread_key(t): i for i, t in enumerate(self.threads)}
+
+    # ── mutations ────────────────────────────────────────
+    def _apply(self, rec):
+        op = rec.get("op")
+        if op == "reset":
+            keys = rec.get("keys")
+            if keys is None:
+                self.threads = []
+            else:
+                drop = set(keys)
+                self.threads = [t for t in self.threads if thread_key(t) not in drop]
+            self._reindex()
+            self.urls.build(self.threads)
+        elif op == "put":
+            thread = rec["thread"]
+            key = thread_key(thread)
+            if key in self.index:
+                old = self.threads[self.index[key]]
+                self.urls.release(key, old.get("videos", []))
+                self.threads[self.index[key]] = thread
+            elif rec.get("top"):
+                self.threads.insert(0, thread)
+                self._reindex()
+            else:
+                self.index[key] = len(self.threads)
+                self.threads.append(thread)
+            self.urls.claim(key, thread.get("videos", []))
+        elif op == "extend":
+            key = rec["key"]
+            if key not in self.index:
+                # its put was torn or reset away: recreate it as merge() would
+                if not key.startswith("title:"):
+                    return
+                thread = {"title": key[len("title:") :], "url": "", "videos": []}
+                self.threads.insert(0, thread)
+                self._reindex()
+            thread = self.threads[self.index[key]]
+            videos = thread.setdefault("videos", [])
+            seen = {vid_url(v) for v in videos}
+            for v in rec["videos"]:
+                if vid_url(v) not in seen:
+                    seen.add(vid_url(v))
+                    videos.append(v)
+            self.urls.claim(rec["key"], rec["videos"])
+
+    def _append(self, rec):
+        self._apply(rec)
+        line = json.dumps(rec, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with file_lock(self.json_path):
+            append_lines(self.journal, line)
+
+    def reset(self, keys):
+        """Drop the threads in `keys` (a plain crawl without --resume drops
+        the threads it owns; other jobs' threads are left alone)."""
+        self._append({"op": "reset", "keys": sorted(keys)})
+
+    def put(self, thread, top=False):
+        """Add a thread (at the end, or at the top if top=True) or replace it."""
+        self._append({"op": "put", "thread": thread, "top": top})
+
+    def merge(self, title, videos):
+        """Append videos to the thread titled `title`, creating it at the top.
+
+        Returns the number of new (previously unseen) videos.
+        """
+        key = "title:" + title
+        if key not in self.index:
+            self.put({"title": title, "url": "", "videos": list(videos)}, top=True)
+            return len(videos)
+        existing = {vid_url(v) for v in self.threads[self.index[key]]["videos"]}
+        new = [v for v in videos if vid_url(v) not in existing]
+        if new:
+            self._append({"op": "extend", "key": key, "videos": new})
+        return len(new)
+
+    def dedup(self, key, videos, refs=False):
+        """Filter videos about to be stored in thread `key` against the
+        global URL index: returns (videos, number of cross-thread
+        duplicates), duplicates left out or, with refs=True, stored as
+        references to the thread that already holds them."""
+        return self.urls.split(key, videos, refs)
+
+    def find(self, title):
+        """Return the thread titled `title` (url "" threads only) or None."""
+        i = self.index.get("title:" + title)
+        return self.threads[i] if i is not None else None
+
+    # ── export ───────────────────────────────────────────
+    @property
+    def total(self):
+        return sum(len(t.get("videos", [])) for t in self.threads)
+
+    def export(self, clean=False, drop_empty=False):
+        """Write videos.json + videos-data.js and truncate the journal.
+
+        The snapshot + journal are re-read under the lock first, so records
+        appended by other processes since this store was loaded are kept.
+        With clean=True the clean_videos.py rules are applied to every
+        thread first (empty threads are kept unless drop_empty=True);
+        returns the rule counters.
+        """
+        with file_lock(self.json_path):
+            self._load()
+            payload = {"threads": self.threads, "total": self.total}
+            stats = clean_payload(payload, drop_empty=drop_empty) if clean else None
+            if clean and drop_empty:
+                self.threads = payload["threads"]
+                self._reindex()
+                self.urls.build(self.threads)
+            write_videos_files(payload, self.json_path, self.js_path)
+            if os.path.exists(self.journal):
+                os.remove(self.journal)
+            self.replayed = 0
+            return stats
@@ -0,0 +1,212 @@
+"""
+Read/merge/write access to tags-data.js (window.TAGS_DATA = {...};).
+
+Parsing locates the payload by its fixed `window.TAGS_DATA` prefix and hands
+the offset to json's raw_decode, which stops at the matching closing brace —
+no regex backtracking over the whole file and no copy of the payload.
+
+Three on-disk layouts are supported (LAYOUT, or --layout on the CLI):
+
+  indent   one file, indent=2 (what indexlocal.html's Sync produces)
+  compact  one file, no whitespace (~40% smaller, faster to dump/upload)
+  sharded  tags-data.js keeps tags/items; every album_items/video_items
+           tag lives in tags-data/<field>.<tag>.js and is only rewritten
+           when it changed. The base file document.write()s the shard
+           <script>s, so index.html keeps reading window.TAGS_DATA as-is.
+
+An existing sharded file stays sharded on update; convert with
+
+  python3 -m crawlcore.tagsdata --layout compact
+
+Several crawl jobs may run at once, so every update goes through
+update_tags_file(): take the file lock, re-read the current TAGS_DATA,
+apply the caller's merge function to it and atomically write it back.
+Changes made by other jobs in the meantime are therefore merged into,
+not overwritten. add_tag_items() is the crawlers' "append new URLs to a
+tag" merge.
+"""
+
+import hashlib, json, os, re, sys
+
+from crawlcore.atomicio import atomic_write, file_lock
+
+TAGS_FILE = "tags-data.js"
+HEADER = "// Auto-generated by indexlocal.html\n"
+PREFIX = "window.TAGS_DATA"
+SHARDS_PREFIX = "window.TAGS_DATA_SHARDS"
+SHARD_DIR = "tags-data"
+SHARDED_FIELDS = ("album_items", "video_items")
+LAYOUT = "indent"  # default for files that are not sharded yet
+
+_decoder = json.JSONDecoder()
+
+
+def _decode_after(content, prefix, start=0):
+    """Decode the JSON value following `prefix ... =` in content, or None."""
+    i = content.find(prefix, start)
+    if i < 0:
+        return None
+    i = content.find("=", i + len(prefix))
+    if i < 0:
+        return None
+    i += 1
+    while content[i : i + 1].isspace():
+        i += 1
+    try:
+        value, _ = _decoder.raw_decode(content, i)
+    except ValueError:
+        return None
+    return value
+
+
+def shard_name(field, tag):
+    """File name for one shard; tags with unsafe characters get a hash suffix."""
+    safe = re.sub(r"[^A-Za-z0-9_-]", "_", tag)
+    if safe != tag:
+        safe += "-" + hashlib.sha1(tag.encode("utf-8")).hexdigest()[:8]
+    return f"{SHARD_DIR}/{field}.{safe}.js"
+
+
+def _read_text(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def read_tags_data(tags_file=TAGS_FILE):
+    """Return the parsed TAGS_DATA dict (shards merged in), or None."""
+    data, _ = _read(tags_file)
+    return data
+
+
+def _read(tags_file):
+    """Return (data, layout) where layout is "sharded" or None."""
+    content = _read_text(tags_file)
+    data = _decode_after(content, PREFIX)
+    if not isinstance(data, dict):
+        return None, None
+    shards = _decode_after(content, SHARDS_PREFIX)
+    if not shards:
+        return data, None
+    root = os.path.dirname(os.path.abspath(tags_file))
+    for s in shards:
+        path = os.path.join(root, s["src"])
+        value = None
+        if os.path.exists(path):
+            value = _decode_after(_read_text(path), PREFIX)
+        if value is None:
+            # refuse to continue rather than write the tag back empty
+            print(f"[error] missing/corrupt shard {s['src']}", file=sys.stderr)
+            return None, None
+        data.setdefault(s["field"], {})[s["tag"]] = value
+    return data, "sharded"
+
+
+def _dumps(value, layout):
+    if layout == "indent":
+        return json.dumps(value, ensure_ascii=False, indent=2)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def write_tags_data(data, tags_file=TAGS_FILE, layout=None):
+    layout = layout or LAYOUT
+    if layout != "sharded":
+        with atomic_write(tags_file, backup=True) as f:
+            f.write(f"{HEADER}window.TAGS_DATA = {_dumps(data, layout)};\n")
+        return
+
+    root = os.path.dirname(os.path.abspath(tags_file))
+    os.makedirs(os.path.join(root, SHARD_DIR), exist_ok=True)
+    base = {k: v for k, v in data.items() if k not in SHARDED_FIELDS}
+    shards = []
+    for field in SHARDED_FIELDS:
+        base[field] = {}
+        for tag, value in data.get(field, {}).items():
+            src = shard_name(field, tag)
+            shards.append({"field": field, "tag": tag, "src": src})
+            text = (
+                f"{PREFIX}.{field}[{json.dumps(tag, ensure_ascii=False)}] = "
+                f"{_dumps(value, 'compact')};\n"
+            )
+            path = os.path.join(root, src)
+            if os.path.exists(path) and _read_text(path) == text:
+                continue  # unchanged shard — no rewrite
+            with atomic_write(path) as f:
+                f.write(text)
+    with atomic_write(tags_file, backup=True) as f:
+        f.write(f"{HEADER}window.TAGS_DATA = {_dumps(base, 'compact')};\n")
+        f.write(f"{SHARDS_PREFIX} = {_dumps(shards, 'compact')};\n")
+        f.write(
+            f"{SHARDS_PREFIX}.forEach(function (s) {{ "
+            f"document.write('<script src=\"' + s.src + '\"><\\/script>'); }});\n"
+        )
+
+
+def update_tags_file(merge, tags_file=TAGS_FILE):
+    """Locked read → merge(data) → atomic write. Returns merge()'s result.
+
+    Returns None (and writes nothing) if the file is missing or unparsable.
+    """
+    if not os.path.exists(tags_file):
+        print(f"[warn] {tags_file} not found, skipping update.")
+        return None
+    with file_lock(tags_file):
+        data, layout = _read(tags_file)
+        if data is None:
+            print(f"[error] Could not parse TAGS_DATA from {tags_file}")
+            return None
+        result = merge(data)
+        write_tags_data(data, tags_file, layout)
+        return result
+
+
+def add_tag_items(
+    tag, new_items, field="album_items", register=True, tags_file=TAGS_FILE
+):
+    """Append new_items to TAGS_DATA[field][tag] (deduplicated, order kept).
+
+    Items are URLs or {url, title} dicts, compared by URL. register=True
+    also adds the tag to TAGS_DATA.tags / items so index.html lists it.
+    Returns the tag's new item count, or None if the file was not updated.
+    """
+
+    def url_of(v):
+        return v if isinstance(v, str) else v.get("url")
+
+    def merge(data):
+        if register:
+            if tag not in data.get("tags", []):
+                data.setdefault("tags", []).append(tag)
+                print(f"  Added '{tag}' to tags list")
+            data.setdefault("items", {}).setdefault(tag, [])
+        existing = data.setdefault(field, {}).get(tag, [])
+        seen = {url_of(v) for v in existing}
+        appended = []
+        for v in new_items:
+            if url_of(v) not in seen:
+                seen.add(url_of(v))
+                appended.append(v)
+        data[field][tag] = existing + appended
+        total = len(data[field][tag])
+        print(f"  existing: {len(existing)}, new: {len(appended)}, total: {total}")
+        return total
+
+    # locked read-merge-write: safe against other crawl jobs running at once
+    total = update_tags_file(merge, tags_file)
+    if total is not None:
+        print(f"[{tags_file}] {field}['{tag}'] updated → {total} total")
+    return total
+
+
+if __name__ == "__main__":
+    layout = LAYOUT
+    if "--layout" in sys.argv:
+        layout = sys.argv[sys.argv.index("--layout") + 1]
+    if layout not in ("indent", "compact", "sharded"):
+        sys.exit(f"unknown layout {layout!r} (indent | compact | sharded)")
+    path = next((a for a in sys.argv[1:] if a.endswith(".js")), TAGS_FILE)
+    with file_lock(path):
+        data = read_tags_data(path)
+        if data is None:
+            sys.exit(f"[error] Could not parse TAGS_DATA from {path}")
+        write_tags_data(data, path, layout)
+    print(f"[{path}] rewritten with layout={layout} ({os.path.getsize(path)} bytes)")
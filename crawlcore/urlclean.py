@@ -0,0 +1,116 @@
+"""
+Batch cleaning of video URLs (the rules clean_videos.py applies).
+
+A URL is kept, possibly shortened, or dropped:
+
+  suffix     trailing "\\n…" / "%0A…" / newline garbage cut off (kept if
+             what remains is valid; counted whenever a URL is cut)
+  bbcode     [video] / [/video] / [url= / [img] left in the URL → drop
+  encoded    %3A// or %3A%2F%2F (a second, encoded URL inside) → drop
+  not_mp4    not a plain http(s) … .mp4 URL without spaces/brackets → drop
+             ({url, title} entries may also end in .webm / .mov)
+  malformed  entry is neither a string nor a {"url": …} dict → drop
+
+Almost every stored URL is already clean, so each one first goes through a
+fast path: no "%" or backslash in it and a single fullmatch of the
+compiled VALID_RE, all done in C. Only the few that fail that test go
+through the rule-by-rule path that attributes the drop to a rule. Both
+entry shapes are handled: plain strings and the {url, title} dicts the
+anh.moe crawler writes (cleaned in place of their url, title kept);
+{"ref": …} duplicate references are passed through untouched.
+
+clean_payload() cleans a whole {"threads", "total"} dataset and returns
+per-rule counters; VideoStore.export(clean=True) runs it at the end of a
+crawl.
+"""
+
+import re
+from collections import Counter
+
+SPLIT_RE = re.compile(r"\\n|%0A|\n")
+SUFFIX_RE = re.compile(r"(\\n|%0A|\n)https?", re.I)
+BBCODE_RE = re.compile(r"\[/?video\]|\[url=|\[img\]", re.I)
+ENCODED_RE = re.compile(r"%3A//|%3A%2F%2F")
+VALID_RE = re.compile(r'https?://[^\s\[\]<>"]+\.mp4', re.I)
+MEDIA_RE = re.compile(r'https?://[^\s\[\]<>"]+\.(?:mp4|webm|mov)', re.I)
+
+RULES = ("kept", "suffix", "bbcode", "encoded", "not_mp4", "malformed")
+
+
+def clean_url(url, stats=None, valid=VALID_RE):
+    """Return the cleaned URL, or None if it should be deleted.
+
+    If `stats` (a Counter) is given, the rule that decided is counted.
+    `valid` is the pattern a kept URL must fullmatch.
+    """
+    # fast path: nothing to strip and already a valid mp4 URL
+    if "%" not in url and "\\" not in url and valid.fullmatch(url):
+        if stats is not None:
+            stats["kept"] += 1
+        return url
+
+    if stats is not None and SUFFIX_RE.search(url):
+        stats["suffix"] += 1
+    # Strip trailing encoded-duplicate garbage like \n\nhttps%3A//...
+    url = SPLIT_RE.split(url, 1)[0].strip()
+
+    # Still contains BBCode-style wrapping or encoded :// → discard
+    rule = None
+    if BBCODE_RE.search(url):
+        rule = "bbcode"
+    elif ENCODED_RE.search(url):
+        rule = "encoded"
+    # Must look like a direct http(s) mp4 URL with no spaces or brackets
+    elif not valid.fullmatch(url):
+        rule = "not_mp4"
+    if stats is not None:
+        stats[rule or "kept"] += 1
+    return None if rule else url
+
+
+def clean_videos(videos, stats=None):
+    """Clean one thread's video list (str or {url, title} entries)."""
+    out = []
+    for v in videos:
+        if isinstance(v, str):
+            u = clean_url(v, stats)
+            if u is not None:
+                out.append(u)
+        elif isinstance(v, dict) and isinstance(v.get("url"), str):
+            u = clean_url(v["url"], stats, MEDIA_RE)
+            if u is not None:
+                out.append(v if u == v["url"] else dict(v, url=u))
+        elif isinstance(v, dict) and "ref" in v:
+            out.append(v)  # cross-thread reference (crawlcore/dedup.py)
+        elif stats is not None:
+            stats["malformed"] += 1
+    return out
+
+
+def clean_payload(data, drop_empty=True):
+    """Clean every thread of {"threads", "total"} in place.
+
+    Threads left without videos are removed unless drop_empty=False (the
+    crawlers keep them: their URLs are what --resume skips). Returns a
+    Counter of rule hits plus "threads_dropped".
+    """
+    stats = Counter()
+    threads = []
+    for thread in data["threads"]:
+        thread["videos"] = clean_videos(thread.get("videos", []), stats)
+        if thread["videos"] or not drop_empty:
+            threads.append(thread)
+        else:
+            stats["threads_dropped"] += 1
+    data["threads"] = threads
+    data["total"] = sum(len(t["videos"]) for t in threads)
+    return stats
+
+
+def format_stats(stats):
+    dropped = sum(stats[r] for r in ("bbcode", "encoded", "not_mp4", "malformed"))
+    parts = [f"{stats['kept']} kept", f"{dropped} dropped"]
+    parts += [f"{r} {stats[r]}" for r in RULES[1:] if stats[r]]
+    if stats["threads_dropped"]:
+        parts.append(f"empty threads {stats['threads_dropped']}")
+    return ", ".join(parts)
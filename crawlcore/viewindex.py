@@ -0,0 +1,91 @@
+"""
+Persistent anh.moe view-page index: /view/ ID → resolved media URL + kind.
+
+The crawlers only ever kept the final CDN URL, so a refresh of an album
+or category had to re-open every /view/ page to learn that it was already
+collected. Every view page a crawler fetches is now recorded here, keyed by
+the short ID that ends its slug (/view/Some.Title.AbC12 → "AbC12"), with
+the media URL it resolves to (crawlcore.anhmoe.view_media(), the same
+parser the crawlers use) and its kind (image / video / none). Before
+fetching, the crawlers settle known IDs from the index (see
+Frontier.settle()), so only new cards cost a request.
+
+Stored as append-only JSONL (INDEX_FILE), one {"id", "media", "kind"}
+line per page; later lines win. "media" is the video crawlers' answer;
+when the category crawler's (image-CDN first) answer differs, it is kept
+as "image" too, so each crawler reads back what its own parse gives. Appends take the file lock, so several
+crawl jobs can share the index.
+"""
+
+import json, os, re
+from urllib.parse import urlparse
+
+from crawlcore.anhmoe import view_media
+from crawlcore.atomicio import append_lines, file_lock
+
+INDEX_FILE = "anhmoe_view_index.jsonl"
+
+VIDEO_EXT_RE = re.compile(r"\.(?:mp4|webm|mov|m4v)$", re.I)
+
+
+def view_id(view_url):
+    """Short ID at the end of a /view/ slug (whole slug if it has no dot)."""
+    slug = urlparse(view_url).path.rstrip("/").rsplit("/", 1)[-1]
+    return slug.rsplit(".", 1)[-1]
+
+
+def media_kind(media):
+    if not media:
+        return "none"
+    return "video" if VIDEO_EXT_RE.search(media) else "image"
+
+
+def entry_media(entry, prefer="video"):
+    """An index entry's media URL, as view_media(html, prefer) returned it."""
+    if prefer == "image" and entry.get("image"):
+        return entry["image"]
+    return entry["media"]
+
+
+class ViewIndex:
+    def __init__(self, path=INDEX_FILE):
+        self.path = path
+        self.entries = {}  # view id → {"id", "media", "kind"[, "image"]}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue  # torn line from an interrupted append
+                    self.entries[rec["id"]] = rec
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, view_url):
+        return self.entries.get(view_id(view_url))
+
+    def add(self, view_url, html):
+        """Record a fetched view page; returns its index entry."""
+        media = view_media(html)
+        rec = {"id": view_id(view_url), "media": media, "kind": media_kind(media)}
+        image = view_media(html, prefer="image")
+        if image != media:
+            rec["image"] = image
+        if self.entries.get(rec["id"]) != rec:
+            self.entries[rec["id"]] = rec
+            line = json.dumps(rec, ensure_ascii=False, separators=(",", ":")) + "\n"
+            with file_lock(self.path):
+                append_lines(self.path, line)
+        return rec
+
+    def indexing(self, parse):
+        """Wrap parse(view_url, html) so every fetched page is indexed."""
+
+        def parse_and_index(view_url, html):
+            if html is not None:
+                self.add(view_url, html)
+            return parse(view_url, html)
+
+        return parse_and_index
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Find (and optionally collapse) near-duplicate pictures in album_items.
+
+Every URL of TAGS_DATA.album_items that is not in phash_index.jsonl yet is
+downloaded and perceptually hashed (crawlcore/phash.py). Downloads are
+pooled and concurrent (crawlcore.aiofetch.run_pipeline) with a per-host
+token bucket; for Chevereto CDN files the medium-size rendition (.md.) is
+fetched instead of the original when it exists, since a hash only needs a
+small picture. Decoding runs in
+worker threads so it overlaps with the downloads. Each hash is appended to
+the index as it comes in, so an interrupted run loses nothing and a rerun
+only hashes new URLs.
+
+Per tag, pictures within --distance bits of an earlier one are reported
+as its duplicates:
+
+  phash-report.json   {tag: {"urls", "hashed", "duplicates",
+                             "groups": [{"keep", "dupes": [{url, distance}]}]}}
+
+--apply removes the duplicates from album_items (first occurrence kept).
+--no-fetch reports from the index alone (no Pillow needed).
+
+Usage:
+  python3 dedup_images.py [--tag T] [--distance D] [--workers N] [--rate R]
+                          [--limit N] [--no-fetch] [--apply]
+"""
+
+import asyncio, json, os, sys, time
+
+import httpx
+
+from crawlcore.aiofetch import pop_flag, run_pipeline
+from crawlcore.atomicio import atomic_write
+from crawlcore.fetch import headers
+from crawlcore.phash import DISTANCE, HAVE_PIL, HashIndex, dhash, near_groups
+from crawlcore.tagsdata import TAGS_FILE, read_tags_data, update_tags_file
+
+HEADERS = headers()
+REPORT = "phash-report.json"
+WORKERS = 8  # downloads in flight (--workers N)
+RATE = 4.0  # req/s per CDN host (--rate R)
+CDN_HOSTS = ("cdn.anh.moe", "cdn.save.moe")
+
+
+def medium_url(url):
+    """Chevereto .md. rendition of a CDN file URL (None if not applicable)."""
+    host = url.split("/")[2] if url.count("/") >= 3 else ""
+    head, dot, ext = url.rpartition(".")
+    if host not in CDN_HOSTS or not dot or ".md." in url or "/" in ext:
+        return None
+    return f"{head}.md.{ext}"
+
+
+# ── hashing ───────────────────────────────────────────────
+async def download(fetcher, url):
+    """Bytes of the smallest usable rendition of url, or None."""
+    for u in filter(None, (medium_url(url), url)):
+        await fetcher.hold(u)
+        try:
+            r = await fetcher.client.get(u)
+        except httpx.HTTPError as e:
+            fetcher.policy.record(u)
+            print(f"  [warn] {u}: {type(e).__name__}", file=sys.stderr)
+            continue
+        fetcher.policy.record(
+            u, r.status_code, r.status_code < 400, r.headers.get("Retry-After")
+        )
+        if r.status_code == 200 and r.content:
+            return r.content
+    return None
+
+
+async def fetch_hash(fetcher, url):
+    """(hash, None) or (None, error); None when the download failed."""
+    data = await download(fetcher, url)
+    if data is None:
+        return None  # not recorded; retried next run
+    try:
+        h = await asyncio.get_running_loop().run_in_executor(None, dhash, data)
+        return h, None
+    except Exception as e:  # truncated / not an image
+        return None, f"{type(e).__name__}: {e}"[:200]
+
+
+def _hash_all(urls, workers, rate, on_result):
+    async def produce(fetcher, emit):
+        for u in urls:
+            await emit(u)
+
+    def report(url, fetched, res):
+        on_result(url, *(res if fetched else (None, None)))
+
+    run_pipeline(
+        produce, None, HEADERS, workers, rate, 2 * workers, report, fetch=fetch_hash
+    )
+
+
+def hash_urls(urls, index, workers=WORKERS, rate=RATE):
+    done = hashed = failed = 0
+    t0 = time.time()
+
+    def on_result(url, h, error):
+        nonlocal done, hashed, failed
+        done += 1
+        if h is not None or error:
+            index.add(url, h, error)
+        if h is not None:
+            hashed += 1
+        else:
+            failed += 1
+        if done % 100 == 0 or done == len(urls):
+            rps = done / max(time.time() - t0, 1e-9)
+            print(
+                f"  [{done}/{len(urls)}] hashed {hashed}  failed {failed}  ({rps:.1f}/s)"
+            )
+
+    if urls:
+        _hash_all(urls, workers, rate, on_result)
+
+
+# ── report + collapse ─────────────────────────────────────
+def build_report(items, index, distance):
+    report = {}
+    for tag, urls in items.items():
+        groups = near_groups(urls, index, distance)
+        report[tag] = {
+            "urls": len(urls),
+            "hashed": sum(1 for u in urls if index.get(u) is not None),
+            "duplicates": sum(len(d) for d in groups.values()),
+            "groups": [
+                {"keep": k, "dupes": [{"url": u, "distance": d} for u, d in dupes]}
+                for k, dupes in groups.items()
+            ],
+        }
+    return report
+
+
+def collapse(data, dupes):
+    """Drop near-duplicate URLs from album_items in place ({tag: set})."""
+    removed = 0
+    for tag, drop in dupes.items():
+        items = data.get("album_items", {}).get(tag)
+        if items is None:
+            continue
+        kept = [u for u in items if u not in drop]
+        removed += len(items) - len(kept)
+        data["album_items"][tag] = kept
+    return removed
+
+
+# ── main ──────────────────────────────────────────────────
+def main():
+    workers = pop_flag(sys.argv, "--workers", WORKERS, int)
+    rate = pop_flag(sys.argv, "--rate", RATE, float)
+    limit = pop_flag(sys.argv, "--limit", 0, int)
+    distance = pop_flag(sys.argv, "--distance", DISTANCE, int)
+    only = pop_flag(sys.argv, "--tag", None)
+    fetch = "--no-fetch" not in sys.argv
+    apply = "--apply" in sys.argv
+
+    if not os.path.exists(TAGS_FILE):
+        sys.exit(f"{TAGS_FILE} not found")
+    items = (read_tags_data() or {}).get("album_items", {})
+    if only:
+        items = {only: items.get(only, [])}
+    index = HashIndex()
+    todo = [u for urls in items.values() for u in urls if u not in index]
+    todo = list(dict.fromkeys(todo))
+    if limit:
+        todo = todo[:limit]
+
+    print("=" * 60)
+    total = sum(len(v) for v in items.values())
+    print(f"album_items URLs : {total}  in {len(items)} tag(s)")
+    print(f"Already hashed   : {len(index)}  ({index.path})")
+    print(
+        f"To hash          : {len(todo) if fetch else 0}  "
+        f"({workers} in flight, {rate:g} req/s per host)"
+    )
+    print("=" * 60)
+    if fetch and todo and not HAVE_PIL:
+        sys.exit("Hashing needs Pillow (pip install Pillow); --no-fetch uses the index only")
+    if fetch:
+        hash_urls(todo, index, workers, rate)
+
+    report = build_report(items, index, distance)
+    with atomic_write(REPORT) as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n[report] {REPORT}  (distance ≤ {distance})")
+    for tag, r in report.items():
+        print(
+            f"  {tag:<24} {r['urls']:>7} urls  {r['hashed']:>7} hashed"
+            f"  {r['duplicates']:>6} near-dup(s) in {len(r['groups'])} group(s)"
+        )
+
+    if apply:
+        dupes = {
+            tag: {d["url"] for g in r["groups"] for d in g["dupes"]}
+            for tag, r in report.items()
+        }
+        removed = update_tags_file(lambda data: collapse(data, dupes))
+        print(f"[apply] removed {removed} near-duplicate(s) from {TAGS_FILE}")
+
+
+if __name__ == "__main__":
+    main()
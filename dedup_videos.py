@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Report / remove videos stored in more than one thread of videos.json.
+
+Every video URL (normalized: scheme-less, host lowercased) belongs to the
+first thread holding it in file order; copies in later threads are
+duplicates. The report lists, per URL, the owner and the other threads,
+plus per-thread counts:
+
+  dedup-report.json   {"urls", "duplicate_urls", "duplicate_copies",
+                       "threads": {key: copies}, "duplicates": [...]}
+
+--apply removes the copies through the video store (journaled, then
+exported); with --refs they are replaced by {"ref": owner, "name": file}
+references instead, which videos.html skips. --expand turns references
+back into copies.
+
+Crawlers can avoid storing duplicates in the first place with --dedup /
+--dedup-refs (crawl_videos.py, crawl_anhmoe_videos.py).
+
+Usage:
+  python3 dedup_videos.py [--apply [--refs]] [--expand]
+"""
+
+import json, sys
+
+from crawlcore.atomicio import atomic_write
+from crawlcore.dedup import dedup_threads, expand_refs, find_duplicates, is_ref
+from crawlcore.store import VideoStore, thread_key
+
+REPORT = "dedup-report.json"
+
+
+def write_report(threads, path=REPORT):
+    dups = find_duplicates(threads)
+    per_thread = {}
+    for keys in dups.values():
+        for k in keys[1:]:
+            per_thread[k] = per_thread.get(k, 0) + 1
+    report = {
+        "urls": sum(1 for t in threads for v in t.get("videos", []) if not is_ref(v)),
+        "duplicate_urls": len(dups),
+        "duplicate_copies": sum(per_thread.values()),
+        "threads": dict(sorted(per_thread.items(), key=lambda kv: -kv[1])),
+        "duplicates": [{"url": u, "owner": k[0], "also": k[1:]} for u, k in dups.items()],
+    }
+    with atomic_write(path) as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return report
+
+
+def main():
+    apply = "--apply" in sys.argv
+    refs = "--refs" in sys.argv
+    store = VideoStore()
+    if store.replayed:
+        print(f"Replayed {store.replayed} journal record(s) from {store.journal}")
+
+    if "--expand" in sys.argv:
+        threads = [dict(t, videos=list(t.get("videos", []))) for t in store.threads]
+        expanded, unresolved = expand_refs(threads)
+        for old, new in zip(store.threads, threads):
+            if new["videos"] != old.get("videos", []):
+                store.put(new)
+        store.export()
+        print(f"[expand] {expanded} reference(s) expanded, {unresolved} unresolved")
+        return
+
+    report = write_report(store.threads)
+    print("=" * 60)
+    print(f"Videos          : {report['urls']}  in {len(store.threads)} threads")
+    print(f"Duplicated URLs : {report['duplicate_urls']}")
+    print(f"Redundant copies: {report['duplicate_copies']}")
+    for key, n in list(report["threads"].items())[:10]:
+        print(f"  {n:>6}  {key[:70]}")
+    print(f"[report] {REPORT}")
+    print("=" * 60)
+    if not apply or not report["duplicate_copies"]:
+        return
+
+    threads, removed = dedup_threads(store.threads, refs)
+    for t in threads:
+        if thread_key(t) in removed:
+            store.put(t)
+    store.export()
+    verb = "replaced by references" if refs else "removed"
+    print(f"[apply] {sum(removed.values())} copies {verb} in {len(removed)} thread(s)")
+    print(f"  Total videos across all threads: {store.total}")
+
+
+if __name__ == "__main__":
+    main()
@@ -18,6 +18,17 @@ FILES=(
     "tags-data.js"
 )
 
+# Lazy-load thread index + content-hashed video shards (written on export)
+[ -f "videos-manifest.json" ] && FILES+=("videos-manifest.json")
+if [ -d "videos-shards" ]; then
+    for f in videos-shards/*.json; do FILES+=("$f"); done
+fi
+
+# Sharded tags-data layout (python3 -m crawlcore.tagsdata --layout sharded)
+if [ -d "tags-data" ]; then
+    for f in tags-data/*.js; do FILES+=("$f"); done
+fi
+
 # Auto-copy tags-data.js from Downloads if newer than local copy
 TAGS_DOWNLOAD="$HOME/Downloads/tags-data.js"
 if [ -f "$TAGS_DOWNLOAD" ]; then